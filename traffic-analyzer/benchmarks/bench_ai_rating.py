@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+AI 工具分类评级性能对比
+逐行 iterrows 循环（旧实现） vs 向量化分类评级（TrafficAnalyzer._classify_ai_tools）
+
+使用方法:
+    python benchmarks/bench_ai_rating.py [rows]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import TrafficAnalyzer  # noqa: E402
+
+
+def make_ai_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """构造 AI 子集形状的数据框"""
+    rng = np.random.default_rng(seed)
+    keys = list(TrafficAnalyzer.AI_CATEGORIES) + ['gpt', 'openai', 'assistant']
+    targets = [f'{keys[i % len(keys)]}{i}.ai' for i in rng.integers(0, rows, rows)]
+    return pd.DataFrame({
+        'type': 'referral',
+        'target': targets,
+        'traffic': rng.integers(50000, 2000000, rows),
+        'traffic_diff': rng.normal(0.1, 0.5, rows).round(4)
+    })
+
+
+def legacy_classify(df_ai: pd.DataFrame) -> list:
+    """旧实现：逐行循环确定分类和评级"""
+    results = []
+    for _, row in df_ai.iterrows():
+        target = row['target'].lower()
+
+        category = 'AI工具'
+        for key, cat in TrafficAnalyzer.AI_CATEGORIES.items():
+            if key in target:
+                category = cat
+                break
+
+        growth = row['traffic_diff']
+        traffic = row['traffic']
+        if growth > 0.5 and traffic > 200000:
+            rating, rating_class = 'S级', 's'
+        elif growth > 0.2 or traffic > 500000:
+            rating, rating_class = 'A级', 'a'
+        else:
+            rating, rating_class = 'B级', 'b'
+
+        results.append({
+            'tool': row['target'],
+            'category': category,
+            'traffic': int(row['traffic']),
+            'growth': row['traffic_diff'],
+            'rating': rating,
+            'rating_class': rating_class
+        })
+    return results
+
+
+def timed(func, *args):
+    """返回 (结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    df_ai = make_ai_frame(rows)
+
+    legacy, legacy_seconds = timed(legacy_classify, df_ai)
+    vectorized, vectorized_seconds = timed(
+        lambda df: TrafficAnalyzer._records(TrafficAnalyzer._classify_ai_tools(df)), df_ai)
+
+    assert legacy == vectorized, '向量化结果与旧实现不一致'
+
+    print(f"rows: {rows:,}")
+    print(f"  iterrows   : {legacy_seconds:8.3f}s  {rows / legacy_seconds:>12,.0f} rows/s")
+    print(f"  vectorized : {vectorized_seconds:8.3f}s  {rows / vectorized_seconds:>12,.0f} rows/s")
+    print(f"  speedup    : {legacy_seconds / vectorized_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+图表输出格式对比
+同一份数据按不同格式和分辨率生成 5 张报告图表，比较：
+    render  - 图表渲染耗时（不使用图表缓存）
+    charts  - 图表文件总大小
+    html    - report.html 大小（SVG 内嵌时包含图表）
+    pdf     - HTML → PDF 耗时（需要 playwright 和 chromium，不可用时显示 n/a）
+
+使用方法:
+    python benchmarks/bench_chart_formats.py <csv_file> [runs]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import ChartGenerator, ReportGenerator, TrafficAnalyzer  # noqa: E402
+from pdf_export import PdfExporter  # noqa: E402
+
+# (格式, dpi)，第一项为当前默认设置
+CONFIGS = [('png', 200), ('png', 144), ('webp', 200), ('webp', 144), ('svg', 144)]
+
+
+def render_charts(analyzer, type_traffic, output_dir: Path, fmt: str, dpi: int):
+    """渲染全部图表，返回 (图表路径字典, 耗时秒)"""
+    start = time.perf_counter()
+    charts = ChartGenerator(analyzer.df, output_dir, type_traffic, dpi=dpi, fmt=fmt).generate_all()
+    return charts, time.perf_counter() - start
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/bench_chart_formats.py <csv_file> [runs]")
+        sys.exit(1)
+    csv_path = sys.argv[1]
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    analyzer = TrafficAnalyzer(csv_path)
+    type_traffic = analyzer.get_type_stats().set_index('type')['traffic']
+
+    exporter = PdfExporter(max_concurrency=1)
+    try:
+        exporter.start()
+    except Exception as e:
+        reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        print(f"PDF 导出不可用（{reason}），只比较渲染和文件大小")
+        exporter = None
+
+    print(f"{'format':<6} {'dpi':>4} {'render':>9} {'charts':>10} {'html':>10} {'pdf':>9} {'pdf size':>10}")
+    try:
+        for fmt, dpi in CONFIGS:
+            with tempfile.TemporaryDirectory() as tmp:
+                output_dir = Path(tmp)
+                times = []
+                for _ in range(runs):
+                    charts, seconds = render_charts(analyzer, type_traffic, output_dir, fmt, dpi)
+                    times.append(seconds)
+                chart_bytes = sum(Path(path).stat().st_size for path in charts.values())
+
+                html_path = ReportGenerator(analyzer, output_dir).render_html(charts)
+                pdf_cell, size_cell = 'n/a', 'n/a'
+                if exporter is not None:
+                    start = time.perf_counter()
+                    pdf_path = exporter.convert(html_path, output_dir / 'report.pdf')
+                    pdf_cell = f'{time.perf_counter() - start:8.2f}s'
+                    size_cell = f'{pdf_path.stat().st_size / 1024:8.0f}KB'
+
+                print(f"{fmt:<6} {dpi:>4} {min(times):8.2f}s {chart_bytes / 1024:8.0f}KB "
+                      f"{html_path.stat().st_size / 1024:8.0f}KB {pdf_cell:>9} {size_cell:>10}")
+    finally:
+        if exporter is not None:
+            exporter.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+target 列表示方式对比
+    object  - Python 字符串对象（pandas 2 未启用 Arrow 字符串时的默认）
+    str     - Arrow 字符串（pandas 3 安装 pyarrow 时的默认）
+    category- 字典编码 + 词表缓存（--compact-target）
+比较 target 列内存、由 Arrow 字符串转换的耗时、AI 关键词匹配首次 / 重复调用耗时，
+以及报告用到的各项 AI 相关分析的合计耗时（category 包含首次扫描词表）。
+dup 为每个域名平均出现的次数（多渠道、多地区导出中同一域名会重复出现）
+
+使用方法:
+    python benchmarks/bench_compact_target.py [rows] [dup ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from ai_matcher import ai_mask  # noqa: E402
+from generate_report import TrafficAnalyzer  # noqa: E402
+from target_vocab import compact_target  # noqa: E402
+
+from synthetic_data import make_frame  # noqa: E402
+
+
+def with_duplicates(df, dup: int):
+    """每个域名平均重复 dup 次（取前 rows/dup 个域名循环使用）"""
+    if dup <= 1:
+        return df
+    pool = max(1, len(df) // dup)
+    positions = np.random.default_rng(1).integers(0, pool, len(df))
+    return df.assign(target=df['target'].iloc[positions].to_numpy())
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def report_analyses(df) -> float:
+    """报告中与 AI 识别相关的分析（不使用结果缓存）"""
+    analyzer = TrafficAnalyzer.from_reduced(df, int(df['traffic'].sum()), len(df), {})
+    start = time.perf_counter()
+    analyzer.get_summary_metrics()
+    analyzer.analyze_ai_tools()
+    ai_mask(df[df['traffic'] > 30000])
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    dups = [int(d) for d in sys.argv[2:]] or [1, 10]
+
+    base = make_frame(rows)
+    print(f"rows: {rows:,}")
+    print(f"{'dup':>4} {'target':<9} {'memory':>9} {'convert':>8} {'mask 1st':>9} {'mask again':>11} {'report':>8}")
+    for dup in dups:
+        frame = with_duplicates(base, dup)
+        for label in ('object', 'str', 'category'):
+            def convert():
+                if label == 'category':
+                    return compact_target(frame)
+                return frame.assign(target=frame['target'].astype(label))
+
+            # 每项测量各自重新转换，category 的词表缓存不会跨测量复用
+            df, convert_seconds = timed(convert)
+            memory = df['target'].memory_usage(deep=True, index=False) / 1024 / 1024
+            report = report_analyses(df)
+            df = convert()
+            _, first = timed(lambda: ai_mask(df))
+            _, again = timed(lambda: ai_mask(df))
+            print(f"{dup:>4} {label:<9} {memory:7.1f}MB {convert_seconds:7.2f}s {first:8.3f}s {again:10.3f}s {report:7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
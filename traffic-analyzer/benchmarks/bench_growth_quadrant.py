@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+增长象限图渲染耗时
+逐点散点图（density_threshold=0）与密度图（六边形分箱）在不同点数下的渲染耗时，
+密度图的耗时应基本不随点数增长
+
+使用方法:
+    python benchmarks/bench_growth_quadrant.py [max_points] [dpi]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import ChartGenerator  # noqa: E402
+
+# 逐点散点图超过此点数后不再测量（耗时过长）
+SCATTER_MAX_POINTS = 1000000
+
+
+def make_quadrant_frame(points: int, seed: int = 0) -> pd.DataFrame:
+    """构造全部进入增长象限图（流量 > 3万）的数据框"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'type': 'referral',
+        'target': [f'site{i}.com' for i in range(points)],
+        'traffic': (30001 + rng.pareto(1.2, points) * 20000).astype(np.int64),
+        'traffic_diff': rng.normal(0.05, 0.5, points).round(4)
+    })
+
+
+def render(df: pd.DataFrame, output_dir: Path, density_threshold: int, dpi: int) -> float:
+    """渲染一次增长象限图，返回耗时秒"""
+    chart_gen = ChartGenerator(df, output_dir, dpi=dpi, density_threshold=density_threshold)
+    start = time.perf_counter()
+    chart_gen._plot_growth_quadrant()
+    return time.perf_counter() - start
+
+
+def main():
+    max_points = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    dpi = int(sys.argv[2]) if len(sys.argv) > 2 else ChartGenerator.DEFAULT_DPI
+
+    sizes = [n for n in (10000, 100000, 1000000) if n < max_points] + [max_points]
+    print(f"dpi: {dpi}")
+    print(f"{'points':>10} {'scatter':>9} {'density':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        # 首次绘图包含导入 matplotlib 的耗时，先预热
+        render(make_quadrant_frame(100), output_dir, 0, dpi)
+
+        for points in sizes:
+            df = make_quadrant_frame(points)
+            scatter = render(df, output_dir, 0, dpi) if points <= SCATTER_MAX_POINTS else None
+            density = render(df, output_dir, 1, dpi)
+            scatter_cell = f'{scatter:8.2f}s' if scatter is not None else f"{'-':>9}"
+            print(f"{points:>10,} {scatter_cell} {density:8.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+冷启动耗时对比
+analyze_traffic.py growth 在小文件上的端到端耗时和导入耗时（python -X importtime）：
+    pandas 路径  - TRAFFIC_FAST_PATH_MAX_BYTES=0，等同优化前的行为
+    标准库路径   - 默认设置，小文件不导入 pandas
+
+使用方法:
+    python benchmarks/bench_startup.py [rows] [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_data import write_csv
+
+SCRIPT = Path(__file__).parent.parent / 'scripts' / 'analyze_traffic.py'
+
+
+def run(csv_path: Path, env: dict) -> float:
+    """单次端到端耗时（秒）"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(SCRIPT), str(csv_path), 'growth', '--no-cache'],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def import_time(csv_path: Path, env: dict) -> float:
+    """-X importtime 统计的顶层模块累计导入耗时（秒）"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', str(SCRIPT), str(csv_path), 'growth', '--no-cache'],
+                          env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 顶层导入没有缩进
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1e6
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'small.csv'
+        write_csv(csv_path, rows)
+
+        modes = {
+            'pandas (baseline)': dict(os.environ, TRAFFIC_FAST_PATH_MAX_BYTES='0'),
+            'stdlib fast path': dict(os.environ)
+        }
+
+        print(f"rows: {rows:,}  file: {csv_path.stat().st_size / 1024:.0f} KB  runs: {runs}")
+        for label, env in modes.items():
+            run(csv_path, env)  # 预热文件系统缓存
+            wall = statistics.median(run(csv_path, env) for _ in range(runs))
+            imports = import_time(csv_path, env)
+            print(f"  {label:<18}: wall {wall * 1000:7.0f} ms   imports {imports * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+报告模板渲染对比
+    render  - template.render() 拼出整份 HTML 再写文件（旧实现）
+    stream  - ReportGenerator.render_html 的流式写入
+比较耗时和 Python 内存峰值（tracemalloc），表格行数越多差距越大；
+另外比较新建 Environment 加载模板时有无字节码缓存的耗时（相当于新进程首次加载）
+
+使用方法:
+    python benchmarks/bench_template_render.py [rows]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import RENDER_BUFFER_SIZE, TEMPLATE_DIR  # noqa: E402
+
+# 模拟全量附录：报告模板后接一张逐行输出的大表
+APPENDIX = """
+{% for row in appendix %}
+<tr><td>{{ loop.index }}</td><td>{{ row.target }}</td><td>{{ row.type }}</td>
+<td>{{ "{:,}".format(row.traffic) }}</td><td>{{ "%.1f" | format(row.growth * 100) }}%</td></tr>
+{% endfor %}
+"""
+
+
+def make_rows(rows: int) -> list:
+    return [
+        {'target': f'site{i}.com', 'type': 'referral', 'traffic': i * 37 % 1000003, 'growth': (i % 200 - 100) / 100}
+        for i in range(rows)
+    ]
+
+
+def measure(func):
+    """返回 (耗时秒, 内存峰值 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def load_seconds(template_dir: Path, bytecode_cache, runs: int = 5) -> float:
+    """新建 Environment 加载模板的平均耗时"""
+    from jinja2 import Environment, FileSystemLoader
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        env = Environment(loader=FileSystemLoader(str(template_dir)), bytecode_cache=bytecode_cache)
+        env.get_template('report.html')
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        base = TEMPLATE_DIR / 'report_template.html'
+        source = base.read_text(encoding='utf-8') if base.exists() else '<html><body></body></html>'
+        (tmp / 'report.html').write_text(source + APPENDIX, encoding='utf-8')
+
+        template = Environment(loader=FileSystemLoader(str(tmp))).get_template('report.html')
+        data = {'appendix': make_rows(rows), 'charts': {}, 'inline_charts': {}}
+        out = tmp / 'out.html'
+
+        def render():
+            out.write_text(template.render(**data), encoding='utf-8')
+
+        def stream():
+            s = template.stream(**data)
+            s.enable_buffering(RENDER_BUFFER_SIZE)
+            s.dump(str(out), encoding='utf-8')
+
+        print(f"rows: {rows:,}")
+        for label, func in [('render', render), ('stream', stream)]:
+            seconds, peak = measure(func)
+            print(f"  {label:<7} {seconds:7.2f}s  peak {peak:8.1f} MB  output {out.stat().st_size / 1024 / 1024:.1f} MB")
+
+        cache_dir = tmp / 'bytecode'
+        cache_dir.mkdir()
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+        load_seconds(tmp, bytecode_cache, runs=1)  # 写入缓存
+        print(f"  template load  no cache {load_seconds(tmp, None) * 1000:7.2f} ms"
+              f"  bytecode cache {load_seconds(tmp, bytecode_cache) * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+TOP-N 选择性能对比
+growth（全局 TOP-20）和 segments（每类型 TOP-5）：
+    旧实现 - 过滤后复制并全量排序；按类型逐个掩码、复制、排序
+    新实现 - traffic_topn 线性时间选择，一次分组取出所有类型的 TOP-K
+
+按行数递增运行，每百万行耗时保持不变即为线性扩展
+
+使用方法:
+    python benchmarks/bench_topn.py [max_rows] [types]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from analyze_traffic import analyze_growth_leaders, analyze_market_segments  # noqa: E402
+from analyze_traffic import _growth_record, _segment_record  # noqa: E402
+
+from synthetic_data import make_frame  # noqa: E402
+
+
+def legacy_growth(df, top_n=20, min_traffic=50000):
+    """旧实现：过滤复制后全量排序"""
+    df_sorted = df[df['traffic'] >= min_traffic].copy().sort_values(
+        'traffic_diff', ascending=False, kind='stable')
+    return [_growth_record(row) for _, row in df_sorted.head(top_n).iterrows()]
+
+
+def legacy_segments(df, top_n_per_type=5):
+    """旧实现：每个类型掩码、复制、排序一次"""
+    segments = {}
+    for type_name in df['type'].unique():
+        df_type = df[df['type'] == type_name].copy()
+        df_type = df_type.sort_values('traffic', ascending=False, kind='stable').head(top_n_per_type)
+        segments[type_name] = [_segment_record(row) for _, row in df_type.iterrows()]
+    return segments
+
+
+def timed(func, *args):
+    """返回 (结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    types = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    sizes = [n for n in (1000000, 2500000, 5000000, 10000000) if n < max_rows] + [max_rows]
+    print(f"types: {types}")
+    print(f"{'rows':>12}  {'analysis':<9} {'legacy':>9} {'top-n':>9} {'speedup':>8} {'top-n ms/M rows':>16}")
+
+    for rows in sizes:
+        df = make_frame(rows, types=types)
+        for label, legacy, current in [
+            ('growth', legacy_growth, analyze_growth_leaders),
+            ('segments', legacy_segments, analyze_market_segments)
+        ]:
+            expected, legacy_seconds = timed(legacy, df)
+            result, seconds = timed(current, df)
+            assert result == expected, f'{label} 结果与旧实现不一致'
+            print(f"{rows:>12,}  {label:<9} {legacy_seconds:8.3f}s {seconds:8.3f}s "
+                  f"{legacy_seconds / seconds:7.1f}x {seconds * 1000 / (rows / 1e6):16.1f}")
+        del df
+
+
+if __name__ == '__main__':
+    main()
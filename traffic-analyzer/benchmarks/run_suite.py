@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+性能基准套件 - 在合成数据上分别测量加载、各项分析、各图表、模板渲染和 PDF 导出，
+结果写成 JSON，可与基线比较并在退化超过阈值时以非零状态退出（适合放在定时任务中）
+
+分组:
+    load      - 解析 CSV（不使用缓存）
+    analysis  - analyze_traffic.py 的各分析函数、TrafficAnalyzer 的各报告指标（不使用结果缓存）
+    charts    - ChartGenerator 的 5 张图表（各自单独渲染，不使用图表缓存）
+    render    - 报告模板渲染（report.html）
+    pdf       - HTML → PDF（需要 playwright 和 chromium，不可用时记为跳过）
+
+每项运行 --repeat 次，取最短耗时比较（受其他进程干扰最小），同时记录中位数和内存峰值。
+耗时低于 --min-seconds 的项只报告不判定退化，避免计时噪声
+
+使用方法:
+    python benchmarks/run_suite.py [--sizes=10k,1m] [--groups=load,analysis,charts,render,pdf]
+                                   [--repeat=N] [--seed=N] [--data-dir=DIR] [--output=FILE]
+                                   [--baseline=FILE] [--threshold=0.2] [--min-seconds=0.01]
+    python benchmarks/run_suite.py --compare=FILE --baseline=FILE [--threshold=0.2]
+
+示例:
+    python benchmarks/run_suite.py --sizes=10k,1m --output=baseline.json
+    python benchmarks/run_suite.py --sizes=10k,1m --baseline=baseline.json
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import analyze_traffic  # noqa: E402
+from generate_report import ChartGenerator, ReportGenerator, TrafficAnalyzer  # noqa: E402
+from traffic_cache import CACHE_DIR  # noqa: E402
+from traffic_trace import peak_rss, reset_peak_rss  # noqa: E402
+
+from synthetic_data import dataset_path, parse_size, size_label  # noqa: E402
+
+GROUPS = ('load', 'analysis', 'charts', 'render', 'pdf')
+DEFAULT_SIZES = '10k,1m'
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MIN_SECONDS = 0.01
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DATA_DIR = CACHE_DIR / 'benchmarks'
+
+# 结果文件格式版本，键名或统计方式变化时递增
+RESULT_VERSION = 1
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """运行 repeat 次，返回耗时统计和内存峰值；setup 在每次计时前调用，不计入耗时"""
+    runs = []
+    peak = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        reset_peak_rss()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+        peak = max(peak, peak_rss())
+    return {
+        'seconds': min(runs),
+        'median': statistics.median(runs),
+        'runs': [round(r, 6) for r in runs],
+        'peak_rss_mb': round(peak / 1024 / 1024, 1)
+    }
+
+
+class Suite:
+    """
+    一个数据规模上的全部基准
+
+    Args:
+        csv_path: 合成数据 CSV
+        rows: 行数
+        repeat: 每项运行次数
+    """
+
+    def __init__(self, csv_path: Path, rows: int, repeat: int):
+        self.csv_path = csv_path
+        self.rows = rows
+        self.repeat = repeat
+        self.label = size_label(rows)
+        self.results = {}
+        self.analyzer = None
+        self.charts = None
+
+    def run(self, groups, output_dir: Path) -> dict:
+        self.output_dir = output_dir
+        self.analyzer = TrafficAnalyzer(str(self.csv_path), use_cache=False)
+        for group in groups:
+            getattr(self, f'bench_{group}')()
+        return self.results
+
+    def record(self, group: str, name: str, func, setup=None, repeat: int = None):
+        key = f'{self.label}/{group}/{name}'
+        result = measure(func, repeat or self.repeat, setup)
+        result['rows'] = self.rows
+        self.results[key] = result
+        print(f"  {key:<44} {result['seconds']:9.3f}s  median {result['median']:9.3f}s"
+              f"  peak {result['peak_rss_mb']:8.1f} MB")
+
+    def skip(self, group: str, name: str, reason: str):
+        key = f'{self.label}/{group}/{name}'
+        self.results[key] = {'skipped': reason, 'rows': self.rows}
+        print(f"  {key:<44} 跳过（{reason}）")
+
+    def bench_load(self):
+        self.record('load', 'read_csv', lambda: TrafficAnalyzer(str(self.csv_path), use_cache=False))
+
+    def bench_analysis(self):
+        df = self.analyzer.df
+        for name in ('analyze_growth_leaders', 'analyze_by_type', 'analyze_ai_tools',
+                     'analyze_market_segments', 'find_opportunities', 'analyze_all'):
+            func = getattr(analyze_traffic, name)
+            self.record('analysis', name, lambda func=func: func(df))
+
+        # 报告指标带结果缓存，每次计时前重新赋值 df 清空缓存
+        analyzer = self.analyzer
+
+        def reset():
+            analyzer.df = df
+
+        for name in ('get_summary_metrics', 'get_type_stats', 'analyze_by_type', 'get_top_sources',
+                     'analyze_ai_tools', 'find_opportunities', 'find_risk_items'):
+            self.record('analysis', f'report.{name}', getattr(analyzer, name), setup=reset)
+
+    def _chart_generator(self) -> ChartGenerator:
+        type_traffic = self.analyzer.get_type_stats().set_index('type')['traffic']
+        return ChartGenerator(self.analyzer.df, self.output_dir, type_traffic)
+
+    def bench_charts(self):
+        chart_gen = self._chart_generator()
+        self.charts = {}
+        for name, method in ChartGenerator.CHARTS.items():
+            self.record('charts', name, getattr(chart_gen, method))
+            self.charts[name] = str(chart_gen._output_path(name))
+
+    def _ensure_charts(self):
+        if self.charts is None:
+            self.charts = self._chart_generator().generate_all()
+
+    def bench_render(self):
+        self._ensure_charts()
+        report_gen = ReportGenerator(self.analyzer, self.output_dir)
+        # 先渲染一次填充分析结果缓存，计时只包含模板渲染和写文件（分析耗时见 analysis 分组）
+        report_gen.render_html(self.charts)
+        self.record('render', 'render_html', lambda: report_gen.render_html(self.charts))
+
+    def bench_pdf(self):
+        from pdf_export import PdfExporter
+
+        self._ensure_charts()
+        html_path = ReportGenerator(self.analyzer, self.output_dir).render_html(self.charts)
+        exporter = PdfExporter(max_concurrency=1)
+        try:
+            exporter.start()
+        except Exception as e:
+            reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+            self.skip('pdf', 'convert', reason)
+            return
+        try:
+            self.record('pdf', 'convert', lambda: exporter.convert(html_path, self.output_dir / 'report.pdf'))
+        finally:
+            exporter.close()
+
+
+def environment() -> dict:
+    """运行环境，比较不同机器上的结果时用于提示"""
+    from importlib.metadata import PackageNotFoundError, version
+
+    packages = {}
+    for name in ('pandas', 'numpy', 'pyarrow', 'matplotlib', 'jinja2', 'playwright'):
+        try:
+            packages[name] = version(name)
+        except PackageNotFoundError:
+            packages[name] = None
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': packages,
+        'commit': commit
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_seconds: float) -> list:
+    """
+    逐项比较最短耗时
+
+    Returns:
+        [(键, 基线秒, 当前秒, 比值, 状态)]，状态为 regression / improved / ok / noise / new / missing / skipped
+    """
+    rows = []
+    base_results = baseline['results']
+    for key, result in current['results'].items():
+        base = base_results.get(key)
+        if 'skipped' in result or (base is not None and 'skipped' in base):
+            rows.append((key, None, None, None, 'skipped'))
+            continue
+        if base is None:
+            rows.append((key, None, result['seconds'], None, 'new'))
+            continue
+
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+        if max(result['seconds'], base['seconds']) < min_seconds:
+            status = 'noise'
+        elif ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append((key, base['seconds'], result['seconds'], ratio, status))
+
+    for key in base_results:
+        if key not in current['results']:
+            rows.append((key, base_results[key].get('seconds'), None, None, 'missing'))
+    return rows
+
+
+def print_comparison(rows: list, current: dict, baseline: dict, threshold: float) -> int:
+    """打印比较结果，返回退化的项数"""
+    base_env, env = baseline.get('environment', {}), current.get('environment', {})
+    for field in ('machine', 'cpu_count', 'python', 'packages'):
+        if base_env.get(field) != env.get(field):
+            print(f"注意: 运行环境不同（{field}: {base_env.get(field)} -> {env.get(field)}），比较结果仅供参考")
+
+    print(f"\n与基线比较（阈值 +{threshold:.0%}，基线 {baseline.get('created', '?')}，"
+          f"commit {base_env.get('commit') or '?'}）:")
+    print(f"  {'benchmark':<44} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for key, base, value, ratio, status in rows:
+        base_cell = f'{base:9.3f}s' if base is not None else f"{'-':>10}"
+        value_cell = f'{value:9.3f}s' if value is not None else f"{'-':>10}"
+        ratio_cell = f'{ratio:6.2f}x' if ratio is not None else f"{'-':>7}"
+        print(f"  {key:<44} {base_cell} {value_cell} {ratio_cell}  {status}")
+
+    regressions = [row for row in rows if row[4] == 'regression']
+    if regressions:
+        print(f"\n性能退化 {len(regressions)} 项:")
+        for key, base, value, ratio, _ in regressions:
+            print(f"  {key}: {base:.3f}s -> {value:.3f}s（+{ratio - 1:.0%}）")
+    else:
+        print("\n未发现超过阈值的性能退化")
+    return len(regressions)
+
+
+def load_results(path) -> dict:
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != RESULT_VERSION:
+        print(f"Error: {path} 的结果格式版本为 {results.get('version')}，当前为 {RESULT_VERSION}")
+        sys.exit(1)
+    return results
+
+
+def main():
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    sizes = DEFAULT_SIZES
+    groups = ','.join(GROUPS)
+    repeat = DEFAULT_REPEAT
+    seed = 0
+    data_dir = DATA_DIR
+    output = DEFAULT_OUTPUT
+    baseline_path = None
+    compare_path = None
+    threshold = DEFAULT_THRESHOLD
+    min_seconds = DEFAULT_MIN_SECONDS
+
+    for option in options:
+        if option in ('--help', '-h'):
+            print(__doc__)
+            sys.exit(0)
+        name, _, value = option.partition('=')
+        if name == '--sizes':
+            sizes = value
+        elif name == '--groups':
+            groups = value
+        elif name == '--repeat':
+            repeat = max(1, int(value))
+        elif name == '--seed':
+            seed = int(value)
+        elif name == '--data-dir':
+            data_dir = Path(value)
+        elif name == '--output':
+            output = value
+        elif name == '--baseline':
+            baseline_path = value
+        elif name == '--compare':
+            compare_path = value
+        elif name == '--threshold':
+            threshold = float(value)
+        elif name == '--min-seconds':
+            min_seconds = float(value)
+        else:
+            print(f"Error: 未知选项 {option}")
+            sys.exit(1)
+
+    baseline = load_results(baseline_path) if baseline_path else None
+
+    # 只比较两个已有的结果文件
+    if compare_path:
+        if baseline is None:
+            print("Error: --compare 需要同时指定 --baseline")
+            sys.exit(1)
+        current = load_results(compare_path)
+        rows = compare(current, baseline, threshold, min_seconds)
+        sys.exit(1 if print_comparison(rows, current, baseline, threshold) else 0)
+
+    group_list = [g.strip() for g in groups.split(',') if g.strip()]
+    unknown = [g for g in group_list if g not in GROUPS]
+    if unknown:
+        print(f"Error: 未知分组 {', '.join(unknown)}（可选 {', '.join(GROUPS)}）")
+        sys.exit(1)
+
+    current = {
+        'version': RESULT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'settings': {'repeat': repeat, 'seed': seed, 'groups': group_list},
+        'results': {}
+    }
+
+    for rows in (parse_size(s) for s in sizes.split(',') if s.strip()):
+        csv_path = dataset_path(data_dir, rows, seed)
+        print(f"\n[{size_label(rows)}] {rows:,} 行  {csv_path}")
+        with tempfile.TemporaryDirectory() as tmp:
+            suite = Suite(csv_path, rows, repeat)
+            current['results'].update(suite.run(group_list, Path(tmp)))
+            del suite
+
+    output = Path(output)
+    output.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n结果已保存: {output}")
+
+    if baseline is not None:
+        rows = compare(current, baseline, threshold, min_seconds)
+        sys.exit(1 if print_comparison(rows, current, baseline, threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+合成数据 - 生成与 SEMrush 导出同结构（type, target, traffic, prev_traffic, traffic_diff, traffic_share）的数据
+
+按块生成，每块的随机数由 (seed, 块序号) 决定，同样的行数和种子总能得到逐字节相同的文件，
+内存占用只与块大小有关（1000 万行也可以直接写出）。分布接近真实导出：
+    type          - 按常见渠道比例抽取，search/direct/referral 占大头
+    target        - 逐行唯一的域名，约 3% 含 AI 工具关键词（带 www. 前缀和不同后缀）
+    traffic       - 帕累托长尾：大多数来源只有几百流量，少数头部来源上千万
+    traffic_diff  - 多数在 0 附近波动，少量新兴来源成倍增长，下限 -99%
+    prev_traffic  - 由 traffic 和 traffic_diff 反推
+    traffic_share - traffic / 全部来源流量之和
+
+使用方法:
+    python benchmarks/synthetic_data.py <rows> <output_csv> [--seed=N]
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from ai_matcher import AI_KEYWORDS  # noqa: E402
+
+# 数据集规模（名称 -> 行数）
+SIZES = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+
+CHUNK_ROWS = 500000
+
+COLUMNS = ['type', 'target', 'traffic', 'prev_traffic', 'traffic_diff', 'traffic_share']
+
+# 渠道及其占比
+TYPES = {
+    'search': 0.34, 'direct': 0.22, 'referral': 0.18, 'social': 0.12,
+    'paid': 0.06, 'mail': 0.04, 'ai_assistants': 0.04
+}
+
+# 含 AI 关键词的来源占比
+AI_SHARE = 0.03
+
+# 带 www. 前缀的来源占比
+WWW_SHARE = 0.2
+
+# 普通来源的域名词（AI 关键词之外，且不包含任何 AI 关键词）
+WORDS = ['shop', 'news', 'blog', 'maps', 'bank', 'wiki', 'forum', 'video', 'travel', 'docs',
+         'music', 'sport', 'photo', 'jobs', 'recipe', 'weather', 'market', 'learn', 'play', 'movie']
+# 'ai' 过短，拼在域名里会与普通词混淆，合成数据只使用较长的关键词
+AI_WORDS = [k for k in AI_KEYWORDS if len(k) > 2]
+TLDS = ['com', 'net', 'io', 'co.uk', 'dev', 'org', 'app', 'de']
+
+
+def parse_size(text: str) -> int:
+    """'10k' / '1m' / '2500000' -> 行数"""
+    text = text.strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    for suffix, factor in (('k', 1000), ('m', 1000000)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def size_label(rows: int) -> str:
+    """行数 -> 结果文件中使用的名称（10000 -> '10k'）"""
+    for label, count in SIZES.items():
+        if count == rows:
+            return label
+    return str(rows)
+
+
+def _chunk_bounds(rows: int, chunk_rows: int):
+    for start in range(0, rows, chunk_rows):
+        yield start, min(rows, start + chunk_rows)
+
+
+def _rng(seed: int, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, chunk])
+
+
+def _traffic(rng: np.random.Generator, count: int) -> np.ndarray:
+    # 每块最先抽取流量，统计总流量时只需重复这一步
+    traffic = (rng.pareto(1.1, count) + 1) * 200
+    return np.minimum(traffic, 5e8).astype(np.int64)
+
+
+def _chunk_frame(seed: int, chunk: int, start: int, stop: int, total_traffic: float, types=None) -> pd.DataFrame:
+    rng = _rng(seed, chunk)
+    count = stop - start
+    traffic = _traffic(rng, count)
+
+    # 多数来源小幅波动，约 5% 为快速增长的新兴来源
+    diff = rng.normal(0.02, 0.25, count)
+    rising = rng.random(count) < 0.05
+    diff[rising] = rng.lognormal(0.0, 1.0, int(rising.sum()))
+    diff = np.maximum(diff, -0.99).round(4)
+    prev_traffic = np.rint(traffic / (1 + diff)).astype(np.int64)
+
+    if types is None:
+        type_names = np.array(list(TYPES))
+        type_codes = rng.choice(len(type_names), count, p=list(TYPES.values()))
+    else:
+        type_names = np.array([f'type_{i:02d}' for i in range(types)])
+        type_codes = rng.integers(0, types, count)
+
+    ai = rng.random(count) < AI_SHARE
+    words = np.where(ai, np.array(AI_WORDS)[rng.integers(0, len(AI_WORDS), count)],
+                     np.array(WORDS)[rng.integers(0, len(WORDS), count)])
+    tlds = np.array(TLDS)[rng.integers(0, len(TLDS), count)]
+    www = rng.random(count) < WWW_SHARE
+    targets = [
+        f"{'www.' if w else ''}{word}{i}.{tld}"
+        for w, word, i, tld in zip(www.tolist(), words.tolist(), range(start, stop), tlds.tolist())
+    ]
+
+    return pd.DataFrame({
+        'type': type_names[type_codes],
+        'target': targets,
+        'traffic': traffic,
+        'prev_traffic': prev_traffic,
+        'traffic_diff': diff,
+        'traffic_share': traffic / total_traffic
+    }, columns=COLUMNS)
+
+
+def _total_traffic(rows: int, seed: int, chunk_rows: int) -> float:
+    return float(sum(
+        _traffic(_rng(seed, chunk), stop - start).sum()
+        for chunk, (start, stop) in enumerate(_chunk_bounds(rows, chunk_rows))
+    ))
+
+
+def iter_chunks(rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS, types: int = None):
+    """
+    逐块生成合成数据
+
+    Args:
+        rows: 总行数
+        seed: 随机种子
+        chunk_rows: 每块行数（影响生成结果，比较不同运行时保持一致）
+        types: 指定时改用 type_00 ... 均匀分布的渠道（测试类型数量的影响）
+    """
+    total = _total_traffic(rows, seed, chunk_rows)
+    for chunk, (start, stop) in enumerate(_chunk_bounds(rows, chunk_rows)):
+        yield _chunk_frame(seed, chunk, start, stop, total, types)
+
+
+def make_frame(rows: int, seed: int = 0, types: int = None) -> pd.DataFrame:
+    """在内存中生成完整的合成数据框"""
+    return pd.concat(list(iter_chunks(rows, seed, types=types)), ignore_index=True)
+
+
+def write_csv(path, rows: int, seed: int = 0) -> Path:
+    """分块写出合成 CSV（先写临时文件，完成后替换）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(iter_chunks(rows, seed)):
+            chunk.to_csv(f, header=i == 0, index=False)
+    tmp_path.replace(path)
+    return path
+
+
+def dataset_path(data_dir, rows: int, seed: int = 0) -> Path:
+    """合成 CSV 的路径，不存在时生成（同样的行数和种子只生成一次）"""
+    path = Path(data_dir) / f'synthetic_{size_label(rows)}_seed{seed}.csv'
+    if not path.exists():
+        print(f"生成合成数据: {rows:,} 行 -> {path}")
+        write_csv(path, rows, seed)
+    return path
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if len(args) < 2:
+        print("Usage: python benchmarks/synthetic_data.py <rows> <output_csv> [--seed=N]")
+        print(f"  rows 可以是行数或 {', '.join(SIZES)}")
+        sys.exit(1)
+
+    seed = 0
+    for option in options:
+        if option.startswith('--seed='):
+            seed = int(option.split('=', 1)[1])
+
+    rows = parse_size(args[0])
+    path = write_csv(args[1], rows, seed)
+    print(f"已写出 {rows:,} 行: {path}（{path.stat().st_size / 1024 / 1024:.1f} MB）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+AI 工具关键词匹配 - 三个脚本共用的 AI 来源识别规则
+关键词在导入时编译为一个正则，按列去重后一次扫描，同时返回命中掩码和命中的关键词
+（category 列直接在词表上匹配并缓存结果，见 target_vocab.py）
+按列匹配时才导入 pandas/numpy，单个字符串匹配（search）只依赖标准库
+"""
+
+from __future__ import annotations
+
+import re
+
+
+# AI 工具关键词（三个脚本统一使用这一份）
+AI_KEYWORDS = [
+    'ai', 'gpt', 'claude', 'openai', 'anthropic', 'midjourney',
+    'stable', 'diffusion', 'chatbot', 'assistant', 'copilot',
+    'cursor', 'lovable', 'windsurf', 'suno', 'elevenlabs',
+    'runway', 'turboscribe', 'undetectable', 'manus', 'emergent',
+    'kling', 'higgsfield', 'hailuo', 'replit', 'blackbox', 'grok'
+]
+
+# 流量类型中包含该关键词即视为 AI 渠道（如 ai_assistants）
+AI_TYPE_KEYWORDS = ['ai']
+
+
+class KeywordMatcher:
+    """
+    关键词子串匹配器（不区分大小写）
+
+    所有关键词编译为一个正则，长关键词优先，同一位置命中时返回最长的关键词；
+    按列去重后统一转小写，再用 pandas 向量化字符串方法匹配
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords))
+        alternatives = sorted(self.keywords, key=len, reverse=True)
+        self.regex = '|'.join(map(re.escape, alternatives))
+        self.pattern = re.compile(self.regex)
+
+    def search(self, text: str):
+        """单个字符串命中的关键词（小写），未命中为 None"""
+        match = self.pattern.search(text.lower())
+        return match.group(0) if match else None
+
+    def find(self, values: pd.Series) -> pd.Series:
+        """
+        每行命中的关键词（小写），未命中或缺失值为 None
+
+        相同取值只匹配一次，结果按编码映射回各行
+        """
+        import numpy as np
+        import pandas as pd
+        from target_vocab import match_unique
+
+        def compute(uniques):
+            found = np.full(len(uniques), None, dtype=object)
+            hit = uniques.str.contains(self.regex, regex=True).to_numpy(dtype=bool)
+            if hit.any():
+                found[hit] = uniques[hit].str.extract(f'({self.regex})', expand=False).to_numpy(dtype=object)
+            return found
+
+        found = match_unique(values, ('find', self.regex), compute, None)
+        return pd.Series(found, index=values.index, dtype=object)
+
+    def find_first(self, values: pd.Series) -> pd.Series:
+        """
+        每行按关键词列表顺序命中的第一个关键词，未命中或缺失值为 None
+
+        用于有优先级的映射（如分类表），与 find 的最左最长匹配不同
+        """
+        import numpy as np
+        import pandas as pd
+        from target_vocab import match_unique
+
+        def compute(uniques):
+            found = np.full(len(uniques), None, dtype=object)
+            pending = np.ones(len(uniques), dtype=bool)
+            for keyword in self.keywords:
+                hit = pending & uniques.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+                found[hit] = keyword
+                pending &= ~hit
+            return found
+
+        found = match_unique(values, ('find_first', tuple(self.keywords)), compute, None)
+        return pd.Series(found, index=values.index, dtype=object)
+
+    def contains(self, values: pd.Series) -> pd.Series:
+        """每行是否命中任一关键词"""
+        import pandas as pd
+        from target_vocab import match_unique
+
+        def compute(uniques):
+            return uniques.str.contains(self.regex, regex=True).to_numpy(dtype=bool)
+
+        hit = match_unique(values, ('contains', self.regex), compute, False)
+        return pd.Series(hit, index=values.index)
+
+
+AI_MATCHER = KeywordMatcher(AI_KEYWORDS)
+AI_TYPE_MATCHER = KeywordMatcher(AI_TYPE_KEYWORDS)
+
+
+def match_ai(df: pd.DataFrame):
+    """
+    识别 AI 相关来源
+
+    Returns:
+        (布尔掩码, 命中关键词)
+        type 含 'ai' 或 target 含任一 AI 关键词即为 AI 来源；
+        命中关键词取自 target，只因 type 命中的行为 None
+    """
+    keyword = AI_MATCHER.find(df['target'])
+    mask = keyword.notna() | AI_TYPE_MATCHER.contains(df['type'])
+    return mask, keyword
+
+
+def ai_mask(df: pd.DataFrame) -> pd.Series:
+    """AI 相关来源的布尔掩码（不提取命中关键词，比 match_ai 更快）"""
+    return AI_MATCHER.contains(df['target']) | AI_TYPE_MATCHER.contains(df['type'])
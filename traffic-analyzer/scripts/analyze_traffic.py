@@ -4,159 +4,438 @@
 支持多种分析模式：趋势分析、分类统计、增长排名等
 """
 
-import pandas as pd
+import csv
+import functools
 import json
+import math
+import os
 import sys
 from pathlib import Path
 
+from ai_matcher import AI_MATCHER, AI_TYPE_MATCHER, ai_mask
+from traffic_rules import Evaluator, any_mask, default_profile, load_profiles
 
-def load_traffic_data(filepath):
-    """加载流量数据文件"""
+# pandas 等重型依赖只在需要时导入：小文件的常用分析走纯标准库路径，省去 pandas 的导入耗时
+
+# 不超过该大小的文件走纯标准库路径
+FAST_PATH_MAX_BYTES = int(os.environ.get('TRAFFIC_FAST_PATH_MAX_BYTES', 2 * 1024 * 1024))
+
+# pandas 默认视为缺失值的字符串，出现时交给 pandas 路径处理
+PANDAS_NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+
+def load_traffic_data(filepath, use_cache=True, compact=False, level='target'):
+    """
+    加载流量数据文件（优先读取列式缓存）
+
+    Args:
+        compact: target 列改为字典编码（见 target_vocab.py）
+        level: 分析粒度，'domain' 时按可注册域名汇总（见 domain_index.py）
+    """
+    from domain_index import apply_level
+    from target_vocab import compact_target
+    from traffic_cache import read_csv_cached
+
+    try:
+        df = apply_level(read_csv_cached(filepath, use_cache), level, use_cache)
+        return compact_target(df) if compact else df
+    except Exception as e:
+        print(f"Error loading file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _analysis_reducer(profiles=None):
+    """
+    各项分析的流式折叠规则（模块级函数，分片模式下在工作进程中调用）
+
+    Args:
+        profiles: 阈值方案列表（默认为内置方案），候选集包含每个方案需要的行
+    """
+    from traffic_stream import StreamReducer
+
+    profiles = profiles or [default_profile()]
+    return StreamReducer(
+        keep=[
+            lambda c: ai_mask(c) & any_mask(c, [p.ai_sources for p in profiles]),
+            lambda c: any_mask(c, [p.opportunity for p in profiles])
+        ],
+        top=[('traffic_diff', 20, p.growth_leaders.mask) for p in profiles],
+        top_per_type=[('traffic', 5)]
+    )
+
+
+def load_traffic_data_streaming(filepath, chunksize=None, workers=None, profiles=None):
+    """
+    分块加载流量数据文件，只保留各项分析需要的行
+
+    Args:
+        filepath: CSV 文件，或分片的 glob 模式 / 目录（各分片在进程池中折叠后合并）
+        chunksize: 每块行数
+        workers: 分片模式的进程数（默认 CPU 核数）
+        profiles: 阈值方案列表（默认为内置方案）
+
+    Returns:
+        (候选数据框, 按类型汇总结果)
+        候选数据框上运行 growth/ai_tools/segments/opportunities 与全量加载结果一致，
+        by_type 需使用按类型汇总结果
+    """
+    from traffic_stream import DEFAULT_CHUNKSIZE, expand_shards, is_sharded, iter_chunks, reduce_shards
+
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    factory = functools.partial(_analysis_reducer, profiles)
     try:
-        df = pd.read_csv(filepath)
-        return df
+        if is_sharded(filepath):
+            reducer = reduce_shards(factory, expand_shards(filepath), chunksize, workers)
+        else:
+            reducer = factory().consume(iter_chunks(filepath, chunksize))
     except Exception as e:
         print(f"Error loading file: {e}", file=sys.stderr)
         sys.exit(1)
+    return reducer.frame(), reducer.type_stats()
 
 
-def analyze_growth_leaders(df, top_n=20, min_traffic=50000):
+def analyze_growth_leaders(df, top_n=20, rules=None):
     """
     分析高增长的流量来源
     
     Args:
         df: 数据框
         top_n: 返回前N个结果
-        min_traffic: 最小流量阈值，过滤掉流量太小的来源
+        rules: 阈值方案（默认为内置方案），入选条件见 growth_leaders 规则集
     """
+    from traffic_topn import top_n as select_top_n
+
     # 过滤掉流量太小的
-    df_filtered = df[df['traffic'] >= min_traffic].copy()
+    rules = rules or default_profile()
+    df_filtered = df[rules.growth_leaders.mask(df)]
     
-    # 按增长率排序
-    df_sorted = df_filtered.sort_values('traffic_diff', ascending=False)
+    # 按增长率取前N个（线性时间选择，不做全量排序）
+    df_top = select_top_n(df_filtered, 'traffic_diff', top_n)
     
-    results = []
-    for _, row in df_sorted.head(top_n).iterrows():
-        results.append({
-            'source': row['target'],
-            'type': row['type'],
-            'traffic': int(row['traffic']),
-            'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
-            'prev_traffic': int(row['prev_traffic']),
-            'traffic_share': f"{row['traffic_share'] * 100:.2f}%"
-        })
-    
-    return results
+    return [_growth_record(row) for _, row in df_top.iterrows()]
+
 
+def analyze_by_type(df=None, type_stats=None):
+    """
+    按流量类型分类统计
 
-def analyze_by_type(df):
-    """按流量类型分类统计"""
-    type_stats = df.groupby('type').agg({
-        'traffic': 'sum',
-        'traffic_share': 'sum',
-        'target': 'count'
-    }).reset_index()
+    Args:
+        df: 数据框
+        type_stats: 已汇总的分类结果（流式加载时使用），列为 type/traffic/share/count
+    """
+    if type_stats is None:
+        type_stats = df.groupby('type').agg({
+            'traffic': 'sum',
+            'traffic_share': 'sum',
+            'target': 'count'
+        }).reset_index()
     
     type_stats.columns = ['type', 'total_traffic', 'total_share', 'source_count']
-    type_stats = type_stats.sort_values('total_traffic', ascending=False)
+    type_stats = type_stats.sort_values('total_traffic', ascending=False, kind='stable')
     
-    results = []
-    for _, row in type_stats.iterrows():
-        results.append({
-            'type': row['type'],
-            'total_traffic': int(row['total_traffic']),
-            'share': f"{row['total_share'] * 100:.2f}%",
-            'source_count': int(row['source_count'])
-        })
-    
-    return results
+    return [_type_record(row) for _, row in type_stats.iterrows()]
 
 
-def analyze_ai_tools(df, min_traffic=10000):
+def analyze_ai_tools(df, rules=None):
     """
     专门分析 AI 工具相关的流量
-    识别包含 AI 相关关键词或分类的来源
+    识别包含 AI 相关关键词或分类的来源（流量条件见 ai_sources 规则集）
     """
-    ai_keywords = ['ai', 'gpt', 'claude', 'openai', 'anthropic', 'midjourney', 
-                   'stable', 'diffusion', 'chatbot', 'assistant', 'copilot',
-                   'cursor', 'lovable', 'windsurf', 'suno', 'elevenlabs',
-                   'runway', 'turboscribe', 'undetectable']
-    
     # 筛选 AI 相关的来源
-    ai_mask = (
-        df['type'].str.contains('ai', case=False, na=False) |
-        df['target'].str.contains('|'.join(ai_keywords), case=False, na=False)
-    )
-    
-    df_ai = df[ai_mask & (df['traffic'] >= min_traffic)].copy()
-    df_ai = df_ai.sort_values('traffic', ascending=False)
+    rules = rules or default_profile()
+    df_ai = df[ai_mask(df) & rules.ai_sources.mask(df)].copy()
+    df_ai = df_ai.sort_values('traffic', ascending=False, kind='stable')
     
-    results = []
-    for _, row in df_ai.iterrows():
-        results.append({
-            'tool': row['target'],
-            'type': row['type'],
-            'traffic': int(row['traffic']),
-            'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
-            'traffic_share': f"{row['traffic_share'] * 100:.3f}%"
-        })
-    
-    return results
+    return [_ai_record(row) for _, row in df_ai.iterrows()]
 
 
 def analyze_market_segments(df, top_n_per_type=5):
     """分析各个细分市场的头部玩家"""
-    segments = {}
-    
-    for type_name in df['type'].unique():
-        df_type = df[df['type'] == type_name].copy()
-        df_type = df_type.sort_values('traffic', ascending=False).head(top_n_per_type)
-        
-        segments[type_name] = []
-        for _, row in df_type.iterrows():
-            segments[type_name].append({
-                'source': row['target'],
-                'traffic': int(row['traffic']),
-                'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
-                'share': f"{row['traffic_share'] * 100:.3f}%"
-            })
+    from traffic_topn import top_n_per_group
+
+    segments = {type_name: [] for type_name in df['type'].unique()}
+    
+    # 一次分组取出所有类型的头部玩家
+    df_top = top_n_per_group(df, 'type', 'traffic', top_n_per_type)
+    for type_name, (_, row) in zip(df_top['type'], df_top.iterrows()):
+        segments[type_name].append(_segment_record(row))
     
     return segments
 
 
-def find_opportunities(df, 
-                      min_traffic=100000, 
-                      max_traffic=1000000,
-                      min_growth=0.2):
+def find_opportunities(df, rules=None):
     """
-    寻找机会赛道：中等流量 + 高增长
+    寻找机会赛道：中等流量 + 高增长（区间见 opportunity 规则集，与报告共用）
     这些可能是值得关注的新兴市场
     """
-    df_opportunity = df[
-        (df['traffic'] >= min_traffic) &
-        (df['traffic'] <= max_traffic) &
-        (df['traffic_diff'] >= min_growth)
-    ].copy()
+    rules = rules or default_profile()
+    df_opportunity = df[rules.opportunity.mask(df)].copy()
+    
+    df_opportunity = df_opportunity.sort_values('traffic_diff', ascending=False, kind='stable')
+    
+    return [_opportunity_record(row) for _, row in df_opportunity.iterrows()]
+
+
+def analyze_all(df, type_stats=None, rules=None, evaluator=None, shared=None):
+    """
+    一次执行全部分析（all 模式），结果与逐项调用各分析函数完全一致
+
+    各项分析共用同一份列数组和阈值掩码（多个方案时 evaluator 也跨方案共用），
+    AI 关键词只匹配过了流量条件的行，只按位置取出要输出的行，不复制整表
+
+    Args:
+        shared: 与方案无关的结果（by_type / segments），多个方案时只计算一次
+    """
+    import numpy as np
+    from traffic_topn import sort_positions
+
+    rules = rules or default_profile()
+    evaluator = evaluator or Evaluator(df)
+    traffic = evaluator.column('traffic')
+    growth = evaluator.column('traffic_diff')
+    if traffic.dtype.kind not in 'iuf' or growth.dtype.kind not in 'iuf':
+        return _run_each(df, 'all', type_stats, rules, shared)
+
+    # 入选的行按增长率降序
+    pool = np.flatnonzero(rules.growth_leaders.mask(evaluator))
+    by_growth = pool[sort_positions(growth[pool])]
+    opportunity_rows = np.flatnonzero(rules.opportunity.mask(evaluator))
+    opportunity_rows = opportunity_rows[sort_positions(growth[opportunity_rows])]
+
+    # AI 来源按流量降序（关键词只在过了流量条件的行上匹配）
+    ai_pool = np.flatnonzero(rules.ai_sources.mask(evaluator))
+    ai_pool = ai_pool[ai_mask(df.iloc[ai_pool]).to_numpy(dtype=bool)]
+    ai_rows = ai_pool[sort_positions(traffic[ai_pool])]
+
+    shared = {} if shared is None else shared
+    return {
+        'growth_leaders': [_growth_record(row) for row in _take_rows(df, by_growth[:20])],
+        'by_type': _shared(shared, 'by_type', lambda: analyze_by_type(df, type_stats)),
+        'ai_tools': [_ai_record(row) for row in _take_rows(df, ai_rows)],
+        'segments': _shared(shared, 'segments', lambda: analyze_market_segments(df)),
+        'opportunities': [_opportunity_record(row) for row in _take_rows(df, opportunity_rows)]
+    }
+
+
+def _shared(shared, key, compute):
+    """与方案无关的结果只计算一次"""
+    if key not in shared:
+        shared[key] = compute()
+    return shared[key]
+
+
+def _take_rows(df, positions):
+    """按位置取出行，返回 {列名: 值} 列表"""
+    part = df.iloc[positions]
+    columns = list(part.columns)
+    return [dict(zip(columns, values)) for values in zip(*(part[c].tolist() for c in columns))]
+
+
+def run_analyses(df, analysis_type, type_stats=None, rules=None, evaluator=None, shared=None):
+    """按分析类型运行对应分析，返回结果字典（键顺序固定）"""
+    if analysis_type == 'all':
+        return analyze_all(df, type_stats, rules, evaluator, shared)
+    return _run_each(df, analysis_type, type_stats, rules, shared)
+
+
+def run_profiles(df, analysis_type, profiles, type_stats=None):
+    """
+    在同一份数据上按多个阈值方案运行分析
+
+    各方案共用列数组和相同的比较结果，与方案无关的分析（by_type / segments）只计算一次
+
+    Returns:
+        只有一个方案时同 run_analyses，否则为 {'profiles': {方案名: 结果}}
+    """
+    evaluator = Evaluator(df)
+    shared = {}
+    return _by_profile(profiles, lambda p: run_analyses(df, analysis_type, type_stats, p, evaluator, shared))
+
+
+def _by_profile(profiles, run):
+    if len(profiles) == 1:
+        return run(profiles[0])
+    return {'profiles': {p.name: run(p) for p in profiles}}
+
+
+def _run_each(df, analysis_type, type_stats=None, rules=None, shared=None):
+    """逐项运行分析"""
+    result = {}
+    shared = {} if shared is None else shared
+    
+    if analysis_type in ['growth', 'all']:
+        result['growth_leaders'] = analyze_growth_leaders(df, rules=rules)
+    
+    if analysis_type in ['by_type', 'all']:
+        result['by_type'] = _shared(shared, 'by_type', lambda: analyze_by_type(df, type_stats))
+    
+    if analysis_type in ['ai_tools', 'all']:
+        result['ai_tools'] = analyze_ai_tools(df, rules)
     
-    df_opportunity = df_opportunity.sort_values('traffic_diff', ascending=False)
+    if analysis_type in ['segments', 'all']:
+        result['segments'] = _shared(shared, 'segments', lambda: analyze_market_segments(df))
     
-    results = []
-    for _, row in df_opportunity.iterrows():
-        results.append({
-            'source': row['target'],
-            'type': row['type'],
-            'traffic': int(row['traffic']),
-            'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
-            'market_position': 'emerging'
-        })
+    if analysis_type in ['opportunities', 'all']:
+        result['opportunities'] = find_opportunities(df, rules)
     
-    return results
+    return result
+
+
+# ---- 输出记录格式（pandas 路径与标准库路径共用） ----
+
+def _growth_record(row):
+    return {
+        'source': row['target'],
+        'type': row['type'],
+        'traffic': int(row['traffic']),
+        'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
+        'prev_traffic': int(row['prev_traffic']),
+        'traffic_share': f"{row['traffic_share'] * 100:.2f}%"
+    }
+
+
+def _type_record(row):
+    return {
+        'type': row['type'],
+        'total_traffic': int(row['total_traffic']),
+        'share': f"{row['total_share'] * 100:.2f}%",
+        'source_count': int(row['source_count'])
+    }
+
+
+def _ai_record(row):
+    return {
+        'tool': row['target'],
+        'type': row['type'],
+        'traffic': int(row['traffic']),
+        'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
+        'traffic_share': f"{row['traffic_share'] * 100:.3f}%"
+    }
+
+
+def _segment_record(row):
+    return {
+        'source': row['target'],
+        'traffic': int(row['traffic']),
+        'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
+        'share': f"{row['traffic_share'] * 100:.3f}%"
+    }
+
+
+def _opportunity_record(row):
+    return {
+        'source': row['target'],
+        'type': row['type'],
+        'traffic': int(row['traffic']),
+        'growth_rate': f"{row['traffic_diff'] * 100:.1f}%",
+        'market_position': 'emerging'
+    }
+
+
+# ---- 纯标准库快速路径（小文件，结果与 pandas 路径一致） ----
+
+def load_rows_fast(filepath):
+    """
+    用标准库 csv 读取小文件
+
+    Returns:
+        行字典列表；遇到缺失值或无法解析的数值时返回 None，由 pandas 路径处理
+    """
+    rows = []
+    with open(filepath, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            try:
+                if record['type'] in PANDAS_NA_VALUES or record['target'] in PANDAS_NA_VALUES:
+                    return None
+                row = {
+                    'type': record['type'],
+                    'target': record['target'],
+                    'traffic': int(record['traffic']),
+                    'prev_traffic': int(record['prev_traffic']),
+                    'traffic_diff': float(record['traffic_diff']),
+                    'traffic_share': float(record['traffic_share'])
+                }
+            except (KeyError, TypeError, ValueError):
+                return None
+            if math.isnan(row['traffic_diff']) or math.isnan(row['traffic_share']):
+                return None
+            rows.append(row)
+    return rows
+
+
+def analyze_rows_fast(rows, analysis_type, rules=None):
+    """在行字典列表上运行分析，阈值与排序规则同 pandas 路径（稳定排序）"""
+    rules = rules or default_profile()
+    result = {}
+
+    if analysis_type in ['growth', 'all']:
+        candidates = [r for r in rows if rules.growth_leaders.test(r)]
+        candidates.sort(key=lambda r: r['traffic_diff'], reverse=True)
+        result['growth_leaders'] = [_growth_record(r) for r in candidates[:20]]
+
+    if analysis_type in ['by_type', 'all']:
+        stats = {}
+        for r in rows:
+            entry = stats.setdefault(r['type'], {'traffic': 0, 'shares': [], 'count': 0})
+            entry['traffic'] += r['traffic']
+            entry['shares'].append(r['traffic_share'])
+            entry['count'] += 1
+        type_rows = [
+            {'type': t, 'total_traffic': e['traffic'], 'total_share': math.fsum(e['shares']),
+             'source_count': e['count']}
+            for t, e in sorted(stats.items())
+        ]
+        type_rows.sort(key=lambda r: r['total_traffic'], reverse=True)
+        result['by_type'] = [_type_record(r) for r in type_rows]
+
+    if analysis_type in ['ai_tools', 'all']:
+        candidates = [
+            r for r in rows
+            if rules.ai_sources.test(r) and (AI_MATCHER.search(r['target']) or AI_TYPE_MATCHER.search(r['type']))
+        ]
+        candidates.sort(key=lambda r: r['traffic'], reverse=True)
+        result['ai_tools'] = [_ai_record(r) for r in candidates]
+
+    if analysis_type in ['segments', 'all']:
+        by_type = {}
+        for r in rows:
+            by_type.setdefault(r['type'], []).append(r)
+        result['segments'] = {
+            t: [_segment_record(r) for r in sorted(group, key=lambda r: r['traffic'], reverse=True)[:5]]
+            for t, group in by_type.items()
+        }
+
+    if analysis_type in ['opportunities', 'all']:
+        candidates = [r for r in rows if rules.opportunity.test(r)]
+        candidates.sort(key=lambda r: r['traffic_diff'], reverse=True)
+        result['opportunities'] = [_opportunity_record(r) for r in candidates]
+
+    return result
+
+
+def _try_fast_path(filepath, analysis_type, profiles):
+    """满足条件时走标准库路径，否则返回 None"""
+    try:
+        if os.path.getsize(filepath) > FAST_PATH_MAX_BYTES:
+            return None
+        rows = load_rows_fast(filepath)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+    if rows is None:
+        return None
+    return _by_profile(profiles, lambda p: analyze_rows_fast(rows, analysis_type, p))
 
 
 def main():
     """主函数 - 支持命令行调用"""
-    if len(sys.argv) < 3:
-        print("Usage: python analyze_traffic.py <csv_file> <analysis_type>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+    
+    if len(args) < 2:
+        print("Usage: python analyze_traffic.py <csv_file> <analysis_type> [--stream] [--chunksize=N] [--no-cache] [--workers=N] [--compact-target] [--level=target|domain] [--rules=FILE] [--rule-profile=NAME[,NAME...]]")
         print("\nAnalysis types:")
         print("  growth       - 高增长来源排行")
         print("  by_type      - 按类型统计")
@@ -164,29 +443,70 @@ def main():
         print("  segments     - 细分市场分析")
         print("  opportunities - 寻找机会赛道")
         print("  all          - 运行所有分析")
+        print("\nOptions:")
+        print("  --stream       - 分块流式读取（适合超大文件）")
+        print("  --chunksize=N  - 流式读取的每块行数（默认 500000）")
+        print("  --no-cache     - 不读写解析缓存，直接解析 CSV")
+        print("  --workers=N    - 分片模式的进程数（默认 CPU 核数）")
+        print("  --compact-target - target 列字典编码，关键词匹配只在去重后的域名上运行")
+        print("  --level=domain - 按可注册域名汇总后分析（app.x.dev、www.x.dev 合并为 x.dev），默认 target")
+        print("  --rules=FILE   - 阈值规则文件（JSON / YAML，见 traffic_rules.py），默认使用内置方案")
+        print("  --rule-profile=NAME[,NAME...] - 使用规则文件中的哪些方案（默认全部），多个方案在同一份数据上一次求值")
+        print("\ncsv_file 可以是分片的 glob 模式（加引号，如 'exports/*.csv'）或目录，")
+        print("各分片在进程池中分块折叠后合并，结果与拼接成一个文件相同")
         sys.exit(1)
     
-    filepath = sys.argv[1]
-    analysis_type = sys.argv[2]
+    filepath = args[0]
+    analysis_type = args[1]
     
-    df = load_traffic_data(filepath)
-    
-    result = {}
-    
-    if analysis_type in ['growth', 'all']:
-        result['growth_leaders'] = analyze_growth_leaders(df)
+    chunksize = None
+    workers = None
+    level = 'target'
+    rules_path = None
+    profile_names = None
+    streaming = False
+    use_cache = '--no-cache' not in options
+    for option in options:
+        if option == '--stream':
+            streaming = True
+        elif option.startswith('--chunksize='):
+            streaming = True
+            chunksize = int(option.split('=', 1)[1])
+        elif option.startswith('--workers='):
+            workers = int(option.split('=', 1)[1])
+        elif option.startswith('--level='):
+            level = option.split('=', 1)[1]
+        elif option.startswith('--rules='):
+            rules_path = option.split('=', 1)[1]
+        elif option.startswith('--rule-profile='):
+            profile_names = option.split('=', 1)[1].split(',')
     
-    if analysis_type in ['by_type', 'all']:
-        result['by_type'] = analyze_by_type(df)
+    try:
+        profiles = load_profiles(rules_path, profile_names)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
     
-    if analysis_type in ['ai_tools', 'all']:
-        result['ai_tools'] = analyze_ai_tools(df)
+    # 小文件直接用标准库完成，不导入 pandas（分片路径不是文件，不会走这里）
+    if not streaming and level == 'target':
+        result = _try_fast_path(filepath, analysis_type, profiles)
+        if result is not None:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+            return
     
-    if analysis_type in ['segments', 'all']:
-        result['segments'] = analyze_market_segments(df)
+    from traffic_stream import is_sharded
+
+    type_stats = None
+    if level != 'target' and (streaming or is_sharded(filepath)):
+        # 汇总后的流量才能判断阈值，逐块筛选候选集的方式不适用
+        print("Error: --level=domain 不支持流式读取和分片输入", file=sys.stderr)
+        sys.exit(1)
+    if streaming or is_sharded(filepath):
+        df, type_stats = load_traffic_data_streaming(filepath, chunksize, workers, profiles)
+    else:
+        df = load_traffic_data(filepath, use_cache, '--compact-target' in options, level)
     
-    if analysis_type in ['opportunities', 'all']:
-        result['opportunities'] = find_opportunities(df)
+    result = run_profiles(df, analysis_type, profiles, type_stats)
     
     # 输出 JSON 格式结果
     print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+批量报告生成工具
+一个进程内为多个 CSV 生成报告，复用已加载的模板、字体缓存、图表渲染进程池和浏览器
+
+使用方法:
+    python batch_report.py <csv_dir|manifest> [output_dir] [options]
+
+    csv_dir  - 目录，处理其中所有 *.csv
+    manifest - 清单文件，每行一个 CSV 路径（相对清单所在目录），# 开头为注释；
+               也可以是 .json 文件，内容为路径列表
+
+输出:
+    output_dir/<csv文件名>/           每个 CSV 一个子目录，内容同 generate_report.py
+    output_dir/batch_summary.json     每个文件的各阶段耗时与失败信息
+"""
+
+import json
+import sys
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+from generate_report import (
+    ChartGenerator, ReportGenerator, TrafficAnalyzer, create_chart_executor
+)
+from chart_cache import ChartCache
+from chart_density import DENSITY_THRESHOLD
+from chart_output import check_format
+from domain_index import LEVELS
+from pdf_export import PdfExporter
+from traffic_rules import Profile, load_profiles
+from traffic_stream import DEFAULT_CHUNKSIZE
+
+
+def collect_csv_files(source: Path) -> list:
+    """从目录或清单文件收集 CSV 路径"""
+    if source.is_dir():
+        return sorted(source.glob('*.csv'))
+
+    if source.suffix == '.json':
+        entries = json.loads(source.read_text(encoding='utf-8'))
+    else:
+        lines = source.read_text(encoding='utf-8').splitlines()
+        entries = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+    return [(source.parent / entry) for entry in entries]
+
+
+def report_dir_name(csv_path: Path, used: set) -> str:
+    """输出子目录名，同名 CSV 追加序号"""
+    name = csv_path.stem
+    candidate, index = name, 2
+    while candidate in used:
+        candidate = f'{name}_{index}'
+        index += 1
+    used.add(candidate)
+    return candidate
+
+
+def run_batch(csv_files: list, output_dir: Path, chunksize: int = None, use_cache: bool = True,
+              chart_workers: int = 1, pdf_concurrency: int = 2, export_pdf: bool = True,
+              chart_format: str = 'png', dpi: int = ChartGenerator.DEFAULT_DPI,
+              density_threshold: int = DENSITY_THRESHOLD, rules: Profile = None,
+              level: str = 'target') -> dict:
+    """
+    批量生成报告
+
+    PDF 转换提交给常驻浏览器后立即处理下一个文件，分析/绘图与 PDF 导出并行进行；
+    rules 为所有文件共用的阈值方案（见 traffic_rules.py），默认为内置方案；
+    level 为分析粒度，'domain' 时按可注册域名汇总（见 domain_index.py），不支持流式读取
+
+    Returns:
+        汇总信息（同时写入 output_dir/batch_summary.json）
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    executor = create_chart_executor(chart_workers) if chart_workers > 1 else None
+    exporter = PdfExporter(max_concurrency=pdf_concurrency) if export_pdf else None
+    chart_cache = ChartCache() if use_cache else None
+
+    reports = []
+    pending_pdfs = []
+    used_names = set()
+
+    try:
+        for index, csv_path in enumerate(csv_files, 1):
+            report_dir = output_dir / report_dir_name(csv_path, used_names)
+            entry = {
+                'csv': str(csv_path),
+                'output_dir': str(report_dir),
+                'status': 'ok',
+                'report': None,
+                'timings': {}
+            }
+            reports.append(entry)
+            print(f"[{index}/{len(csv_files)}] {csv_path}")
+
+            try:
+                t0 = time.perf_counter()
+                analyzer = TrafficAnalyzer(str(csv_path), chunksize, use_cache, level=level, rules=rules)
+                entry['timings']['load'] = time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                type_traffic = analyzer.get_type_stats().set_index('type')['traffic']
+                charts = ChartGenerator(analyzer.df, report_dir, type_traffic, executor=executor,
+                                        cache=chart_cache, dpi=dpi, fmt=chart_format,
+                                        density_threshold=density_threshold, rules=rules).generate_all()
+                entry['timings']['charts'] = time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                report_gen = ReportGenerator(analyzer, report_dir)
+                html_path = report_gen.render_html(charts)
+                entry['timings']['html'] = time.perf_counter() - t0
+                entry['report'] = str(html_path)
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = f'{type(e).__name__}: {e}'
+                entry['traceback'] = traceback.format_exc()
+                print(f"  - 失败: {entry['error']}")
+                continue
+
+            if exporter is not None:
+                try:
+                    future = exporter.submit(html_path, report_gen.pdf_path())
+                except ImportError:
+                    print("警告: playwright 未安装，跳过 PDF 生成")
+                    print("安装方法: pip install playwright && playwright install chromium")
+                    exporter = None
+                except Exception as e:
+                    # 浏览器无法启动，后续文件只生成 HTML
+                    entry['status'] = 'failed'
+                    entry['error'] = f'PDF: {type(e).__name__}: {e}'
+                    print(f"  - 浏览器启动失败，后续只生成 HTML: {entry['error']}")
+                    exporter = None
+                else:
+                    pending_pdfs.append((entry, future, time.perf_counter()))
+
+        # 等待剩余的 PDF 转换
+        for entry, future, submitted in pending_pdfs:
+            try:
+                entry['report'] = str(future.result())
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = f'PDF: {type(e).__name__}: {e}'
+            # 包含排队等待浏览器页面的时间
+            entry['timings']['pdf'] = time.perf_counter() - submitted
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if executor is not None:
+            executor.shutdown()
+
+    failed = [r for r in reports if r['status'] != 'ok']
+    summary = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'total_seconds': time.perf_counter() - started,
+        'total': len(reports),
+        'succeeded': len(reports) - len(failed),
+        'failed': len(failed),
+        'reports': reports
+    }
+    summary_path = output_dir / 'batch_summary.json'
+    summary_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding='utf-8')
+    return summary
+
+
+def main():
+    """主函数"""
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if len(args) < 1:
+        print("批量报告生成工具")
+        print("\n使用方法:")
+        print("  python batch_report.py <csv_dir|manifest> [output_dir] [options]")
+        print("\n参数说明:")
+        print("  csv_dir    - 包含 CSV 文件的目录")
+        print("  manifest   - 清单文件（每行一个 CSV 路径，或 JSON 路径列表）")
+        print("  output_dir - 输出目录（可选，默认为 ./outputs），每个 CSV 一个子目录")
+        print("  --stream              - 分块流式读取（适合超大文件）")
+        print(f"  --chunksize=N         - 流式读取的每块行数（默认 {DEFAULT_CHUNKSIZE}）")
+        print("  --no-cache            - 不读写解析缓存和图表缓存")
+        print("  --chart-workers=N     - 图表渲染进程数（默认 1，串行）")
+        print("  --chart-format=F      - 图表格式: png（默认）、webp、svg（内嵌到 HTML）")
+        print(f"  --dpi=N               - 图表分辨率（默认 {ChartGenerator.DEFAULT_DPI}）")
+        print(f"  --density-threshold=N - 增长象限图超过 N 个点时改画密度图（默认 {DENSITY_THRESHOLD}）")
+        print("  --level=domain        - 按可注册域名汇总后分析（app.x.dev、www.x.dev 合并为 x.dev），不支持 --stream")
+        print("  --rules=FILE          - 阈值规则文件（JSON / YAML，见 traffic_rules.py）：AI 评级、机会区间、风险等级")
+        print("  --rule-profile=NAME   - 使用规则文件中的哪个方案（文件中只有一个方案时可省略）")
+        print("  --pdf-concurrency=N   - 同时导出的 PDF 数（默认 2）")
+        print("  --no-pdf              - 只生成 HTML 报告")
+        sys.exit(1)
+
+    source = Path(args[0])
+    output_dir = Path(args[1]) if len(args) > 1 else Path('./outputs')
+
+    chunksize = None
+    chart_workers = 1
+    pdf_concurrency = 2
+    chart_format = 'png'
+    dpi = ChartGenerator.DEFAULT_DPI
+    density_threshold = DENSITY_THRESHOLD
+    level = 'target'
+    rules_path = None
+    profile_names = None
+    for option in options:
+        if option == '--stream':
+            chunksize = chunksize or DEFAULT_CHUNKSIZE
+        elif option.startswith('--chunksize='):
+            chunksize = int(option.split('=', 1)[1])
+        elif option.startswith('--chart-workers='):
+            chart_workers = int(option.split('=', 1)[1])
+        elif option.startswith('--pdf-concurrency='):
+            pdf_concurrency = int(option.split('=', 1)[1])
+        elif option.startswith('--chart-format='):
+            chart_format = option.split('=', 1)[1]
+        elif option.startswith('--dpi='):
+            dpi = int(option.split('=', 1)[1])
+        elif option.startswith('--density-threshold='):
+            density_threshold = int(option.split('=', 1)[1])
+        elif option.startswith('--level='):
+            level = option.split('=', 1)[1]
+        elif option.startswith('--rules='):
+            rules_path = option.split('=', 1)[1]
+        elif option.startswith('--rule-profile='):
+            profile_names = [option.split('=', 1)[1]]
+
+    try:
+        check_format(chart_format)
+        profiles = load_profiles(rules_path, profile_names)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if len(profiles) > 1:
+        print(f"Error: 规则文件中有多个方案，请用 --rule-profile 指定（可选 {' / '.join(p.name for p in profiles)}）")
+        sys.exit(1)
+    if level not in LEVELS:
+        print(f"Error: 未知的分析粒度 {level}（可选 {' / '.join(LEVELS)}）")
+        sys.exit(1)
+    if level != 'target' and chunksize:
+        # 汇总后的流量才能判断阈值，逐块筛选候选集的方式不适用
+        print("Error: --level=domain 不支持流式读取")
+        sys.exit(1)
+
+    csv_files = collect_csv_files(source)
+    if not csv_files:
+        print(f"未找到 CSV 文件: {source}")
+        sys.exit(1)
+
+    print(f"共 {len(csv_files)} 个文件，输出目录: {output_dir}\n")
+    summary = run_batch(
+        csv_files, output_dir,
+        chunksize=chunksize,
+        use_cache='--no-cache' not in options,
+        chart_workers=chart_workers,
+        pdf_concurrency=pdf_concurrency,
+        export_pdf='--no-pdf' not in options,
+        chart_format=chart_format,
+        dpi=dpi,
+        density_threshold=density_threshold,
+        rules=profiles[0],
+        level=level
+    )
+
+    print(f"\n完成！成功 {summary['succeeded']} 个，失败 {summary['failed']} 个，"
+          f"耗时 {summary['total_seconds']:.1f}s")
+    print(f"汇总: {output_dir / 'batch_summary.json'}")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+图表缓存 - 按图表输入数据的指纹缓存渲染好的图片
+指纹相同（数据切片、绘图方法、样式、分辨率都相同）时不再调用 matplotlib，
+直接把缓存的图片硬链接（跨文件系统时复制）到输出目录
+
+缓存目录超过容量上限时按最近使用时间淘汰
+
+环境变量:
+    TRAFFIC_CACHE_DIR          缓存根目录（默认 ~/.cache/traffic-analyzer），图表缓存在其下 charts/
+    TRAFFIC_CHART_CACHE_MAX_MB 图表缓存容量上限，单位 MB（默认 256）
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from traffic_cache import CACHE_DIR
+
+
+CHART_CACHE_DIR = CACHE_DIR / 'charts'
+CHART_CACHE_MAX_BYTES = int(os.environ.get('TRAFFIC_CHART_CACHE_MAX_MB', 256)) * 1024 * 1024
+
+
+class ChartCache:
+    """以指纹命名的图片缓存"""
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = CHART_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir or CHART_CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        """命中时把缓存图片放到 dest 并返回 True"""
+        dest = Path(dest)
+        path = self._entry_path(key, dest.suffix)
+        if not path.exists():
+            return False
+
+        tmp_path = dest.with_name(f'{dest.name}.{os.getpid()}.tmp')
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, dest)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: chart cache unavailable: {e}", file=sys.stderr)
+            return False
+
+        # 更新访问时间，用于 LRU 淘汰
+        os.utime(path)
+        return True
+
+    def store(self, key: str, src):
+        """
+        把渲染好的图片写入缓存，写入失败时只打印警告
+
+        缓存文件是独立的副本：输出目录中的图片被覆盖时不会影响缓存
+        """
+        src = Path(src)
+        path = self._entry_path(key, src.suffix)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: failed to write chart cache: {e}", file=sys.stderr)
+
+    def evict(self):
+        """按最近使用时间淘汰，直到总大小不超过上限"""
+        entries = []
+        for path in self.cache_dir.glob('*.*'):
+            if path.name.endswith('.tmp'):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _entry_path(self, key: str, suffix: str) -> Path:
+        """缓存文件路径（以指纹命名，保留图片格式后缀）"""
+        return self.cache_dir / f'{key}{suffix}'
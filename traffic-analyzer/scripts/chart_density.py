@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+散点密度图 - 点数过多时把 流量 × 增长率 散点图改为六边形分箱密度图
+分箱只做一次 numpy 计数，绘制的图元数量由网格大小决定，与行数无关
+
+增长率按 0.5%～99.5% 分位数截断后分箱，极端值计入边缘格子，避免少数离群点把网格拉得过稀
+"""
+
+# numpy 只在画密度图时导入：visualize_traffic 判断是否改画密度图（use_density）不需要它
+
+
+# 点数超过此值时改用密度图
+DENSITY_THRESHOLD = 20000
+
+# 六边形网格（横向, 纵向）格子数
+HEXBIN_GRIDSIZE = (60, 30)
+
+# 增长率截断分位数
+CLIP_QUANTILES = (0.5, 99.5)
+
+
+def use_density(count: int, threshold: int = DENSITY_THRESHOLD) -> bool:
+    """点数是否超过阈值（threshold 为 0 时始终画散点）"""
+    return threshold > 0 and count > threshold
+
+
+def hexbin_traffic_growth(ax, traffic, growth_pct, cmap: str = 'YlGnBu'):
+    """
+    在对数流量 × 增长率平面上画六边形分箱图，颜色为格子内来源数（对数刻度）
+
+    Returns:
+        hexbin 图层，用于添加 colorbar
+    """
+    import numpy as np
+
+    traffic = np.asarray(traffic, dtype=np.float64)
+    growth_pct = np.asarray(growth_pct, dtype=np.float64)
+    valid = (traffic > 0) & np.isfinite(growth_pct)
+    traffic, growth_pct = traffic[valid], growth_pct[valid]
+
+    if len(growth_pct):
+        low, high = np.percentile(growth_pct, CLIP_QUANTILES)
+        growth_pct = np.clip(growth_pct, low, high)
+
+    return ax.hexbin(traffic, growth_pct, xscale='log', gridsize=HEXBIN_GRIDSIZE,
+                     bins='log', mincnt=1, cmap=cmap, linewidths=0.2)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+域名归并 - 按公共后缀列表把 target 归并到可注册域名（app.lovable.dev、www.lovable.dev -> lovable.dev）
+
+公共后缀列表随工具附带（data/public_suffix_list.dat，离线使用），包含通配规则（*.ck）
+和例外规则（!www.ck），以及 github.io 这类私有后缀。每个 target 的归并结果按列表版本
+缓存到本地磁盘，再次分析同一批来源时不重新解析
+
+更新公共后缀列表:
+    curl -o scripts/data/public_suffix_list.dat https://publicsuffix.org/list/public_suffix_list.dat
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic_cache import CACHE_DIR
+
+
+PSL_PATH = Path(__file__).parent / 'data' / 'public_suffix_list.dat'
+
+# 归并结果缓存目录（每个公共后缀列表版本一个文件）
+DOMAIN_CACHE_DIR = CACHE_DIR / 'domains'
+
+# 缓存条目上限，超过时只保留本次用到的条目
+DOMAIN_CACHE_MAX_ENTRIES = int(os.environ.get('TRAFFIC_DOMAIN_CACHE_MAX_ENTRIES', 5000000))
+
+# 分析粒度
+LEVELS = ('target', 'domain')
+
+
+class PublicSuffixList:
+    """公共后缀列表（规则集合 + 通配规则 + 例外规则）"""
+
+    def __init__(self, path: Path = PSL_PATH):
+        content = Path(path).read_bytes()
+        self.version = hashlib.sha256(content).hexdigest()[:16]
+
+        self.rules = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        for line in content.decode('utf-8').splitlines():
+            rule = line.strip().split(' ', 1)[0].lower()
+            if not rule or rule.startswith('//'):
+                continue
+            for form in self._forms(rule):
+                if form.startswith('!'):
+                    self.exceptions.add(form[1:])
+                elif form.startswith('*.'):
+                    self.wildcards.add(form[2:])
+                else:
+                    self.rules.add(form)
+
+    @staticmethod
+    def _forms(rule: str) -> set:
+        """规则本身及其 punycode 形式（导出数据中的国际化域名可能是任一种）"""
+        forms = {rule}
+        try:
+            forms.add(rule.encode('idna').decode('ascii'))
+        except UnicodeError:
+            pass
+        return forms
+
+    def suffix_start(self, labels: list) -> int:
+        """公共后缀从第几个标签开始（规则从长到短匹配，例外规则去掉最左一个标签，无匹配时取最后一个标签）"""
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self.exceptions:
+                return i + 1
+            if candidate in self.rules or '.'.join(labels[i + 1:]) in self.wildcards:
+                return i
+        return len(labels) - 1
+
+    def registrable(self, host: str) -> tuple:
+        """
+        (可注册域名, 品牌名)
+
+        主机名本身是公共后缀或 IP 地址时原样返回，品牌名为可注册域名的第一个标签
+        """
+        if not host or _is_ip(host):
+            return host, host
+        labels = host.split('.')
+        start = self.suffix_start(labels)
+        if start == 0:
+            return host, labels[0]
+        return '.'.join(labels[start - 1:]), labels[start - 1]
+
+
+def _is_ip(host: str) -> bool:
+    return ':' in host or (host[-1].isdigit() and host.replace('.', '').isdigit())
+
+
+def normalize_host(target: str) -> str:
+    """target -> 主机名（小写，去掉协议、路径、端口和末尾的点）"""
+    host = target.strip().lower()
+    if '/' in host or '?' in host or ':' in host:
+        if '://' in host:
+            host = host.split('://', 1)[1]
+        host = host.split('/', 1)[0].split('?', 1)[0]
+        if host.count(':') == 1:
+            host = host.rsplit(':', 1)[0]
+    return host.strip('.')
+
+
+_PSL = None
+
+
+def public_suffix_list() -> PublicSuffixList:
+    """附带的公共后缀列表（进程内只解析一次）"""
+    global _PSL
+    if _PSL is None:
+        _PSL = PublicSuffixList()
+    return _PSL
+
+
+class DomainCache:
+    """
+    target -> (可注册域名, 品牌名) 的 Arrow IPC 磁盘缓存
+
+    以公共后缀列表版本命名，列表更新后自动失效；未安装 pyarrow 时只在进程内缓存
+    """
+
+    def __init__(self, version: str, cache_dir: Path = None):
+        self.path = Path(cache_dir or DOMAIN_CACHE_DIR) / f'{version}.arrow'
+        self.columns = None
+        self._index = None
+
+    def load(self) -> dict:
+        """已缓存的条目，{'target' / 'domain' / 'brand': object 数组}"""
+        if self.columns is None:
+            self.columns = self._read()
+        return self.columns
+
+    def positions(self, targets: np.ndarray) -> np.ndarray:
+        """各 target 在缓存中的位置，未缓存时为 -1"""
+        if self._index is None:
+            self._index = pd.Index(self.load()['target'])
+        return self._index.get_indexer(targets)
+
+    def add(self, entries: dict, used: np.ndarray):
+        """追加新条目并写回磁盘；超过条目上限时只保留本次用到的条目"""
+        columns = {name: np.concatenate([values, entries[name]]) for name, values in self.load().items()}
+        if len(columns['target']) > DOMAIN_CACHE_MAX_ENTRIES:
+            keep = pd.Index(used).get_indexer(columns['target']) >= 0
+            columns = {name: values[keep] for name, values in columns.items()}
+        self.columns = columns
+        self._index = None
+        self._write(columns)
+
+    def _read(self) -> dict:
+        empty = {name: np.empty(0, dtype=object) for name in ('target', 'domain', 'brand')}
+        if not self.path.exists():
+            return empty
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return empty
+
+        try:
+            with pa.memory_map(str(self.path), 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            return {name: table[name].to_numpy(zero_copy_only=False) for name in empty}
+        except (OSError, KeyError, pa.ArrowInvalid):
+            self.path.unlink(missing_ok=True)
+            return empty
+
+    def _write(self, columns: dict):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return
+
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.table({name: pa.array(values, pa.string()) for name, values in columns.items()})
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, self.path)
+        except (OSError, pa.ArrowException) as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: failed to write domain cache: {e}", file=sys.stderr)
+
+
+_CACHES = {}
+
+
+def domain_index(targets: pd.Series, use_cache: bool = True) -> tuple:
+    """
+    去重后的 target 到可注册域名和品牌名的索引
+
+    Args:
+        targets: target 列
+        use_cache: False 时不读写磁盘缓存
+
+    Returns:
+        (codes, index)：codes 为各行在 index 中的位置（缺失值为 -1），
+        index 为 {'target' / 'domain' / 'brand': 与去重后的 target 一一对应的 object 数组}
+    """
+    psl = public_suffix_list()
+    codes, uniques = pd.factorize(targets)
+    uniques = np.asarray(uniques, dtype=object)
+
+    if use_cache:
+        cache = _CACHES.setdefault(psl.version, DomainCache(psl.version))
+        positions = cache.positions(uniques)
+    else:
+        positions = np.full(len(uniques), -1, dtype=np.intp)
+
+    domain = np.empty(len(uniques), dtype=object)
+    brand = np.empty(len(uniques), dtype=object)
+    hit = positions >= 0
+    if hit.any():
+        cached = cache.load()
+        domain[hit] = cached['domain'][positions[hit]]
+        brand[hit] = cached['brand'][positions[hit]]
+
+    missing = uniques[~hit]
+    if len(missing):
+        pairs = [psl.registrable(normalize_host(str(t))) for t in missing]
+        domain[~hit] = [p[0] for p in pairs]
+        brand[~hit] = [p[1] for p in pairs]
+        if use_cache:
+            cache.add({'target': missing, 'domain': domain[~hit], 'brand': brand[~hit]}, uniques)
+
+    return codes, {'target': uniques, 'domain': domain, 'brand': brand}
+
+
+def rollup(df: pd.DataFrame, use_cache: bool = True) -> pd.DataFrame:
+    """
+    按可注册域名汇总（一次 groupby）
+
+    - traffic / prev_traffic / traffic_share 求和（新出现的来源 prev_traffic 为空，按 0 计），members 为归并的行数
+    - type 取域名下流量最高的行的类型
+    - traffic_diff 由汇总后的 traffic / prev_traffic 重新计算；只有一行时保留原值，
+      上期流量全为 0 时取各行按流量加权的平均值
+    - target 改为可注册域名，另加 brand 列；行按域名首次出现的顺序排列
+    """
+    codes, index = domain_index(df['target'], use_cache)
+    domain_codes, domains = pd.factorize(index['domain'])
+    keys = np.where(codes >= 0, domain_codes[codes], -1)
+
+    # 品牌名由可注册域名决定，同一域名重复赋值结果相同
+    brands = np.empty(len(domains), dtype=object)
+    brands[domain_codes] = index['brand']
+
+    traffic = df['traffic'].to_numpy(dtype=np.int64)
+    diff = df['traffic_diff'].to_numpy(dtype=np.float64)
+    grouped = pd.DataFrame({
+        'key': keys,
+        'traffic': traffic,
+        'prev_traffic': df['prev_traffic'].fillna(0).to_numpy(dtype=np.int64),
+        'traffic_share': df['traffic_share'].to_numpy(dtype=np.float64),
+        'traffic_diff': diff,
+        'weighted_diff': diff * traffic
+    }).groupby('key', sort=False).agg(
+        traffic=('traffic', 'sum'),
+        prev_traffic=('prev_traffic', 'sum'),
+        traffic_share=('traffic_share', 'sum'),
+        first_diff=('traffic_diff', 'first'),
+        weighted_diff=('weighted_diff', 'sum'),
+        members=('traffic', 'size'),
+        top=('traffic', 'idxmax')
+    )
+
+    total = grouped['traffic'].to_numpy(dtype=np.float64)
+    prev = grouped['prev_traffic'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rolled = np.where(prev > 0, np.round(total / prev - 1, 4),
+                          np.where(total > 0, grouped['weighted_diff'].to_numpy() / total, 0.0))
+    members = grouped['members'].to_numpy()
+    rolled = np.where(members == 1, grouped['first_diff'].to_numpy(), rolled)
+
+    # 缺失的 target 归为一组（键为 -1），结果中 target / brand 仍为缺失值
+    key_values = grouped.index.to_numpy()
+    known = key_values >= 0
+    target = np.full(len(grouped), None, dtype=object)
+    target[known] = np.asarray(domains, dtype=object)[key_values[known]]
+    brand = np.full(len(grouped), None, dtype=object)
+    brand[known] = brands[key_values[known]]
+
+    return pd.DataFrame({
+        'type': df['type'].to_numpy()[grouped['top'].to_numpy()],
+        'target': target,
+        'traffic': grouped['traffic'].to_numpy(),
+        'prev_traffic': grouped['prev_traffic'].to_numpy(),
+        'traffic_diff': rolled,
+        'traffic_share': grouped['traffic_share'].to_numpy(),
+        'brand': brand,
+        'members': members
+    })
+
+
+def apply_level(df: pd.DataFrame, level: str, use_cache: bool = True) -> pd.DataFrame:
+    """按分析粒度返回数据（'target' 原样返回，'domain' 按可注册域名汇总）"""
+    if level not in LEVELS:
+        raise ValueError(f"未知的分析粒度: {level}（可选 {' / '.join(LEVELS)}）")
+    return rollup(df, use_cache) if level == 'domain' else df
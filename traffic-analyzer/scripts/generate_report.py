@@ -11,39 +11,127 @@
     playwright install chromium  # 或使用系统 Chrome
 """
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import json
 import sys
 import os
-import asyncio
+import functools
+import hashlib
+import inspect
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
 
-# 设置中文字体和样式
-plt.rcParams['font.sans-serif'] = ['Heiti SC', 'PingFang SC', 'Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
-plt.rcParams['font.family'] = 'sans-serif'
-sns.set_style("whitegrid")
+from ai_matcher import AI_KEYWORDS, KeywordMatcher, ai_mask
+from chart_cache import ChartCache
+from chart_density import DENSITY_THRESHOLD, hexbin_traffic_growth, use_density
+from chart_output import chart_path, check_format, inline_svg, save_figure
+from domain_index import LEVELS, apply_level
+from pdf_export import PdfExporter
+from report_appendix import DEFAULT_ROWS_PER_PAGE, Appendix
+from traffic_cache import CACHE_DIR, read_csv_cached
+from traffic_history import TrafficHistory
+from traffic_rules import Evaluator, Profile, default_profile, load_profiles
+from traffic_stream import DEFAULT_CHUNKSIZE, StreamReducer, expand_shards, is_sharded, iter_chunks, reduce_shards
+from target_vocab import compact_target
+from traffic_trace import TRACE_FILE, Profiler, Tracer, peak_rss, reset_peak_rss
 
 # 脚本所在目录
 SCRIPT_DIR = Path(__file__).parent.absolute()
 SKILL_DIR = SCRIPT_DIR.parent
 TEMPLATE_DIR = SKILL_DIR / "assets"
 
+# 编译后的模板字节码缓存目录，新进程不再重新解析和编译模板
+TEMPLATE_CACHE_DIR = CACHE_DIR / 'templates'
+
+# 流式渲染时每累积多少段输出写一次文件
+RENDER_BUFFER_SIZE = 64
+
+# 图表样式（seaborn 主题和中文字体），同时计入图表缓存的指纹
+CHART_THEME = 'whitegrid'
+CHART_RC = {
+    'font.sans-serif': ['Heiti SC', 'PingFang SC', 'Arial Unicode MS', 'SimHei', 'DejaVu Sans'],
+    'axes.unicode_minus': False,
+    'font.family': 'sans-serif'
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """导入 matplotlib 并设置中文字体和样式（首次绘图时执行一次，不绘图的路径不导入）"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.rcParams.update(CHART_RC)
+    sns.set_style(CHART_THEME)
+    return plt
+
+
+@functools.lru_cache(maxsize=None)
+def _chart_style_key() -> bytes:
+    """图表样式和绘图库版本，任一变化时缓存的图表作废（只读包元数据，不导入 matplotlib）"""
+    from importlib import metadata
+
+    versions = {}
+    for package in ('matplotlib', 'seaborn'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return json.dumps({'theme': CHART_THEME, 'rc': CHART_RC, 'versions': versions},
+                      sort_keys=True).encode()
+
+
+def memoized(method):
+    """
+    分析结果缓存装饰器
+
+    按方法名和（补全默认值后的）参数缓存结果，替换 analyzer.df 后自动失效。
+    返回的是缓存对象本身，调用方不要原地修改
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__,) + tuple(bound.arguments.values())[1:]
+
+        if key in self._result_cache:
+            self._cache_hits[method.__name__] += 1
+            return self._result_cache[key]
+
+        self._cache_misses[method.__name__] += 1
+        result = method(self, *args, **kwargs)
+        self._result_cache[key] = result
+        return result
+
+    return wrapper
+
+
+def _report_reducer(rules: Profile = None) -> StreamReducer:
+    """报告的流式折叠规则（模块级函数，分片模式下在工作进程中调用；rules 用 functools.partial 传入）"""
+    rules = rules or default_profile()
+    return StreamReducer(
+        keep=[lambda c: c['traffic'] >= 30000, rules.candidates],
+        top=[('traffic', 20, None)],
+        sums={
+            'traffic': lambda c: int(c['traffic'].astype('int64').sum()),
+            'ai_traffic': lambda c: int(c.loc[ai_mask(c), 'traffic'].astype('int64').sum()),
+            'growth_sources': lambda c: int((c['traffic_diff'] > 0).sum())
+        }
+    )
+
 
 class TrafficAnalyzer:
     """流量数据分析类"""
 
-    # AI 工具关键词
-    AI_KEYWORDS = [
-        'ai', 'gpt', 'claude', 'openai', 'anthropic', 'midjourney',
-        'cursor', 'lovable', 'windsurf', 'suno', 'elevenlabs',
-        'runway', 'turboscribe', 'undetectable', 'manus', 'emergent',
-        'kling', 'higgsfield', 'hailuo', 'replit', 'blackbox', 'grok'
-    ]
+    # AI 工具关键词（与其他脚本共用，见 ai_matcher.py）
+    AI_KEYWORDS = AI_KEYWORDS
 
     # AI 工具分类映射
     AI_CATEGORIES = {
@@ -57,19 +145,120 @@ class TrafficAnalyzer:
         'undetectable': 'AI检测', 'turboscribe': 'AI转录',
         'grok': 'AI助手', 'chatgpt': 'AI助手', 'claude': 'AI助手'
     }
+    _CATEGORY_MATCHER = KeywordMatcher(AI_CATEGORIES)
+
+    def __init__(self, csv_path: str, chunksize: int = None, use_cache: bool = True, history=None,
+                 shard_workers: int = None, compact: bool = False, level: str = 'target',
+                 rules: Profile = None):
+        """
+        初始化分析器
+
+        Args:
+            csv_path: CSV 文件路径，或分片的 glob 模式 / 目录（总是流式读取）
+            chunksize: 指定时分块流式读取，self.df 只保留报告用到的行（流量>=3万、阈值方案入选的行及 TOP20），
+                       全量指标在读取时折叠计算
+            use_cache: 是否使用解析缓存（流式读取时不使用）
+            history: 多期历史库（TrafficHistory 或其目录），用于跨期趋势分析
+            shard_workers: 分片模式下并行折叠的进程数（默认 CPU 核数）
+            compact: target 列改为字典编码，关键词匹配只在去重后的词表上运行一次（见 target_vocab.py）；
+                     流式读取时候选集很小，不做转换
+            level: 分析粒度，'domain' 时按可注册域名汇总后分析（见 domain_index.py），
+                   只支持全量读取
+            rules: 阈值方案（AI 评级、机会区间、风险等级，见 traffic_rules.py），默认为内置方案
+        """
+        self._init_state(history, rules)
+
+        if is_sharded(csv_path):
+            self._load_streaming(csv_path, chunksize or DEFAULT_CHUNKSIZE, shard_workers)
+        elif chunksize:
+            self._load_streaming(csv_path, chunksize)
+        else:
+            df = apply_level(read_csv_cached(csv_path, use_cache), level, use_cache)
+            self.df = compact_target(df) if compact else df
+            self.total_traffic = self.df['traffic'].sum()
+            self.total_sources = len(self.df)
+
+    @classmethod
+    def from_reduced(cls, df: pd.DataFrame, total_traffic: int, total_sources: int,
+                     aggregates: dict, history=None, rules: Profile = None):
+        """
+        由候选集和全量汇总构造分析器（增量更新时使用）
+
+        Args:
+            df: 候选集，规则与流式读取相同（流量>=3万 及 TOP20）
+            aggregates: 全量汇总，键为 ai_traffic / growth_sources / type_stats
+        """
+        analyzer = cls.__new__(cls)
+        analyzer._init_state(history, rules)
+        analyzer.df = df
+        analyzer.total_traffic = total_traffic
+        analyzer.total_sources = total_sources
+        analyzer._aggregates = dict(aggregates)
+        return analyzer
+
+    def _init_state(self, history, rules=None):
+        if history is not None and not isinstance(history, TrafficHistory):
+            history = TrafficHistory(history)
+        self.history = history
+        self.rules = rules or default_profile()
+
+        self._df = None
+        self._aggregates = {}
+        self._result_cache = {}
+        self._cache_hits = Counter()
+        self._cache_misses = Counter()
+
+    def _load_streaming(self, csv_path: str, chunksize: int, workers: int = None):
+        """分块读取并折叠全量指标（分片在进程池中各自折叠后按顺序合并）"""
+        factory = functools.partial(_report_reducer, self.rules)
+        if is_sharded(csv_path):
+            reducer = reduce_shards(factory, expand_shards(csv_path), chunksize, workers)
+        else:
+            reducer = factory().consume(iter_chunks(csv_path, chunksize))
+
+        self.df = reducer.frame()
+        self.total_traffic = reducer.totals['traffic']
+        self.total_sources = reducer.total_rows
+        self._aggregates = {
+            'ai_traffic': reducer.totals['ai_traffic'],
+            'growth_sources': reducer.totals['growth_sources'],
+            'type_stats': reducer.type_stats()
+        }
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df
 
-    def __init__(self, csv_path: str):
-        """初始化分析器"""
-        self.df = pd.read_csv(csv_path)
-        self.total_traffic = self.df['traffic'].sum()
-        self.total_sources = len(self.df)
+    @df.setter
+    def df(self, value: pd.DataFrame):
+        """替换数据后清空分析结果缓存和流式汇总"""
+        self._df = value
+        self._aggregates = {}
+        self._result_cache.clear()
+
+    def cache_info(self) -> dict:
+        """分析结果缓存命中统计（按方法）"""
+        methods = sorted(set(self._cache_hits) | set(self._cache_misses))
+        return {
+            'hits': sum(self._cache_hits.values()),
+            'misses': sum(self._cache_misses.values()),
+            'size': len(self._result_cache),
+            'methods': {
+                name: {'hits': self._cache_hits[name], 'misses': self._cache_misses[name]}
+                for name in methods
+            }
+        }
 
+    @memoized
     def get_summary_metrics(self) -> dict:
         """获取核心指标"""
         ai_traffic = self._get_ai_traffic()
         ai_ratio = ai_traffic / self.total_traffic * 100
 
-        growth_sources = len(self.df[self.df['traffic_diff'] > 0])
+        if 'growth_sources' in self._aggregates:
+            growth_sources = self._aggregates['growth_sources']
+        else:
+            growth_sources = len(self.df[self.df['traffic_diff'] > 0])
         growth_ratio = growth_sources / self.total_sources * 100
 
         return {
@@ -79,24 +268,32 @@ class TrafficAnalyzer:
             'growth_ratio': growth_ratio
         }
 
+    @memoized
     def _get_ai_traffic(self) -> int:
         """计算AI工具总流量"""
-        ai_mask = (
-            self.df['type'].str.contains('ai', case=False, na=False) |
-            self.df['target'].str.contains('|'.join(self.AI_KEYWORDS), case=False, na=False)
-        )
-        return self.df[ai_mask]['traffic'].sum()
+        if 'ai_traffic' in self._aggregates:
+            return self._aggregates['ai_traffic']
+        return self.df[ai_mask(self.df)]['traffic'].sum()
+
+    @memoized
+    def get_type_stats(self) -> pd.DataFrame:
+        """按类型汇总，列为 type / traffic / share / count"""
+        if 'type_stats' in self._aggregates:
+            return self._aggregates['type_stats'].copy()
 
-    def analyze_by_type(self) -> list:
-        """按流量类型分析"""
         type_stats = self.df.groupby('type').agg({
             'traffic': 'sum',
             'traffic_share': 'sum',
             'target': 'count'
         }).reset_index()
-
         type_stats.columns = ['type', 'traffic', 'share', 'count']
-        type_stats = type_stats.sort_values('traffic', ascending=False)
+        return type_stats
+
+    @memoized
+    def analyze_by_type(self) -> list:
+        """按流量类型分析"""
+        type_stats = self.get_type_stats()
+        type_stats = type_stats.sort_values('traffic', ascending=False, kind='stable')
 
         # 类型说明映射
         type_notes = {
@@ -120,6 +317,7 @@ class TrafficAnalyzer:
 
         return results
 
+    @memoized
     def get_top_sources(self, n: int = 20) -> list:
         """获取TOP流量来源"""
         df_top = self.df.nlargest(n, 'traffic')
@@ -139,57 +337,55 @@ class TrafficAnalyzer:
 
         return results
 
-    def analyze_ai_tools(self, min_traffic: int = 50000) -> list:
-        """分析AI工具"""
-        ai_mask = (
-            self.df['type'].str.contains('ai', case=False, na=False) |
-            self.df['target'].str.contains('|'.join(self.AI_KEYWORDS), case=False, na=False)
-        )
-
-        df_ai = self.df[ai_mask & (self.df['traffic'] >= min_traffic)].copy()
-        df_ai = df_ai.sort_values('traffic', ascending=False)
-
-        results = []
-        for _, row in df_ai.iterrows():
-            target = row['target'].lower()
-
-            # 确定分类
-            category = 'AI工具'
-            for key, cat in self.AI_CATEGORIES.items():
-                if key in target:
-                    category = cat
-                    break
-
-            # 确定评级
-            growth = row['traffic_diff']
-            traffic = row['traffic']
-            if growth > 0.5 and traffic > 200000:
-                rating, rating_class = 'S级', 's'
-            elif growth > 0.2 or traffic > 500000:
-                rating, rating_class = 'A级', 'a'
-            else:
-                rating, rating_class = 'B级', 'b'
-
-            results.append({
-                'tool': row['target'],
-                'category': category,
-                'traffic': int(row['traffic']),
-                'growth': row['traffic_diff'],
-                'rating': rating,
-                'rating_class': rating_class
-            })
-
-        return results[:20]  # 返回前20个
-
-    def find_opportunities(self, min_traffic: int = 50000, max_traffic: int = 1000000, min_growth: float = 0.2) -> list:
-        """寻找高增长机会"""
-        df_opp = self.df[
-            (self.df['traffic'] >= min_traffic) &
-            (self.df['traffic'] <= max_traffic) &
-            (self.df['traffic_diff'] >= min_growth)
-        ].copy()
-
-        df_opp = df_opp.sort_values('traffic_diff', ascending=False)
+    @memoized
+    def analyze_ai_tools(self, min_traffic: int = None) -> list:
+        """分析AI工具（入选条件和评级见 ai_rating 规则集，min_traffic 不为 None 时替换规则中的流量下限）"""
+        rating = self.rules.ai_rating.override({('traffic', '>='): min_traffic})
+        df_ai = self.df[ai_mask(self.df) & rating.mask(self.df)].copy()
+        df_ai = df_ai.sort_values('traffic', ascending=False, kind='stable')
+
+        return self._records(self._classify_ai_tools(df_ai.head(20), self.rules))  # 返回前20个
+
+    @classmethod
+    def _classify_ai_tools(cls, df_ai: pd.DataFrame, rules: Profile = None) -> pd.DataFrame:
+        """
+        AI工具分类与评级（向量化）
+
+        分类取 AI_CATEGORIES 中按顺序第一个命中的关键词，未命中为 'AI工具'；
+        评级按 ai_rating 规则集的 tiers（内置方案：增长>50%且流量>20万为S级，增长>20%或流量>50万为A级，其余为B级）
+        """
+        keys = cls._CATEGORY_MATCHER.find_first(df_ai['target'])
+        category = keys.map(cls.AI_CATEGORIES).fillna('AI工具')
+
+        rating = (rules or default_profile()).ai_rating
+        evaluator = Evaluator(df_ai)
+        return pd.DataFrame({
+            'tool': df_ai['target'].to_numpy(dtype=object),
+            'category': category.to_numpy(dtype=object),
+            'traffic': df_ai['traffic'].astype('int64').to_numpy(),
+            'growth': df_ai['traffic_diff'].to_numpy(),
+            'rating': rating.classify(evaluator, 'label'),
+            'rating_class': rating.classify(evaluator, 'class')
+        })
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> list:
+        """数据框批量转为字典列表（同 to_dict('records')，值为 Python 原生类型，速度更快）"""
+        columns = list(frame.columns)
+        values = [frame[c].to_numpy().tolist() for c in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    @memoized
+    def find_opportunities(self, min_traffic: int = None, max_traffic: int = None, min_growth: float = None) -> list:
+        """寻找高增长机会（区间见 opportunity 规则集，与 analyze_traffic.py 共用；参数不为 None 时替换规则中的对应阈值）"""
+        opportunity = self.rules.opportunity.override({
+            ('traffic', '>='): min_traffic,
+            ('traffic', '<='): max_traffic,
+            ('traffic_diff', '>='): min_growth
+        })
+        df_opp = self.df[opportunity.mask(self.df)].copy()
+
+        df_opp = df_opp.sort_values('traffic_diff', ascending=False, kind='stable')
 
         results = []
         for _, row in df_opp.iterrows():
@@ -202,56 +398,254 @@ class TrafficAnalyzer:
 
         return results[:20]
 
-    def find_risk_items(self, min_traffic: int = 100000, max_decline: float = -0.15) -> list:
-        """寻找下行风险标的"""
-        df_risk = self.df[
-            (self.df['traffic'] >= min_traffic) &
-            (self.df['traffic_diff'] <= max_decline)
-        ].copy()
+    @memoized
+    def get_trend_metrics(self, months: int = 12, momentum_months: int = 3, min_traffic: int = 0) -> pd.DataFrame:
+        """
+        最近 months 期的跨期趋势指标（来自历史库，不重新读取历史 CSV）
+
+        列为 target / type / first_period / last_period / observed / first_traffic / last_traffic /
+        cagr / momentum / streak，含义见 traffic_history.compute_trend_metrics
+        """
+        if self.history is None:
+            raise ValueError('未配置历史库，无法进行跨期趋势分析')
+        return self.history.trend_metrics(months, momentum_months, min_traffic)
+
+    @memoized
+    def analyze_trends(self, n: int = 20, min_traffic: int = 50000, months: int = 12) -> list:
+        """跨期增长排行：最近一期流量达标的来源按年化复合增长率排序"""
+        trends = self.get_trend_metrics(months, min_traffic=min_traffic)
+        trends = trends[trends['cagr'].notna()]
+        trends = trends.sort_values('cagr', ascending=False, kind='stable').head(n)
 
-        df_risk = df_risk.sort_values('traffic_diff')
+        return [
+            {
+                'name': target,
+                'type': type_name,
+                'traffic': int(traffic),
+                'periods': f'{first}~{last}',
+                'cagr': cagr,
+                'momentum': None if np.isnan(momentum) else momentum,
+                'streak': int(streak)
+            }
+            for target, type_name, traffic, first, last, cagr, momentum, streak in zip(
+                trends['target'], trends['type'], trends['last_traffic'], trends['first_period'],
+                trends['last_period'], trends['cagr'].tolist(), trends['momentum'].tolist(), trends['streak']
+            )
+        ]
 
-        results = []
-        for _, row in df_risk.head(10).iterrows():
-            decline = row['traffic_diff']
-            if decline < -0.25:
-                risk_level = '高'
-            elif decline < -0.2:
-                risk_level = '中等'
-            else:
-                risk_level = '关注'
+    @memoized
+    def find_risk_items(self, min_traffic: int = None, max_decline: float = None) -> list:
+        """寻找下行风险标的（入选条件和风险等级见 risk 规则集；参数不为 None 时替换规则中的对应阈值）"""
+        risk = self.rules.risk.override({('traffic', '>='): min_traffic, ('traffic_diff', '<='): max_decline})
+        df_risk = self.df[risk.mask(self.df)]
+        df_risk = df_risk.sort_values('traffic_diff', kind='stable').head(10)
 
-            results.append({
-                'name': row['target'],
-                'traffic': int(row['traffic']),
-                'growth': row['traffic_diff'],
+        return [
+            {
+                'name': target,
+                'traffic': int(traffic),
+                'growth': growth,
                 'risk_level': risk_level
-            })
-
-        return results
+            }
+            for target, traffic, growth, risk_level in zip(
+                df_risk['target'], df_risk['traffic'], df_risk['traffic_diff'].tolist(),
+                self.rules.risk.classify(df_risk).tolist()
+            )
+        ]
 
 
 class ChartGenerator:
     """图表生成类"""
 
-    def __init__(self, df: pd.DataFrame, output_dir: Path):
+    # 图表名 -> 绘图方法，generate_all 按此顺序返回
+    CHARTS = {
+        'traffic_distribution': '_plot_traffic_distribution',
+        'top20_sources': '_plot_top_sources',
+        'ai_tools': '_plot_ai_tools',
+        'growth_quadrant': '_plot_growth_quadrant',
+        'opportunities': '_plot_opportunities'
+    }
+
+    # 图表名 -> 输出文件名（不含格式后缀）
+    FILES = {
+        'traffic_distribution': '01_traffic_distribution',
+        'top20_sources': '02_top20_sources',
+        'ai_tools': '03_ai_tools_comparison',
+        'growth_quadrant': '04_growth_quadrant',
+        'opportunities': '05_high_growth_opportunities'
+    }
+
+    # 绘图用到的列，并行渲染时只传输这些列
+    CHART_COLUMNS = ['type', 'target', 'traffic', 'traffic_diff']
+
+    DEFAULT_DPI = 200
+
+    def __init__(self, df: pd.DataFrame, output_dir: Path, type_traffic: pd.Series = None,
+                 workers: int = 1, executor: ProcessPoolExecutor = None,
+                 cache: ChartCache = None, dpi: int = DEFAULT_DPI, fmt: str = 'png',
+                 density_threshold: int = DENSITY_THRESHOLD, tracer: Tracer = None,
+                 rules: Profile = None):
+        """
+        Args:
+            df: 数据框
+            output_dir: 输出目录
+            type_traffic: 各类型总流量（流式加载时 df 只是候选子集，需传入全量汇总）
+            workers: 并行渲染的进程数，1 为串行
+            executor: 复用已有的进程池（见 create_chart_executor），优先于 workers
+            cache: 图表缓存，指纹相同的图表不再渲染；None 为不使用缓存
+            dpi: 图片分辨率（SVG 中只影响栅格化的散点图层）
+            fmt: 图片格式，png / webp / svg（见 chart_output）
+            density_threshold: 增长象限图点数超过此值时改画密度图，0 为始终画散点
+            tracer: 耗时追踪器，记录每张图的渲染耗时
+            rules: 阈值方案，AI 工具图和机会图的入选条件与报告一致（默认为内置方案）
+        """
         self.df = df
+        self.type_traffic = type_traffic
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
-
-    def generate_all(self) -> dict:
-        """生成所有图表"""
+        self.workers = workers
+        self.executor = executor
+        self.cache = cache
+        self.dpi = dpi
+        self.fmt = check_format(fmt)
+        self.density_threshold = density_threshold
+        self.tracer = tracer or Tracer(enabled=False)
+        self.rules = rules or default_profile()
+
+        # 本次各图表的 {'fingerprint', 'path'}，实际重新渲染的图表，以及从缓存取得的图表
+        self.chart_state = {}
+        self.rendered = []
+        self.cached = []
+
+    def generate_all(self, previous: dict = None) -> dict:
+        """
+        生成所有图表
+
+        Args:
+            previous: 上一次的 chart_state，输入指纹未变且图片仍在的图表直接复用
+        """
+        with self.tracer.span('chart_fingerprints'):
+            fingerprints = {name: self.chart_fingerprint(name) for name in self.CHARTS}
         charts = {}
-        charts['traffic_distribution'] = self._plot_traffic_distribution()
-        charts['top20_sources'] = self._plot_top_sources()
-        charts['ai_tools'] = self._plot_ai_tools()
-        charts['growth_quadrant'] = self._plot_growth_quadrant()
-        charts['opportunities'] = self._plot_opportunities()
-        return charts
+        for name, entry in (previous or {}).items():
+            if (name in fingerprints and entry.get('fingerprint') == fingerprints[name]
+                    and Path(entry.get('path', '')).exists()):
+                charts[name] = entry['path']
+        pending = [name for name in self.CHARTS if name not in charts]
+
+        cached = []
+        if self.cache is not None:
+            with self.tracer.span('chart_cache'):
+                for name in pending:
+                    if self.cache.fetch(fingerprints[name], self._output_path(name)):
+                        charts[name] = str(self._output_path(name))
+                        cached.append(name)
+            pending = [name for name in pending if name not in charts]
+
+        # 输出目录中的旧图片可能是缓存文件的硬链接，先断开再写，避免改写缓存
+        for name in pending:
+            self._output_path(name).unlink(missing_ok=True)
+
+        rendered = None
+        if pending and (self.executor is not None or self.workers > 1):
+            try:
+                rendered = self._generate_parallel(pending)
+            except (BrokenProcessPool, OSError) as e:
+                print(f"  - 并行渲染失败（{e}），改为串行渲染")
+        if rendered is None:
+            rendered = {}
+            for name in pending:
+                with self.tracer.span(f'chart:{name}', category='chart'):
+                    rendered[name] = getattr(self, self.CHARTS[name])()
+        charts.update(rendered)
+
+        if self.cache is not None and rendered:
+            for name, path in rendered.items():
+                self.cache.store(fingerprints[name], path)
+            self.cache.evict()
+
+        self.rendered = pending
+        self.cached = cached
+        self.chart_state = {
+            name: {'fingerprint': fingerprints[name], 'path': charts[name]} for name in self.CHARTS
+        }
+        return {name: charts[name] for name in self.CHARTS}
+
+    def chart_fingerprint(self, name: str) -> str:
+        """图表输入的指纹：数据切片（各类型流量图为类型汇总）、绘图方法、样式和分辨率"""
+        if name == 'traffic_distribution':
+            data = self._get_type_traffic().sort_index().reset_index()
+        else:
+            data = self._chart_data(name)
+        digest = hashlib.sha256(self.CHARTS[name].encode())
+        digest.update(f'{self._output_path(name).name}:{self.dpi}'.encode())
+        if name == 'growth_quadrant':
+            digest.update(f'density:{use_density(len(data), self.density_threshold)}'.encode())
+        if name == 'opportunities':
+            digest.update(f'label:{self.rules.opportunity.label}'.encode())
+        digest.update(_chart_style_key())
+        digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def _output_path(self, name: str) -> Path:
+        return chart_path(self.output_dir, self.FILES[name], self.fmt)
+
+    def _generate_parallel(self, names: list) -> dict:
+        """多进程渲染，每个进程一张图，只传输该图用到的数据切片"""
+        executor = self.executor or create_chart_executor(min(self.workers, len(names)))
+        try:
+            futures = {
+                name: executor.submit(_render_chart, self.CHARTS[name], self._chart_data(name),
+                                      self.output_dir, self._get_type_traffic(), self.dpi, self.fmt,
+                                      self.density_threshold, self.rules)
+                for name in names
+            }
+            rendered = {}
+            for name, future in futures.items():
+                path, start, seconds, pid, peak = future.result()
+                self.tracer.add_span(f'chart:{name}', start, seconds, pid, category='chart', peak=peak)
+                rendered[name] = path
+            return rendered
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+
+    def _chart_data(self, name: str) -> pd.DataFrame:
+        """图表实际用到的数据切片；在切片上重新选取的结果与在全量上相同"""
+        selectors = {
+            'traffic_distribution': lambda: self.df.iloc[:0],
+            'top20_sources': self._select_top_sources,
+            'ai_tools': self._select_ai_tools,
+            'growth_quadrant': self._select_growth_quadrant,
+            'opportunities': self._select_opportunities
+        }
+        return selectors[name]()[self.CHART_COLUMNS]
+
+    def _get_type_traffic(self) -> pd.Series:
+        """各类型总流量"""
+        if self.type_traffic is not None:
+            return self.type_traffic
+        return self.df.groupby('type')['traffic'].sum()
+
+    def _select_top_sources(self, n: int = 20) -> pd.DataFrame:
+        return self.df.nlargest(n, 'traffic')
+
+    def _select_ai_tools(self) -> pd.DataFrame:
+        df_ai = self.df[ai_mask(self.df) & self.rules.ai_rating.mask(self.df)]
+        return df_ai.nlargest(20, 'traffic')
+
+    def _select_growth_quadrant(self) -> pd.DataFrame:
+        return self.df[self.df['traffic'] > 30000]
+
+    def _select_opportunities(self) -> pd.DataFrame:
+        df_opp = self.df[self.rules.opportunity.mask(self.df)]
+        return df_opp.nlargest(15, 'traffic_diff')
 
     def _plot_traffic_distribution(self) -> str:
         """流量类型分布图"""
-        type_stats = self.df.groupby('type')['traffic'].sum().sort_values(ascending=False)
+        plt = _pyplot()
+
+        type_stats = self._get_type_traffic().sort_values(ascending=False)
 
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 
@@ -274,14 +668,15 @@ class ChartGenerator:
                     f'{val/1e6:.1f}M', ha='center', va='bottom', fontsize=9)
 
         plt.tight_layout()
-        output_file = self.output_dir / '01_traffic_distribution.png'
-        plt.savefig(output_file, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        output_file = self._output_path('traffic_distribution')
+        save_figure(plt, output_file, self.fmt, self.dpi, facecolor='white')
         return str(output_file)
 
     def _plot_top_sources(self, n: int = 20) -> str:
         """TOP流量来源图"""
-        df_top = self.df.nlargest(n, 'traffic')
+        plt = _pyplot()
+
+        df_top = self._select_top_sources(n)
 
         fig, ax = plt.subplots(figsize=(12, 10))
 
@@ -301,22 +696,15 @@ class ChartGenerator:
                    f' {sign}{diff*100:.1f}%', va='center', fontsize=9)
 
         plt.tight_layout()
-        output_file = self.output_dir / '02_top20_sources.png'
-        plt.savefig(output_file, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        output_file = self._output_path('top20_sources')
+        save_figure(plt, output_file, self.fmt, self.dpi, facecolor='white')
         return str(output_file)
 
     def _plot_ai_tools(self) -> str:
         """AI工具对比图"""
-        ai_keywords = TrafficAnalyzer.AI_KEYWORDS
-
-        ai_mask = (
-            self.df['type'].str.contains('ai', case=False, na=False) |
-            self.df['target'].str.contains('|'.join(ai_keywords), case=False, na=False)
-        )
+        plt = _pyplot()
 
-        df_ai = self.df[ai_mask & (self.df['traffic'] > 50000)].copy()
-        df_ai = df_ai.nlargest(20, 'traffic')
+        df_ai = self._select_ai_tools()
 
         fig, ax = plt.subplots(figsize=(12, 10))
 
@@ -357,27 +745,34 @@ class ChartGenerator:
         ax.legend(handles=legend_elements, loc='lower right')
 
         plt.tight_layout()
-        output_file = self.output_dir / '03_ai_tools_comparison.png'
-        plt.savefig(output_file, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        output_file = self._output_path('ai_tools')
+        save_figure(plt, output_file, self.fmt, self.dpi, facecolor='white')
         return str(output_file)
 
     def _plot_growth_quadrant(self) -> str:
         """增长象限图"""
-        df_filtered = self.df[self.df['traffic'] > 30000].copy()
+        plt = _pyplot()
+
+        df_filtered = self._select_growth_quadrant()
 
         fig, ax = plt.subplots(figsize=(12, 10))
 
-        scatter = ax.scatter(
-            df_filtered['traffic'],
-            df_filtered['traffic_diff'] * 100,
-            alpha=0.6,
-            s=60,
-            c=df_filtered['traffic_diff'] * 100,
-            cmap='RdYlGn',
-            vmin=-50,
-            vmax=100
-        )
+        # 点数过多时画密度图，绘制耗时与行数无关
+        density = use_density(len(df_filtered), self.density_threshold)
+        if density:
+            layer = hexbin_traffic_growth(ax, df_filtered['traffic'], df_filtered['traffic_diff'] * 100)
+        else:
+            layer = ax.scatter(
+                df_filtered['traffic'],
+                df_filtered['traffic_diff'] * 100,
+                alpha=0.6,
+                s=60,
+                c=df_filtered['traffic_diff'] * 100,
+                cmap='RdYlGn',
+                vmin=-50,
+                vmax=100,
+                rasterized=self.fmt == 'svg'
+            )
 
         ax.set_xlabel('流量规模', fontsize=12)
         ax.set_ylabel('增长率 (%)', fontsize=12)
@@ -392,13 +787,18 @@ class ChartGenerator:
             (df_filtered['traffic'] > 100000)
         ].head(10)
 
+        # 密度图中重点产品单独描点，标注才有落点
+        if density:
+            ax.scatter(highlight['traffic'], highlight['traffic_diff'] * 100,
+                       s=40, color='#ef4444', edgecolors='white', linewidths=0.8, zorder=3)
+
         for _, row in highlight.iterrows():
             ax.annotate(row['target'],
                        (row['traffic'], row['traffic_diff'] * 100),
                        fontsize=8, alpha=0.8,
                        xytext=(5, 5), textcoords='offset points')
 
-        plt.colorbar(scatter, ax=ax, label='增长率 (%)')
+        plt.colorbar(layer, ax=ax, label='来源数' if density else '增长率 (%)')
 
         # 象限标注
         ax.text(0.95, 0.95, '高流量+高增长\n(最佳机会)', transform=ax.transAxes,
@@ -407,20 +807,15 @@ class ChartGenerator:
                ha='left', va='top', fontsize=10, color='blue', alpha=0.7)
 
         plt.tight_layout()
-        output_file = self.output_dir / '04_growth_quadrant.png'
-        plt.savefig(output_file, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        output_file = self._output_path('growth_quadrant')
+        save_figure(plt, output_file, self.fmt, self.dpi, facecolor='white')
         return str(output_file)
 
     def _plot_opportunities(self) -> str:
         """高增长机会图"""
-        df_opp = self.df[
-            (self.df['traffic'] >= 50000) &
-            (self.df['traffic'] <= 1500000) &
-            (self.df['traffic_diff'] >= 0.2)
-        ].copy()
+        plt = _pyplot()
 
-        df_opp = df_opp.nlargest(15, 'traffic_diff')
+        df_opp = self._select_opportunities()
 
         fig, ax = plt.subplots(figsize=(12, 8))
 
@@ -430,7 +825,8 @@ class ChartGenerator:
         ax.set_yticks(range(len(df_opp)))
         ax.set_yticklabels(df_opp['target'].values)
         ax.set_xlabel('增长率 (%)', fontsize=12)
-        ax.set_title('高增长机会标的 (流量5万-150万)', fontsize=14, fontweight='bold')
+        label = self.rules.opportunity.label
+        ax.set_title(f'高增长机会标的 ({label})' if label else '高增长机会标的', fontsize=14, fontweight='bold')
         ax.invert_yaxis()
 
         # 添加流量标签
@@ -439,39 +835,127 @@ class ChartGenerator:
                    f'{traffic/1000:.0f}K', va='center', fontsize=9, color='gray')
 
         plt.tight_layout()
-        output_file = self.output_dir / '05_high_growth_opportunities.png'
-        plt.savefig(output_file, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        output_file = self._output_path('opportunities')
+        save_figure(plt, output_file, self.fmt, self.dpi, facecolor='white')
         return str(output_file)
 
 
+def create_chart_executor(workers: int) -> ProcessPoolExecutor:
+    """创建图表渲染进程池，可在多份报告之间复用"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_chart_worker)
+
+
+def _init_chart_worker():
+    """渲染进程只用 Agg 后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_chart(method: str, df: pd.DataFrame, output_dir: Path, type_traffic: pd.Series,
+                  dpi: int = ChartGenerator.DEFAULT_DPI, fmt: str = 'png',
+                  density_threshold: int = DENSITY_THRESHOLD, rules: Profile = None) -> tuple:
+    """
+    在渲染进程中绘制单张图表
+
+    Returns:
+        (图片路径, 开始时间, 耗时秒, 进程号, 内存峰值字节)，计时交给主进程的追踪器记录
+    """
+    reset_peak_rss()
+    start = time.perf_counter()
+    chart_gen = ChartGenerator(df, output_dir, type_traffic, dpi=dpi, fmt=fmt,
+                               density_threshold=density_threshold, rules=rules)
+    path = getattr(chart_gen, method)()
+    return path, start, time.perf_counter() - start, os.getpid(), peak_rss()
+
+
+@functools.lru_cache(maxsize=None)
+def load_template(name: str = 'report_template.html'):
+    """加载报告模板，同一进程内缓存；编译结果写入字节码缓存，模板修改后自动失效"""
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    try:
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+    except OSError as e:
+        print(f"Warning: template cache unavailable: {e}", file=sys.stderr)
+        bytecode_cache = None
+
+    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)), bytecode_cache=bytecode_cache)
+    return env.get_template(name)
+
+
 class ReportGenerator:
     """报告生成类"""
 
-    def __init__(self, analyzer: TrafficAnalyzer, output_dir: Path):
+    def __init__(self, analyzer: TrafficAnalyzer, output_dir: Path, pdf_exporter: PdfExporter = None,
+                 appendix: Appendix = None, tracer: Tracer = None):
+        """
+        Args:
+            analyzer: 数据分析器
+            output_dir: 输出目录
+            pdf_exporter: 常驻浏览器的 PDF 导出器，批量生成报告时复用；为空时每次临时启动
+            appendix: 全量排名附录，报告中链接到附录目录页，导出 PDF 时附录单独分页导出
+            tracer: 耗时追踪器
+        """
         self.analyzer = analyzer
         self.output_dir = output_dir
+        self.pdf_exporter = pdf_exporter
+        self.appendix = appendix
+        self.tracer = tracer or Tracer(enabled=False)
+        self.appendix_info = None
+        if appendix is not None:
+            with self.tracer.span('appendix'):
+                self.appendix_info = appendix.write_html()
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        # 加载模板
-        self.env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
-        self.template = self.env.get_template('report_template.html')
+        # 加载模板（同一进程内只解析一次）
+        self.template = load_template()
+        self.env = self.template.environment
 
     def generate(self, charts: dict) -> Path:
         """生成完整报告"""
-        # 准备模板数据
-        data = self._prepare_data(charts)
-
         # 渲染 HTML
-        html_content = self.template.render(**data)
-        html_path = self.output_dir / 'report.html'
-        html_path.write_text(html_content, encoding='utf-8')
+        with self.tracer.span('render_html'):
+            html_path = self.render_html(charts)
 
         # 转换为 PDF
-        pdf_path = self._convert_to_pdf(html_path)
+        with self.tracer.span('pdf'):
+            pdf_path = self._convert_to_pdf(html_path)
 
         return pdf_path
 
+    def render_html(self, charts: dict, data: dict = None) -> Path:
+        """渲染 HTML 报告（边渲染边写入文件，不在内存中拼出整份 HTML）"""
+        # 准备模板数据
+        if data is None:
+            with self.tracer.span('prepare_data'):
+                data = self._prepare_data(charts)
+
+        html_path = self.output_dir / 'report.html'
+        tmp_path = html_path.with_name(f'{html_path.name}.{os.getpid()}.tmp')
+        stream = self.template.stream(**data)
+        stream.enable_buffering(RENDER_BUFFER_SIZE)
+        try:
+            stream.dump(str(tmp_path), encoding='utf-8')
+            os.replace(tmp_path, html_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return html_path
+
+    def content_fingerprint(self, charts: dict, chart_state: dict) -> str:
+        """报告内容指纹：模板数据和各图表的输入指纹，用于判断报告是否需要重新生成"""
+        payload = {
+            'data': self._prepare_data(charts),
+            'charts': {name: entry['fingerprint'] for name, entry in chart_state.items()}
+        }
+        text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def pdf_path(self) -> Path:
+        """PDF 报告路径"""
+        return self.output_dir / f'report_{datetime.now().strftime("%Y%m%d")}.pdf'
+
     def _prepare_data(self, charts: dict) -> dict:
         """准备模板数据"""
         metrics = self.analyzer.get_summary_metrics()
@@ -513,8 +997,9 @@ class ReportGenerator:
             # 核心观点
             'core_points': self._get_core_points(),
 
-            # 图表路径
+            # 图表路径，SVG 图表另外提供可直接内嵌的 <svg> 元素
             'charts': charts,
+            'inline_charts': self._inline_charts(charts),
 
             # 流量类型分析
             'traffic_by_type': self.analyzer.analyze_by_type(),
@@ -535,6 +1020,12 @@ class ReportGenerator:
             # 风险提示
             'risk_items': self.analyzer.find_risk_items(),
 
+            # 全量附录（index 为附录目录页的相对链接）
+            'appendix': self.appendix_info,
+
+            # 跨期趋势（配置了历史库时）
+            'trend_leaders': self.analyzer.analyze_trends() if self.analyzer.history else [],
+
             # 数据局限性
             'data_caveats': [
                 '本数据仅反映经Stripe支付的流量，不包含其他支付渠道（如PayPal、国内支付）',
@@ -555,6 +1046,16 @@ class ReportGenerator:
 
         return data
 
+    @staticmethod
+    def _inline_charts(charts: dict) -> dict:
+        """SVG 图表的内嵌标记，模板中用 {{ inline_charts.name }} 输出（非 SVG 图表不在其中）"""
+        from markupsafe import Markup
+
+        return {
+            name: Markup(inline_svg(path))
+            for name, path in charts.items() if str(path).endswith('.svg')
+        }
+
     def _get_highlight_text(self) -> str:
         """获取封面高亮文本"""
         ai_tools = self.analyzer.analyze_ai_tools()
@@ -673,90 +1174,245 @@ class ReportGenerator:
         ]
 
     def _convert_to_pdf(self, html_path: Path) -> Path:
-        """使用 Playwright 将 HTML 转换为 PDF"""
-        pdf_path = self.output_dir / f'report_{datetime.now().strftime("%Y%m%d")}.pdf'
-
-        async def convert():
-            try:
-                from playwright.async_api import async_playwright
-            except ImportError:
-                print("警告: playwright 未安装，跳过 PDF 生成")
-                print("安装方法: pip install playwright && playwright install chromium")
-                return None
-
-            async with async_playwright() as p:
-                # 尝试使用系统 Chrome
-                try:
-                    browser = await p.chromium.launch(channel="chrome", headless=True)
-                except:
-                    # 回退到 chromium
-                    browser = await p.chromium.launch(headless=True)
-
-                page = await browser.new_page()
-                await page.goto(f'file://{html_path.absolute()}')
-                await page.wait_for_timeout(1000)  # 等待渲染
-
-                await page.pdf(
-                    path=str(pdf_path),
-                    format='A4',
-                    print_background=True,
-                    margin={'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'}
-                )
-
-                await browser.close()
-                return pdf_path
-
-        result = asyncio.run(convert())
-        if result:
-            print(f"PDF 报告已生成: {result}")
-        return result or html_path
+        """使用 Playwright 将 HTML 转换为 PDF（有常驻导出器时复用其浏览器）"""
+        pdf_path = self.pdf_path()
+
+        exporter = self.pdf_exporter or PdfExporter()
+        try:
+            exporter.convert(html_path, pdf_path)
+            if self.appendix is not None:
+                print(f"附录 PDF 已生成: {self.appendix.export_pdf(exporter)}")
+        except ImportError:
+            print("警告: playwright 未安装，跳过 PDF 生成")
+            print("安装方法: pip install playwright && playwright install chromium")
+            return html_path
+        finally:
+            if exporter is not self.pdf_exporter:
+                exporter.close()
+
+        print(f"PDF 报告已生成: {pdf_path}")
+        return pdf_path
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if len(args) < 1:
         print("流量分析报告生成工具")
         print("\n使用方法:")
-        print("  python generate_report.py <csv_file> [output_dir]")
+        print("  python generate_report.py <csv_file> [output_dir] [--stream] [--chunksize=N] [--no-cache] [--chart-workers=N] [--chart-format=png|webp|svg] [--dpi=N] [--density-threshold=N] [--appendix[=N]] [--history=DIR] [--incremental] [--shard-workers=N] [--compact-target] [--level=target|domain] [--rules=FILE] [--rule-profile=NAME] [--trace] [--profile[=cprofile|pyinstrument]]")
         print("\n参数说明:")
-        print("  csv_file   - SEMrush 流量数据 CSV 文件路径")
+        print("  csv_file   - SEMrush 流量数据 CSV 文件路径，或分片的 glob 模式（加引号）/ 目录")
         print("  output_dir - 输出目录（可选，默认为 ./outputs）")
+        print("  --stream       - 分块流式读取（适合超大文件）")
+        print(f"  --chunksize=N  - 流式读取的每块行数（默认 {DEFAULT_CHUNKSIZE}）")
+        print("  --no-cache     - 不读写解析缓存和图表缓存")
+        print("  --shard-workers=N - csv_file 为分片时并行折叠的进程数（默认 CPU 核数）")
+        print("  --compact-target  - target 列字典编码，AI 关键词匹配和分类只在去重后的域名上运行一次")
+        print("  --level=domain    - 按可注册域名汇总后分析（app.x.dev、www.x.dev 合并为 x.dev），不支持流式读取和分片")
+        print("  --rules=FILE      - 阈值规则文件（JSON / YAML，见 traffic_rules.py）：AI 评级、机会区间、风险等级")
+        print("  --rule-profile=NAME - 使用规则文件中的哪个方案（文件中只有一个方案时可省略）")
+        print("  --chart-workers=N - 并行渲染图表的进程数（默认 1，串行）")
+        print("  --chart-format=F  - 图表格式: png（默认）、webp（体积小）、svg（矢量，内嵌到 HTML）")
+        print(f"  --dpi=N           - 图表分辨率（默认 {ChartGenerator.DEFAULT_DPI}）")
+        print(f"  --density-threshold=N - 增长象限图超过 N 个点时改画密度图（默认 {DENSITY_THRESHOLD}，0 为始终画散点）")
+        print(f"  --appendix[=N]  - 附加全部来源的流量排名，每页 N 行（默认 {DEFAULT_ROWS_PER_PAGE}）分页输出到 appendix/")
+        print("  --history=DIR  - 多期历史库目录（traffic_history.py 入库），报告中加入跨期趋势")
+        print("  --incremental  - 与同一输出目录上一次的数据比对，只按变化的行更新汇总，")
+        print("                   输入未变的图表和报告不重新生成（忽略 --stream）")
+        print(f"  --trace        - 在输出目录写出各阶段耗时和内存峰值（{TRACE_FILE}，Chrome trace 格式）")
+        print("  --profile[=M]  - 剖析整个流程: cprofile（默认，输出 profile.prof）或 pyinstrument（输出 profile.html）")
         print("\n示例:")
         print("  python generate_report.py traffic_data.csv")
         print("  python generate_report.py traffic_data.csv ./reports")
+        print("  python generate_report.py 'exports/2024-*.csv' ./reports --shard-workers=4")
+        sys.exit(1)
+
+    csv_path = args[0]
+    output_dir = Path(args[1]) if len(args) > 1 else Path('./outputs')
+
+    chunksize = None
+    chart_workers = 1
+    chart_format = 'png'
+    dpi = ChartGenerator.DEFAULT_DPI
+    density_threshold = DENSITY_THRESHOLD
+    appendix_rows = None
+    shard_workers = None
+    profile_mode = None
+    history = None
+    level = 'target'
+    rules_path = None
+    profile_names = None
+    use_cache = '--no-cache' not in options
+    for option in options:
+        if option == '--stream':
+            chunksize = chunksize or DEFAULT_CHUNKSIZE
+        elif option.startswith('--chunksize='):
+            chunksize = int(option.split('=', 1)[1])
+        elif option.startswith('--chart-workers='):
+            chart_workers = int(option.split('=', 1)[1])
+        elif option.startswith('--chart-format='):
+            chart_format = option.split('=', 1)[1]
+        elif option.startswith('--dpi='):
+            dpi = int(option.split('=', 1)[1])
+        elif option.startswith('--density-threshold='):
+            density_threshold = int(option.split('=', 1)[1])
+        elif option == '--appendix':
+            appendix_rows = DEFAULT_ROWS_PER_PAGE
+        elif option.startswith('--appendix='):
+            appendix_rows = int(option.split('=', 1)[1])
+        elif option.startswith('--history='):
+            history = option.split('=', 1)[1]
+        elif option.startswith('--shard-workers='):
+            shard_workers = int(option.split('=', 1)[1])
+        elif option.startswith('--level='):
+            level = option.split('=', 1)[1]
+        elif option.startswith('--rules='):
+            rules_path = option.split('=', 1)[1]
+        elif option.startswith('--rule-profile='):
+            profile_names = [option.split('=', 1)[1]]
+        elif option == '--profile':
+            profile_mode = 'cprofile'
+        elif option.startswith('--profile='):
+            profile_mode = option.split('=', 1)[1]
+
+    try:
+        check_format(chart_format)
+        profiler = Profiler(profile_mode) if profile_mode else None
+        shards = expand_shards(csv_path) if is_sharded(csv_path) else None
+        profiles = load_profiles(rules_path, profile_names)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
-    csv_path = sys.argv[1]
-    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('./outputs')
+    if shards is not None and '--incremental' in options:
+        print("Error: --incremental 不支持分片输入，请指定单个 CSV 文件")
+        sys.exit(1)
+    if len(profiles) > 1:
+        print(f"Error: 规则文件中有多个方案，请用 --rule-profile 指定（可选 {' / '.join(p.name for p in profiles)}）")
+        sys.exit(1)
+    rules = profiles[0]
+    if level not in LEVELS:
+        print(f"Error: 未知的分析粒度 {level}（可选 {' / '.join(LEVELS)}）")
+        sys.exit(1)
+    if level != 'target' and (shards is not None or (chunksize and '--incremental' not in options)):
+        # 汇总后的流量才能判断阈值，逐块筛选候选集的方式不适用
+        print("Error: --level=domain 不支持流式读取和分片输入")
+        sys.exit(1)
 
     print(f"正在分析数据: {csv_path}")
+    if shards is not None:
+        print(f"  - {len(shards)} 个分片，分块折叠后合并")
     print(f"输出目录: {output_dir}")
 
+    tracer = Tracer()
+    if profiler is not None:
+        profiler.start()
+
     # 1. 加载数据并分析
     print("\n[1/4] 加载并分析数据...")
-    analyzer = TrafficAnalyzer(csv_path)
-    metrics = analyzer.get_summary_metrics()
+    state = None
+    with tracer.span('load'):
+        if '--incremental' in options:
+            from traffic_incremental import STATE_DIR_NAME, IncrementalState
+
+            state = IncrementalState(output_dir / STATE_DIR_NAME)
+            refresh = state.refresh(apply_level(read_csv_cached(csv_path, use_cache), level, use_cache),
+                                    keep=rules.candidates)
+            analyzer = TrafficAnalyzer.from_reduced(refresh.frame, refresh.total_traffic, refresh.total_sources,
+                                                    refresh.aggregates, history, rules)
+            if refresh.mode == 'incremental':
+                diff = refresh.diff
+                print(f"  - 增量比对: 新增 {diff['added']:,}，修改 {diff['modified']:,}，"
+                      f"删除 {diff['removed']:,}，未变 {diff['unchanged']:,}")
+            else:
+                print("  - 没有可比对的上一次数据，全量计算")
+        else:
+            analyzer = TrafficAnalyzer(csv_path, chunksize, use_cache, history, shard_workers,
+                                       compact='--compact-target' in options, level=level, rules=rules)
+    with tracer.span('analyze'):
+        metrics = analyzer.get_summary_metrics()
     print(f"  - 总流量: {metrics['total_traffic']:,}")
     print(f"  - 来源数: {metrics['total_sources']:,}")
     print(f"  - AI工具占比: {metrics['ai_ratio']:.1f}%")
+    if analyzer.history is not None:
+        print(f"  - 历史库: {len(analyzer.history.periods)} 期")
+    _print_stage_time(tracer, 'load', 'analyze')
 
     # 2. 生成图表
     print("\n[2/4] 生成可视化图表...")
-    chart_gen = ChartGenerator(analyzer.df, output_dir)
-    charts = chart_gen.generate_all()
-    print(f"  - 已生成 {len(charts)} 个图表")
+    with tracer.span('charts'):
+        type_traffic = analyzer.get_type_stats().set_index('type')['traffic']
+        chart_gen = ChartGenerator(analyzer.df, output_dir, type_traffic, workers=chart_workers,
+                                   cache=ChartCache() if use_cache else None, dpi=dpi, fmt=chart_format,
+                                   density_threshold=density_threshold, tracer=tracer, rules=rules)
+        charts = chart_gen.generate_all(state.charts if state else None)
+    print(f"  - 已生成 {len(chart_gen.rendered)} 个图表")
+    if chart_gen.cached:
+        print(f"  - 图表缓存命中 {len(chart_gen.cached)} 个")
+    reused = len(charts) - len(chart_gen.rendered) - len(chart_gen.cached)
+    if reused:
+        print(f"  - 输入未变化，复用 {reused} 个图表")
+    _print_stage_time(tracer, 'charts')
 
     # 3. 生成报告
     print("\n[3/4] 渲染报告模板...")
-    report_gen = ReportGenerator(analyzer, output_dir)
+    appendix = None
+    if appendix_rows:
+        # 流式读取和增量模式下 analyzer.df 只是候选子集，附录需要完整数据
+        if len(analyzer.df) == analyzer.total_sources:
+            full_df = analyzer.df
+        elif shards is not None:
+            full_df = pd.concat([read_csv_cached(path, use_cache) for path in shards], ignore_index=True)
+        else:
+            full_df = apply_level(read_csv_cached(csv_path, use_cache), level, use_cache)
+        appendix = Appendix(full_df, output_dir, appendix_rows)
+    report_gen = ReportGenerator(analyzer, output_dir, appendix=appendix, tracer=tracer)
+    if report_gen.appendix_info:
+        info = report_gen.appendix_info
+        print(f"  - 全量附录: {info['rows']:,} 行，{info['pages']} 页")
+        _print_stage_time(tracer, 'appendix')
 
     # 4. 导出 PDF
     print("\n[4/4] 导出 PDF 报告...")
-    result = report_gen.generate(charts)
+    with tracer.span('report'):
+        if state is None:
+            result = report_gen.generate(charts)
+        else:
+            fingerprint = report_gen.content_fingerprint(charts, chart_gen.chart_state)
+            previous = state.report
+            if previous.get('fingerprint') == fingerprint and Path(previous.get('path', '')).exists():
+                result = Path(previous['path'])
+                print("  - 报告内容未变化，沿用上一次的报告")
+            else:
+                result = report_gen.generate(charts)
+            state.save(chart_gen.chart_state, {'fingerprint': fingerprint, 'path': str(result)})
+    cache_info = analyzer.cache_info()
+    print(f"  - 分析结果缓存: 命中 {cache_info['hits']} 次，计算 {cache_info['misses']} 次")
+    _print_stage_time(tracer, 'report')
+
+    if profiler is not None:
+        print(f"性能剖析结果: {profiler.stop(output_dir)}")
+    if '--trace' in options:
+        print("\n各阶段耗时:")
+        for line in tracer.summary():
+            print(f"  {line}")
+        print(f"耗时追踪: {tracer.write_chrome_trace(output_dir / TRACE_FILE)}")
 
     print(f"\n完成！报告已保存到: {result}")
     print(f"图表目录: {output_dir}")
 
 
+def _print_stage_time(tracer: Tracer, *names):
+    """打印阶段耗时和内存峰值（多个阶段时合计耗时、取最大峰值）"""
+    stages = [stage for stage in tracer.stages() if stage[0] in names]
+    seconds = sum(stage[1] for stage in stages)
+    peak = max((stage[2] for stage in stages), default=0)
+    rss = f"，内存峰值 {peak / 1024 / 1024:.0f} MB" if peak else ''
+    print(f"  - 耗时 {seconds:.2f}s{rss}")
+
+
 if __name__ == '__main__':
     main()
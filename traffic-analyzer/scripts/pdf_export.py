@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+PDF 导出工具 - 常驻浏览器的 HTML → PDF 转换
+浏览器只启动一次，页面用完放回池中复用；按文档加载完成和字体就绪判断渲染完成，
+不再固定等待；多份报告可并发转换，并发数有上限
+
+使用方法:
+    with PdfExporter(max_concurrency=4) as exporter:
+        exporter.convert('a/report.html', 'a/report.pdf')
+        exporter.convert_many([('b/report.html', 'b/report.pdf'), ...])
+        future = exporter.submit('c/report.html', 'c/report.pdf')
+
+依赖:
+    pip install playwright
+    playwright install chromium  # 或使用系统 Chrome
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+
+# PDF 页面设置
+PDF_OPTIONS = {
+    'format': 'A4',
+    'print_background': True,
+    'margin': {'top': '1cm', 'bottom': '1cm', 'left': '1cm', 'right': '1cm'}
+}
+
+# 页面加载超时（毫秒）
+LOAD_TIMEOUT = 60000
+
+
+class PdfExporter:
+    """
+    常驻浏览器的 PDF 导出器
+
+    浏览器运行在后台线程的事件循环中，同步代码可以直接调用 convert / convert_many；
+    首次转换时启动浏览器，close() 或退出 with 块时关闭
+
+    Args:
+        max_concurrency: 同时转换的最大页面数
+        wait_until: 页面加载完成事件，'load'（默认）或 'networkidle'（模板异步加载远程资源时使用）
+    """
+
+    def __init__(self, max_concurrency: int = 2, wait_until: str = 'load'):
+        self.max_concurrency = max_concurrency
+        self.wait_until = wait_until
+
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._semaphore = None
+        self._idle_pages = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """启动浏览器（已启动时直接返回），playwright 未安装时抛出 ImportError"""
+        if self._loop is not None:
+            return self
+
+        from playwright.async_api import async_playwright
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._run(self._start(async_playwright))
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def convert(self, html_path, pdf_path) -> Path:
+        """将单个 HTML 文件转换为 PDF"""
+        self.start()
+        return self._run(self._convert(Path(html_path), Path(pdf_path)))
+
+    def submit(self, html_path, pdf_path) -> Future:
+        """提交转换任务后立即返回，可在转换进行时继续处理下一份报告"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._convert(Path(html_path), Path(pdf_path)), self._loop)
+
+    def convert_many(self, jobs) -> list:
+        """
+        并发转换多个 (html_path, pdf_path)
+
+        Returns:
+            与 jobs 顺序一致的列表，成功为 PDF 路径，失败为对应的异常
+        """
+        self.start()
+        return self._run(self._convert_many([(Path(h), Path(p)) for h, p in jobs]))
+
+    def close(self):
+        """关闭浏览器和后台事件循环"""
+        if self._loop is None:
+            return
+        try:
+            if self._playwright is not None:
+                self._run(self._close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    def _run(self, coro):
+        """在后台事件循环中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self, async_playwright):
+        self._playwright = await async_playwright().start()
+        # 尝试使用系统 Chrome
+        try:
+            self._browser = await self._playwright.chromium.launch(channel="chrome", headless=True)
+        except Exception:
+            # 回退到 chromium
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _convert(self, html_path: Path, pdf_path: Path) -> Path:
+        async with self._semaphore:
+            page = self._idle_pages.pop() if self._idle_pages else await self._browser.new_page()
+            try:
+                await page.goto(html_path.absolute().as_uri(), wait_until=self.wait_until,
+                                timeout=LOAD_TIMEOUT)
+                # 等待 Web 字体加载完成
+                await page.evaluate('document.fonts.ready.then(() => true)')
+                await page.pdf(path=str(pdf_path), **PDF_OPTIONS)
+            except Exception:
+                await page.close()
+                raise
+            self._idle_pages.append(page)
+        return pdf_path
+
+    async def _convert_many(self, jobs: list) -> list:
+        return await asyncio.gather(*(self._convert(h, p) for h, p in jobs), return_exceptions=True)
+
+    async def _close(self):
+        self._idle_pages = []
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        finally:
+            await self._playwright.stop()
+            self._browser = None
+            self._playwright = None
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+全量附录 - 按流量排名的完整来源列表，分页写成独立的 HTML 文件
+每页行数固定，浏览器一次只加载一页；导出 PDF 时逐页转换再合并，
+单页的耗时和内存有上限，总耗时随行数线性增长
+
+输出（报告目录下的 appendix/）:
+    index.html                 分页目录（各页的排名区间）
+    page_0001.html ...         各页表格，带上一页 / 下一页 / 目录链接
+    appendix.pdf               合并后的 PDF（需要 pypdf，未安装时保留 page_*.pdf）
+
+依赖:
+    pip install pypdf  # 可选，合并各页 PDF
+"""
+
+import html
+import math
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from traffic_topn import sort_positions
+
+
+APPENDIX_DIR_NAME = 'appendix'
+DEFAULT_ROWS_PER_PAGE = 5000
+
+# 同时提交给浏览器的页数，控制 PDF 导出的内存占用
+PDF_BATCH_PAGES = 8
+
+_STYLE = """
+body { font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 11px; color: #1f2937; margin: 24px; }
+h1 { font-size: 18px; margin: 0 0 12px; }
+nav { margin: 12px 0; }
+nav a { margin-right: 12px; color: #2563eb; text-decoration: none; }
+table { border-collapse: collapse; width: 100%; }
+th, td { padding: 3px 6px; border-bottom: 1px solid #e5e7eb; text-align: left; }
+th { background: #f3f4f6; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+thead { display: table-header-group; }
+tr { page-break-inside: avoid; }
+@media print { nav { display: none; } body { margin: 0; } }
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{{ title }} 第 {{ page }} / {{ pages }} 页</title>
+<style>{{ style }}</style></head><body>
+<h1>{{ title }}（第 {{ first }}～{{ last }} 名）</h1>
+<nav>{% if page > 1 %}<a href="{{ page_name(page - 1) }}">上一页</a>{% endif %}<a href="index.html">目录</a>{% if page < pages %}<a href="{{ page_name(page + 1) }}">下一页</a>{% endif %}</nav>
+<table><thead><tr><th>排名</th><th>来源</th><th>类型</th><th>流量</th><th>上期流量</th><th>增长率</th><th>流量占比</th></tr></thead>
+<tbody>
+{{ rows }}</tbody></table>
+</body></html>
+"""
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{{ title }}</title>
+<style>{{ style }}</style></head><body>
+<h1>{{ title }}</h1>
+<p>共 {{ "{:,}".format(rows) }} 个来源，按流量降序排列，每页 {{ "{:,}".format(rows_per_page) }} 行，共 {{ pages }} 页。</p>
+<ol>{% for page, first, last in ranges %}<li><a href="{{ page_name(page) }}">第 {{ "{:,}".format(first) }}～{{ "{:,}".format(last) }} 名</a></li>{% endfor %}</ol>
+</body></html>
+"""
+
+
+# 表格行在 Python 中按格式串拼接（逐格交给模板转义要慢一个数量级），文本列单独转义
+ROW_HTML = ('<tr><td class="num">{}</td><td>{}</td><td>{}</td><td class="num">{}</td>'
+            '<td class="num">{}</td><td class="num">{}</td><td class="num">{}</td></tr>\n')
+
+
+def page_name(page: int) -> str:
+    """第 page 页（从 1 开始）的文件名"""
+    return f'page_{page:04d}.html'
+
+
+def _format_text(values) -> list:
+    return ['-' if v is None or v != v else html.escape(str(v)) for v in values.tolist()]
+
+
+def _format_int(values) -> list:
+    if values.dtype.kind in 'iu':
+        return [f'{v:,}' for v in values.tolist()]
+    return ['-' if pd.isna(v) else f'{int(v):,}' for v in values.tolist()]
+
+
+def _format_percent(values, digits: int) -> list:
+    return ['-' if pd.isna(v) else f'{v * 100:.{digits}f}%' for v in values.tolist()]
+
+
+class Appendix:
+    """
+    全量排名附录
+
+    Args:
+        df: 完整数据集（不能是流式读取的候选子集）
+        output_dir: 报告输出目录，附录写入其下 appendix/
+        rows_per_page: 每页行数
+    """
+
+    TITLE = '附录：全部流量来源排名'
+
+    def __init__(self, df: pd.DataFrame, output_dir: Path, rows_per_page: int = DEFAULT_ROWS_PER_PAGE):
+        self.df = df
+        self.appendix_dir = Path(output_dir) / APPENDIX_DIR_NAME
+        self.rows_per_page = max(1, rows_per_page)
+        self.pages = []
+
+    def write_html(self) -> dict:
+        """
+        写出目录页和各分页
+
+        Returns:
+            模板用的附录信息 {'index', 'rows', 'pages', 'rows_per_page'}，index 为相对报告目录的链接
+        """
+        from jinja2 import Environment
+        from markupsafe import Markup
+
+        # 来源名等数据需要转义，样式表原样输出
+        env = Environment(autoescape=True)
+        env.globals.update(page_name=page_name, style=Markup(_STYLE), title=self.TITLE)
+        page_template = env.from_string(PAGE_TEMPLATE)
+
+        self.appendix_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.appendix_dir.glob('page_*.*'):
+            stale.unlink()
+
+        order = sort_positions(self.df['traffic'].to_numpy())
+        total = len(order)
+        page_count = max(1, math.ceil(total / self.rows_per_page))
+        columns = {
+            name: self.df[name]
+            for name in ('target', 'type', 'traffic', 'prev_traffic', 'traffic_diff', 'traffic_share')
+        }
+
+        ranges = []
+        self.pages = []
+        for page in range(1, page_count + 1):
+            start = (page - 1) * self.rows_per_page
+            positions = order[start:start + self.rows_per_page]
+            ranges.append((page, start + 1, start + len(positions)))
+
+            # 每页只取出本页的行并格式化，内存占用与总行数无关
+            page_columns = {name: column.take(positions).to_numpy() for name, column in columns.items()}
+            rows = ''.join(ROW_HTML.format(*row) for row in zip(
+                range(start + 1, start + len(positions) + 1),
+                _format_text(page_columns['target']),
+                _format_text(page_columns['type']),
+                _format_int(page_columns['traffic']),
+                _format_int(page_columns['prev_traffic']),
+                _format_percent(page_columns['traffic_diff'], 1),
+                _format_percent(page_columns['traffic_share'], 4)
+            ))
+            path = self.appendix_dir / page_name(page)
+            page_template.stream(
+                rows=Markup(rows), page=page, pages=page_count, first=start + 1, last=start + len(positions)
+            ).dump(str(path), encoding='utf-8')
+            self.pages.append(path)
+
+        index_path = self.appendix_dir / 'index.html'
+        env.from_string(INDEX_TEMPLATE).stream(
+            rows=total, rows_per_page=self.rows_per_page, pages=page_count, ranges=ranges
+        ).dump(str(index_path), encoding='utf-8')
+
+        return {
+            'index': f'{APPENDIX_DIR_NAME}/index.html',
+            'rows': total,
+            'pages': page_count,
+            'rows_per_page': self.rows_per_page
+        }
+
+    def export_pdf(self, exporter) -> Path:
+        """
+        逐页导出 PDF 后合并（每批最多 PDF_BATCH_PAGES 页同时交给浏览器）
+
+        Returns:
+            合并后的 appendix.pdf；未安装 pypdf 时返回各页 PDF 所在目录
+        """
+        pdf_pages = []
+        for start in range(0, len(self.pages), PDF_BATCH_PAGES):
+            jobs = [(page, page.with_suffix('.pdf')) for page in self.pages[start:start + PDF_BATCH_PAGES]]
+            for result in exporter.convert_many(jobs):
+                if isinstance(result, BaseException):
+                    raise result
+                pdf_pages.append(result)
+
+        try:
+            from pypdf import PdfWriter
+        except ImportError:
+            print("提示: 未安装 pypdf，附录保留为分页 PDF（pip install pypdf 后自动合并）", file=sys.stderr)
+            return self.appendix_dir
+
+        merged = self.appendix_dir / 'appendix.pdf'
+        tmp_path = merged.with_name(f'{merged.name}.{os.getpid()}.tmp')
+        writer = PdfWriter()
+        for path in pdf_pages:
+            writer.append(str(path))
+        with open(tmp_path, 'wb') as f:
+            writer.write(f)
+        writer.close()
+        os.replace(tmp_path, merged)
+
+        for path in pdf_pages:
+            path.unlink(missing_ok=True)
+        return merged
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+紧凑的 target 列 - 域名按字典编码存为 category（每行一个整数编号 + 去重后的词表）
+
+词表的小写形式和关键词匹配结果按词表缓存：同一份数据上的多次匹配（AI 识别、分类）
+只在第一次扫描词表，之后按编号映射到各行；筛选出的子集与原数据共用同一份词表，
+子集很小时只匹配用到的词，不扫描整个词表
+"""
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+# 行数不到词表大小的这一比例时，只匹配子集用到的词（不写入缓存）
+SUBSET_RATIO = 0.25
+
+# 词表 id -> Vocabulary，词表对象被回收时自动移除
+_VOCABULARIES = {}
+
+
+class Vocabulary:
+    """一份 category 词表的小写形式和匹配结果缓存"""
+
+    def __init__(self, categories: pd.Index):
+        self.size = len(categories)
+        self.lower = pd.Series(categories).astype(str).str.lower()
+        self._results = {}
+
+    def has(self, key) -> bool:
+        return key in self._results
+
+    def lookup(self, key, compute) -> np.ndarray:
+        """整个词表上的匹配结果，compute(小写词表) 只在第一次调用"""
+        if key not in self._results:
+            self._results[key] = compute(self.lower)
+        return self._results[key]
+
+
+def vocabulary(values: pd.Series):
+    """category 列的词表缓存，其他类型返回 None"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return None
+    categories = values.cat.categories
+    key = id(categories)
+    if key not in _VOCABULARIES:
+        _VOCABULARIES[key] = Vocabulary(categories)
+        weakref.finalize(categories, _VOCABULARIES.pop, key, None)
+    return _VOCABULARIES[key]
+
+
+def match_unique(values: pd.Series, key, compute, missing) -> np.ndarray:
+    """
+    按去重后的取值计算，再映射回各行
+
+    Args:
+        values: 待匹配的列（category 列使用词表缓存，其他类型先去重）
+        key: 结果缓存键（匹配规则相同则键相同）
+        compute: compute(小写去重值 Series) -> 与去重值一一对应的数组
+        missing: 缺失值对应的结果
+
+    Returns:
+        与 values 逐行对应的数组
+    """
+    vocab = vocabulary(values)
+    if vocab is None:
+        codes, uniques = pd.factorize(values)
+        result = compute(pd.Series(uniques).astype(str).str.lower())
+    elif vocab.has(key) or len(values) >= vocab.size * SUBSET_RATIO:
+        codes = values.cat.codes.to_numpy()
+        result = vocab.lookup(key, compute)
+    else:
+        all_codes = values.cat.codes.to_numpy()
+        present = all_codes >= 0
+        used, inverse = np.unique(all_codes[present], return_inverse=True)
+        codes = np.full(len(all_codes), -1, dtype=np.intp)
+        codes[present] = inverse
+        result = compute(vocab.lower.iloc[used].reset_index(drop=True))
+
+    # 末尾多留一个缺失值的结果，编号 -1 正好取到它
+    result = np.append(result, missing)
+    return result[codes]
+
+
+def compact_target(df: pd.DataFrame) -> pd.DataFrame:
+    """target 列改为字典编码（不修改传入的数据框）"""
+    if isinstance(df['target'].dtype, pd.CategoricalDtype):
+        return df
+    return df.assign(target=df['target'].astype('category'))
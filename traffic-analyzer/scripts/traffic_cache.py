@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+流量数据缓存 - 解析后的 CSV 以 Arrow IPC 列式格式缓存到本地磁盘
+同一文件被多个脚本反复读取时，只需解析一次 CSV，之后内存映射读取缓存
+
+缓存以文件内容哈希为键；文件的修改时间或大小变化时重新计算哈希，
+缓存目录超过容量上限时按最近使用时间淘汰
+
+环境变量:
+    TRAFFIC_CACHE_DIR    缓存目录（默认 ~/.cache/traffic-analyzer）
+    TRAFFIC_CACHE_MAX_MB 缓存容量上限，单位 MB（默认 2048）
+
+依赖:
+    pip install pyarrow  # 未安装时自动跳过缓存
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+
+CACHE_DIR = Path(os.environ.get('TRAFFIC_CACHE_DIR', Path.home() / '.cache' / 'traffic-analyzer'))
+CACHE_MAX_BYTES = int(os.environ.get('TRAFFIC_CACHE_MAX_MB', 2048)) * 1024 * 1024
+
+# 缓存格式版本，变更列处理方式时递增以废弃旧缓存
+CACHE_VERSION = 1
+
+INDEX_FILE = 'index.json'
+
+
+def read_csv_cached(filepath, use_cache: bool = True) -> pd.DataFrame:
+    """
+    读取 CSV，优先使用缓存
+
+    Args:
+        filepath: CSV 文件路径
+        use_cache: False 时直接解析 CSV，不读写缓存
+    """
+    if not use_cache:
+        return pd.read_csv(filepath)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.read_csv(filepath)
+
+    cache = TrafficCache()
+    try:
+        df = cache.get(filepath)
+    except FileNotFoundError:
+        return pd.read_csv(filepath)
+    except OSError as e:
+        print(f"Warning: cache unavailable: {e}", file=sys.stderr)
+        return pd.read_csv(filepath)
+
+    if df is None:
+        df = pd.read_csv(filepath)
+        cache.put(filepath, df)
+    return df
+
+
+class TrafficCache:
+    """Arrow IPC 磁盘缓存"""
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir or CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    def get(self, filepath):
+        """命中时返回数据框，否则返回 None"""
+        path = self._entry_path(filepath)
+        if not path.exists():
+            return None
+
+        import pyarrow as pa
+
+        try:
+            with pa.memory_map(str(path), 'r') as source:
+                df = pa.ipc.open_file(source).read_all().to_pandas()
+        except (OSError, pa.ArrowInvalid):
+            path.unlink(missing_ok=True)
+            return None
+
+        # 更新访问时间，用于 LRU 淘汰
+        os.utime(path)
+        return df
+
+    def put(self, filepath, df: pd.DataFrame):
+        """写入缓存，写入失败时只打印警告"""
+        import pyarrow as pa
+
+        path = self._entry_path(filepath)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException) as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: failed to write cache: {e}", file=sys.stderr)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """按最近使用时间淘汰，直到总大小不超过上限"""
+        entries = []
+        for path in self.cache_dir.glob('*.arrow'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = set()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            evicted.add(path.name.split('-v', 1)[0])
+            total -= size
+
+        # 同时删除指向已淘汰缓存的哈希记录，索引不会随读过的文件数无限增长
+        if evicted:
+            self._update_index(lambda index: {
+                key: entry for key, entry in index.items() if entry.get('hash') not in evicted
+            })
+
+    def _entry_path(self, filepath) -> Path:
+        """缓存文件路径（以内容哈希命名）"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir / f'{self._content_hash(filepath)}-v{CACHE_VERSION}.arrow'
+
+    def _content_hash(self, filepath) -> str:
+        """
+        计算文件内容哈希
+
+        按绝对路径记录 (mtime, size, hash)，文件未变化时直接复用，避免每次读取整个文件
+        """
+        filepath = Path(filepath).resolve()
+        stat = filepath.stat()
+
+        entry = self._read_index().get(str(filepath))
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['hash']
+
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'hash': digest.hexdigest()}
+        self._update_index(lambda index: {**index, str(filepath): entry})
+        return digest.hexdigest()
+
+    def _read_index(self) -> dict:
+        try:
+            index = json.loads((self.cache_dir / INDEX_FILE).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _update_index(self, update):
+        """
+        修改哈希索引：写入前重新读取磁盘上的索引再应用修改，经本进程的临时文件原子替换
+
+        哈希计算可能耗时较长，期间其他进程写入的记录不会被覆盖
+        """
+        index_path = self.cache_dir / INDEX_FILE
+        tmp_path = index_path.with_name(f'{INDEX_FILE}.{os.getpid()}.tmp')
+        try:
+            tmp_path.write_text(json.dumps(update(self._read_index()), indent=2), encoding='utf-8')
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: failed to write cache index: {e}", file=sys.stderr)
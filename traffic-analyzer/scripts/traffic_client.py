@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+流量分析服务客户端 - analyze_traffic.py 的替代入口
+参数和输出与 analyze_traffic.py 相同，分析交给常驻的 traffic_server.py 完成；
+服务未启动时回退为本地运行 analyze_traffic.py
+
+使用方法:
+    python traffic_client.py <csv_file> <analysis_type> [options]
+    python traffic_client.py --dataset=NAME <analysis_type>
+
+服务地址取 --server 或环境变量 TRAFFIC_SERVER（默认 http://127.0.0.1:8765），
+Unix socket 写作 unix:/path/to/socket。csv_file 为分片（glob 模式或目录）时服务不常驻，
+直接在本地分块折叠
+"""
+
+import http.client
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_SERVER = os.environ.get('TRAFFIC_SERVER', 'http://127.0.0.1:8765')
+
+# 路径中含这些字符时按 glob 模式展开为分片（同 traffic_stream.GLOB_CHARS）
+GLOB_CHARS = '*?['
+
+# 只有服务支持的分析类型（本地回退时不可用）
+SERVER_ONLY_TYPES = ('risk',)
+
+# 连接和请求超时（秒）；首次查询需要加载数据集，请求超时放宽
+CONNECT_TIMEOUT = 2
+REQUEST_TIMEOUT = 600
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """经 Unix socket 发送 HTTP 请求"""
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServerError(Exception):
+    """服务返回了错误响应"""
+
+
+def request(server: str, method: str, path: str, body: dict = None):
+    """
+    向分析服务发送请求，返回解析后的 JSON
+
+    服务无法连接时抛出 ConnectionError，服务返回错误时抛出 ServerError
+    """
+    if server.startswith('unix:'):
+        conn = UnixHTTPConnection(server[len('unix:'):], timeout=CONNECT_TIMEOUT)
+    else:
+        url = urlsplit(server)
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=CONNECT_TIMEOUT)
+
+    try:
+        try:
+            conn.connect()
+        except (FileNotFoundError, socket.timeout, OSError) as e:
+            raise ConnectionError(f'无法连接分析服务 {server}: {e}') from e
+        conn.sock.settimeout(REQUEST_TIMEOUT)
+
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        data = json.loads(response.read().decode('utf-8'))
+    finally:
+        conn.close()
+
+    if response.status != 200:
+        raise ServerError(data.get('error', f'HTTP {response.status}'))
+    return data
+
+
+def analyze(server: str, analysis_type: str, filepath: str = None, dataset: str = None,
+            level: str = 'target', rules: str = None, profiles: list = None) -> dict:
+    """
+    请求服务运行分析，filepath 和规则文件按本地路径解析为绝对路径后发送
+
+    level / rules / profiles 同 analyze_traffic.py 的 --level / --rules / --rule-profile
+    """
+    query = {'analysis': analysis_type}
+    if dataset:
+        query['dataset'] = dataset
+    else:
+        query['path'] = str(Path(filepath).resolve())
+    if level != 'target':
+        query['level'] = level
+    if rules:
+        query['rules'] = str(Path(rules).resolve())
+    if profiles:
+        query['profiles'] = ','.join(profiles)
+    return request(server, 'GET', '/analyze?' + urlencode(query))
+
+
+def is_sharded(path) -> bool:
+    """路径是否表示多个分片（同 traffic_stream.is_sharded，客户端不导入 pandas）"""
+    path = Path(path)
+    return path.is_dir() or (not path.is_file() and any(c in str(path) for c in GLOB_CHARS))
+
+
+def run_local(filepath: str, analysis_type: str, options: list, reason: str):
+    """本地运行 analyze_traffic.py（只有服务支持的分析类型报错退出）"""
+    if analysis_type in SERVER_ONLY_TYPES:
+        print(f"Error: {reason}；{analysis_type} 分析需要服务，请先启动 traffic_server.py", file=sys.stderr)
+        sys.exit(1)
+    print(f"{reason}，改为本地分析", file=sys.stderr)
+    import analyze_traffic
+    sys.argv = [sys.argv[0], filepath, analysis_type] + [
+        o for o in options if not o.startswith(('--server=', '--dataset='))
+    ]
+    analyze_traffic.main()
+
+
+def main():
+    """主函数 - 参数同 analyze_traffic.py"""
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    server = DEFAULT_SERVER
+    dataset = None
+    level = 'target'
+    rules_path = None
+    profile_names = None
+    for option in options:
+        if option.startswith('--server='):
+            server = option.split('=', 1)[1]
+        elif option.startswith('--dataset='):
+            dataset = option.split('=', 1)[1]
+        elif option.startswith('--level='):
+            level = option.split('=', 1)[1]
+        elif option.startswith('--rules='):
+            rules_path = option.split('=', 1)[1]
+        elif option.startswith('--rule-profile='):
+            profile_names = option.split('=', 1)[1].split(',')
+
+    if len(args) < (1 if dataset else 2):
+        print("Usage: python traffic_client.py <csv_file> <analysis_type> [--server=URL] [--dataset=NAME]")
+        print("\n分析类型同 analyze_traffic.py，另支持 risk（下行风险标的，需要服务）")
+        print("\nOptions:")
+        print(f"  --server=URL    - 服务地址（默认 {DEFAULT_SERVER}，Unix socket 写作 unix:/path）")
+        print("  --dataset=NAME  - 使用服务中已命名的数据集，此时省略 csv_file")
+        print("  --level / --rules / --rule-profile - 同 analyze_traffic.py，转发给服务")
+        print("  其余选项（--stream 等）仅在回退本地运行时生效")
+        sys.exit(1)
+
+    filepath = None if dataset else args[0]
+    analysis_type = args[-1]
+
+    if filepath is not None and is_sharded(filepath):
+        run_local(filepath, analysis_type, options, f'{filepath} 为分片输入，服务只常驻单个 CSV')
+        return
+
+    try:
+        result = analyze(server, analysis_type, filepath, dataset, level, rules_path, profile_names)
+    except ConnectionError as e:
+        if dataset:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        # 服务未启动，本地运行
+        run_local(filepath, analysis_type, options, str(e))
+        return
+    except ServerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+多期流量历史库 - 按月累积 SEMrush 导出，用于跨期趋势分析（CAGR、动量、连涨/连跌）
+
+每期导出入库一次，之后查询只读取历史库，不再解析历史 CSV；
+入库只追加：新的一期写成单独的文件，已有的期不会被改写（除非显式 --replace）
+
+目录结构:
+    store_dir/
+        manifest.json          各期元数据和类型词表，最后写入，作为入库的提交点
+        targets.arrow          target 词表，行号即 target_id，只追加
+        periods/<YYYY-MM>.arrow 每期一个 Arrow IPC 文件，列为 target_id / type_id / traffic / prev_traffic，
+                               按 (target_id, type_id) 排序，按 target 查询时二分查找
+
+使用方法:
+    python traffic_history.py ingest <store_dir> <csv_file> [--period=YYYY-MM] [--replace]
+    python traffic_history.py list <store_dir>
+    python traffic_history.py trends <store_dir> [--months=12] [--top=20] [--min-traffic=50000]
+
+依赖:
+    pip install pyarrow
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_FILE = 'manifest.json'
+TARGETS_FILE = 'targets.arrow'
+PERIODS_DIR = 'periods'
+
+# 历史库格式版本
+STORE_VERSION = 1
+
+# 文件名中的期数，如 traffic-2025-03.csv、export_202503.csv
+PERIOD_PATTERN = re.compile(r'(20\d{2})[-_.]?(0[1-9]|1[0-2])(?!\d)')
+
+# 组合键：target_id 占高位，type_id 占低 16 位，与期文件的排序一致
+TYPE_BITS = 16
+
+
+def infer_period(filepath) -> str:
+    """从文件名推断期数（YYYY-MM），无法推断时抛出 ValueError"""
+    match = PERIOD_PATTERN.search(Path(filepath).stem)
+    if not match:
+        raise ValueError(f'无法从文件名推断期数，请用 --period=YYYY-MM 指定: {filepath}')
+    return f'{match.group(1)}-{match.group(2)}'
+
+
+def month_number(period: str) -> int:
+    """期数转为月序号，用于计算间隔月数"""
+    year, month = period.split('-')
+    return int(year) * 12 + int(month) - 1
+
+
+class TrafficHistory:
+    """
+    多期流量历史库
+
+    Args:
+        store_dir: 历史库目录，不存在时在首次入库时创建
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        self._manifest = None
+        self._targets = None
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            try:
+                self._manifest = json.loads((self.store_dir / MANIFEST_FILE).read_text(encoding='utf-8'))
+            except FileNotFoundError:
+                self._manifest = {'version': STORE_VERSION, 'types': [], 'periods': {}}
+        return self._manifest
+
+    @property
+    def periods(self) -> list:
+        """已入库的期数（升序）"""
+        return sorted(self.manifest['periods'])
+
+    @property
+    def targets(self) -> pd.Index:
+        """target 词表，位置即 target_id"""
+        if self._targets is None:
+            path = self.store_dir / TARGETS_FILE
+            if path.exists():
+                self._targets = pd.Index(self._read_arrow(path)['target'], dtype=object)
+            else:
+                self._targets = pd.Index([], dtype=object)
+        return self._targets
+
+    def ingest(self, csv_path, period: str = None, replace: bool = False) -> dict:
+        """
+        导入一期 CSV
+
+        同一期已存在时抛出 ValueError，replace=True 时覆盖该期；
+        只解析这一个文件，词表追加新出现的 target 和类型
+
+        Returns:
+            该期的元数据
+        """
+        period = period or infer_period(csv_path)
+        if not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', period):
+            raise ValueError(f'期数格式应为 YYYY-MM: {period}')
+        if period in self.manifest['periods'] and not replace:
+            raise ValueError(f'{period} 已入库，覆盖请使用 --replace')
+
+        df = pd.read_csv(csv_path, usecols=['type', 'target', 'traffic', 'prev_traffic'])
+        df = df.dropna(subset=['type', 'target'])
+        # 同一期内重复的 (target, type) 合并
+        df = df.groupby(['target', 'type'], sort=False, as_index=False)[['traffic', 'prev_traffic']].sum()
+
+        targets, target_ids = self._extend_vocabulary(self.targets, df['target'])
+        types, type_ids = self._extend_vocabulary(pd.Index(self.manifest['types'], dtype=object), df['type'])
+        if len(types) >= 1 << TYPE_BITS:
+            raise ValueError(f'类型数超过上限 {1 << TYPE_BITS}')
+
+        order = np.lexsort((type_ids, target_ids))
+        columns = {
+            'target_id': target_ids[order].astype(np.int32),
+            # 无符号 16 位，与 TYPE_BITS 一致：上限内的编号都不会溢出为负数
+            'type_id': type_ids[order].astype(np.uint16),
+            'traffic': df['traffic'].to_numpy(dtype=np.int64)[order],
+            'prev_traffic': df['prev_traffic'].to_numpy(dtype=np.int64)[order]
+        }
+
+        (self.store_dir / PERIODS_DIR).mkdir(parents=True, exist_ok=True)
+        self._write_arrow(self._period_path(period), columns)
+        if len(targets) > len(self.targets):
+            self._write_arrow(self.store_dir / TARGETS_FILE, {'target': targets.to_numpy(dtype=object)})
+
+        entry = {
+            'rows': len(df),
+            'source': str(Path(csv_path).resolve()),
+            'sha256': _file_hash(csv_path),
+            'ingested_at': datetime.now().isoformat(timespec='seconds')
+        }
+        manifest = dict(self.manifest, types=types.tolist())
+        manifest['periods'] = dict(manifest['periods'], **{period: entry})
+        self._write_manifest(manifest)
+
+        self._manifest = manifest
+        self._targets = targets
+        return entry
+
+    def read_period(self, period: str, target_ids: np.ndarray = None) -> dict:
+        """
+        读取一期的列数组
+
+        Args:
+            target_ids: 只取这些 target（升序），按期文件的排序二分查找
+        """
+        columns = self._read_arrow(self._period_path(period))
+        if target_ids is None:
+            return columns
+
+        starts = np.searchsorted(columns['target_id'], target_ids, side='left')
+        lengths = np.searchsorted(columns['target_id'], target_ids, side='right') - starts
+        # 拼接各 target 的行区间 [start, end)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        rows = np.arange(lengths.sum()) + offsets
+        return {name: values[rows] for name, values in columns.items()}
+
+    def target_history(self, targets) -> pd.DataFrame:
+        """指定 target 的逐期流量，列为 target / type / period / traffic / prev_traffic"""
+        ids = self.targets.get_indexer(pd.Index(targets, dtype=object))
+        ids = np.unique(ids[ids >= 0])
+
+        types = np.asarray(self.manifest['types'], dtype=object)
+        frames = []
+        for period in self.periods:
+            columns = self.read_period(period, ids)
+            frames.append(pd.DataFrame({
+                'target': self.targets.to_numpy()[columns['target_id']],
+                'type': types[columns['type_id']],
+                'period': period,
+                'traffic': columns['traffic'],
+                'prev_traffic': columns['prev_traffic']
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['target', 'type', 'period', 'traffic', 'prev_traffic'])
+        return pd.concat(frames, ignore_index=True)
+
+    def traffic_matrix(self, periods: list = None, min_traffic: int = 0):
+        """
+        (target, type) × 期数 的流量矩阵，缺失为 NaN
+
+        只取最近一期流量不低于 min_traffic 的 (target, type)，其余各期按组合键二分查找，
+        不需要把所有历史期整表读入内存
+
+        Returns:
+            (键数据框（target / type）, 矩阵, 期数列表)
+        """
+        periods = periods or self.periods
+        if not periods:
+            raise ValueError('历史库为空，请先入库')
+
+        latest = self.read_period(periods[-1])
+        keep = latest['traffic'] >= min_traffic
+        keys = _composite_key(latest['target_id'][keep], latest['type_id'][keep])
+        target_ids = np.unique(latest['target_id'][keep])
+
+        matrix = np.full((len(keys), len(periods)), np.nan)
+        for j, period in enumerate(periods):
+            columns = latest if period == periods[-1] else self.read_period(period, target_ids)
+            period_keys = _composite_key(columns['target_id'], columns['type_id'])
+            pos = np.searchsorted(period_keys, keys)
+            pos[pos == len(period_keys)] = 0
+            found = (period_keys[pos] == keys) if len(period_keys) else np.zeros(len(keys), dtype=bool)
+            matrix[found, j] = columns['traffic'][pos[found]]
+
+        types = np.asarray(self.manifest['types'], dtype=object)
+        key_frame = pd.DataFrame({
+            'target': self.targets.to_numpy()[keys >> TYPE_BITS],
+            'type': types[keys & ((1 << TYPE_BITS) - 1)]
+        })
+        return key_frame, matrix, periods
+
+    def trend_metrics(self, months: int = 12, momentum_months: int = 3, min_traffic: int = 0) -> pd.DataFrame:
+        """最近 months 期的趋势指标，见 compute_trend_metrics"""
+        key_frame, matrix, periods = self.traffic_matrix(self.periods[-months:], min_traffic)
+        metrics = compute_trend_metrics(matrix, periods, momentum_months)
+        return pd.concat([key_frame, metrics], axis=1)
+
+    @staticmethod
+    def _extend_vocabulary(vocabulary: pd.Index, values: pd.Series):
+        """把新出现的取值追加到词表末尾，返回 (新词表, 各行编号)"""
+        ids = vocabulary.get_indexer(values)
+        new = ids < 0
+        if new.any():
+            added = pd.unique(values[new])
+            vocabulary = vocabulary.append(pd.Index(added, dtype=object))
+            ids[new] = vocabulary.get_indexer(values[new])
+        return vocabulary, ids
+
+    def _period_path(self, period: str) -> Path:
+        return self.store_dir / PERIODS_DIR / f'{period}.arrow'
+
+    @staticmethod
+    def _read_arrow(path: Path) -> dict:
+        import pyarrow as pa
+
+        with pa.memory_map(str(path), 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+    @staticmethod
+    def _write_arrow(path: Path, columns: dict):
+        import pyarrow as pa
+
+        table = pa.table(columns)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _write_manifest(self, manifest: dict):
+        path = self.store_dir / MANIFEST_FILE
+        tmp_path = path.with_name(f'{MANIFEST_FILE}.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+
+def compute_trend_metrics(matrix: np.ndarray, periods: list, momentum_months: int = 3) -> pd.DataFrame:
+    """
+    按行计算趋势指标
+
+    Args:
+        matrix: 流量矩阵，行为来源，列为升序的期数，缺失为 NaN
+
+    Returns:
+        列为:
+            first_period / last_period  首次、最近出现的期数
+            observed                    出现的期数
+            first_traffic / last_traffic
+            cagr      首末两期的年化复合增长率（间隔不足一个月或首期流量为 0 时为 NaN）
+            momentum  最近 momentum_months 期流量合计相对之前同样期数的变化（数据不全时为 NaN）
+            streak    截至最近一期的连续环比上涨期数，连跌为负数（相邻两期按已入库的期数计）
+    """
+    rows, count = matrix.shape
+    observed = ~np.isnan(matrix)
+    has_data = observed.any(axis=1)
+
+    first = observed.argmax(axis=1)
+    last = count - 1 - observed[:, ::-1].argmax(axis=1)
+    index = np.arange(rows)
+    first_traffic = matrix[index, first]
+    last_traffic = matrix[index, last]
+
+    month_numbers = np.array([month_number(p) for p in periods])
+    span = month_numbers[last] - month_numbers[first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valid = has_data & (span > 0) & (first_traffic > 0)
+        cagr = np.where(valid, (last_traffic / first_traffic) ** (12 / np.where(span > 0, span, 1)) - 1, np.nan)
+
+        momentum = np.full(rows, np.nan)
+        if count >= 2 * momentum_months and momentum_months > 0:
+            recent = matrix[:, -momentum_months:].sum(axis=1)
+            before = matrix[:, -2 * momentum_months:-momentum_months].sum(axis=1)
+            momentum = np.where(before > 0, recent / before - 1, np.nan)
+
+    streak = np.zeros(rows, dtype=np.int64)
+    if count >= 2:
+        change = np.diff(matrix, axis=1)[:, ::-1]
+        streak = _leading_true(change > 0) - _leading_true(change < 0)
+
+    labels = np.asarray(periods, dtype=object)
+    return pd.DataFrame({
+        'first_period': np.where(has_data, labels[first], None),
+        'last_period': np.where(has_data, labels[last], None),
+        'observed': observed.sum(axis=1),
+        'first_traffic': first_traffic,
+        'last_traffic': last_traffic,
+        'cagr': cagr,
+        'momentum': momentum,
+        'streak': streak
+    })
+
+
+def _leading_true(flags: np.ndarray) -> np.ndarray:
+    """每行开头连续为 True 的个数"""
+    return np.where(flags.all(axis=1), flags.shape[1], (~flags).argmax(axis=1))
+
+
+def _composite_key(target_ids: np.ndarray, type_ids: np.ndarray) -> np.ndarray:
+    return (target_ids.astype(np.int64) << TYPE_BITS) | type_ids.astype(np.int64)
+
+
+def _file_hash(filepath) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    """主函数"""
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if len(args) < 2 or args[0] not in ('ingest', 'list', 'trends') or (args[0] == 'ingest' and len(args) < 3):
+        print("Usage:")
+        print("  python traffic_history.py ingest <store_dir> <csv_file> [--period=YYYY-MM] [--replace]")
+        print("  python traffic_history.py list <store_dir>")
+        print("  python traffic_history.py trends <store_dir> [--months=12] [--top=20] [--min-traffic=50000]")
+        print("\nCommands:")
+        print("  ingest - 导入一期导出（期数默认从文件名推断）")
+        print("  list   - 列出已入库的期数")
+        print("  trends - 按年化复合增长率排序的趋势排行")
+        sys.exit(1)
+
+    period = None
+    months = 12
+    top = 20
+    min_traffic = 50000
+    for option in options:
+        if option.startswith('--period='):
+            period = option.split('=', 1)[1]
+        elif option.startswith('--months='):
+            months = int(option.split('=', 1)[1])
+        elif option.startswith('--top='):
+            top = int(option.split('=', 1)[1])
+        elif option.startswith('--min-traffic='):
+            min_traffic = int(option.split('=', 1)[1])
+
+    command, store = args[0], TrafficHistory(args[1])
+
+    if command == 'ingest':
+        try:
+            entry = store.ingest(args[2], period, replace='--replace' in options)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(entry, indent=2, ensure_ascii=False))
+
+    elif command == 'list':
+        print(json.dumps({
+            'periods': store.manifest['periods'],
+            'targets': len(store.targets),
+            'types': store.manifest['types']
+        }, indent=2, ensure_ascii=False))
+
+    else:
+        try:
+            metrics = store.trend_metrics(months=months, min_traffic=min_traffic)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        metrics = metrics.sort_values('cagr', ascending=False, kind='stable').head(top)
+        print(json.dumps([_trend_record(row) for _, row in metrics.iterrows()], indent=2, ensure_ascii=False))
+
+
+def _trend_record(row) -> dict:
+    def percent(value):
+        return None if pd.isna(value) else f"{value * 100:.1f}%"
+
+    return {
+        'source': row['target'],
+        'type': row['type'],
+        'first_period': row['first_period'],
+        'last_period': row['last_period'],
+        'traffic': int(row['last_traffic']),
+        'cagr': percent(row['cagr']),
+        'momentum': percent(row['momentum']),
+        'streak': int(row['streak'])
+    }
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+增量更新 - 新导出与上一次报告的数据集按 (type, target) 比对，只用变化的行更新全量汇总
+
+全量汇总（总流量、AI 流量、增长来源数、分类汇总）按变化行的差值更新，
+AI 关键词只对新增和修改的行匹配；报告使用与流式读取相同的候选集（流量>=3万 及 TOP20），
+图表和报告内容按输入指纹判断是否需要重新生成
+
+状态保存在报告输出目录的 .incremental/ 下:
+    rows.npz     上一次数据集每行的键、类型编码、数值列、增长与 AI 标记
+    state.json   全量汇总、类型词表、图表和报告的指纹与输出路径
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ai_matcher import ai_mask
+from traffic_topn import top_positions
+
+
+STATE_DIR_NAME = '.incremental'
+ROWS_FILE = 'rows.npz'
+STATE_FILE = 'state.json'
+
+# 状态格式版本，变更时旧状态作废，下一次全量计算
+STATE_VERSION = 1
+
+# 候选集规则，与 TrafficAnalyzer 流式读取一致
+CANDIDATE_MIN_TRAFFIC = 30000
+CANDIDATE_TOP_N = 20
+
+# 判断行是否修改时比较的数值列
+VALUE_COLUMNS = ['traffic', 'prev_traffic', 'traffic_diff', 'traffic_share']
+
+# 64 位黄金比例常数，用于把小整数散布到高位
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_keys(df: pd.DataFrame, type_codes: np.ndarray):
+    """
+    每行 (type, target) 的 64 位键：target 的哈希与类型编码组合
+
+    同一 (type, target) 出现多次时按出现顺序区分（第 k 次出现与上一次数据集的第 k 次比对）
+
+    Returns:
+        键索引（哈希表在判断唯一性时已建好，比对时直接复用）
+    """
+    keys = pd.util.hash_pandas_object(df['target'], index=False, categorize=False).to_numpy()
+    keys = keys ^ (type_codes.astype(np.uint64) * _MIX)
+    index = pd.Index(keys)
+    if index.is_unique:
+        return index
+
+    occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy(dtype=np.uint64)
+    return pd.Index(keys + occurrence * _MIX)
+
+
+def _changed_values(old: dict, pos: np.ndarray, new: dict) -> np.ndarray:
+    """已匹配的行中数值列有变化的行（NaN 与 NaN 视为相同）"""
+    changed = np.zeros(len(pos), dtype=bool)
+    for column in VALUE_COLUMNS:
+        before, after = old[column][pos], new[column]
+        same = before == after
+        if after.dtype.kind == 'f':
+            same |= np.isnan(before) & np.isnan(after)
+        changed |= ~same
+    return changed
+
+
+class Refresh:
+    """一次刷新的结果：候选集、全量汇总和与上一次的差异"""
+
+    def __init__(self, frame, total_traffic, total_sources, aggregates, mode, diff):
+        self.frame = frame
+        self.total_traffic = total_traffic
+        self.total_sources = total_sources
+        self.aggregates = aggregates
+        self.mode = mode
+        self.diff = diff
+
+
+class IncrementalState:
+    """
+    增量更新状态
+
+    Args:
+        state_dir: 状态目录（通常为 output_dir/.incremental）
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = Path(state_dir)
+        self.state = None
+        self.rows = None
+        self._pending = None
+        self._load()
+
+    @property
+    def charts(self) -> dict:
+        """上一次各图表的 {'fingerprint', 'path'}"""
+        return (self.state or {}).get('charts', {})
+
+    @property
+    def report(self) -> dict:
+        """上一次报告的 {'fingerprint', 'path'}"""
+        return (self.state or {}).get('report', {})
+
+    def refresh(self, df: pd.DataFrame, keep=None) -> Refresh:
+        """
+        用新数据集更新汇总
+
+        有上一次的状态时只处理新增、修改和删除的行，否则全量计算
+
+        Args:
+            keep: 额外保留在候选集中的行的筛选函数（如阈值方案的 candidates）
+        """
+        values = {
+            'traffic': df['traffic'].to_numpy(dtype=np.int64),
+            # 新出现的来源 prev_traffic 为空，按 0 计（直接转换为 int64 会得到最小负数）
+            'prev_traffic': df['prev_traffic'].fillna(0).to_numpy(dtype=np.int64),
+            'traffic_diff': df['traffic_diff'].to_numpy(dtype=np.float64),
+            'traffic_share': df['traffic_share'].to_numpy(dtype=np.float64)
+        }
+        traffic = values['traffic']
+        share = values['traffic_share']
+        growth = values['traffic_diff'] > 0
+        types = pd.Index((self.state or {}).get('types', []), dtype=object)
+        types, type_codes = _extend_vocabulary(types, df['type'])
+        key_index = row_keys(df, type_codes)
+        keys = key_index.to_numpy()
+        unique_keys = key_index.is_unique
+
+        if self.state is None or not unique_keys:
+            ai = ai_mask(df).to_numpy(dtype=bool)
+            aggregates = {
+                'total_traffic': int(traffic.sum()),
+                'ai_traffic': int(traffic[ai].sum()),
+                'growth_sources': int(growth.sum()),
+                'type_stats': _group_sums(type_codes, traffic, share, types)
+            }
+            mode = 'full'
+            diff = {'added': len(df), 'modified': 0, 'removed': 0, 'unchanged': 0}
+        else:
+            old = self.rows
+            # 在新键的哈希表中查找上一次的键，得到每个新行对应的旧行
+            new_pos = key_index.get_indexer(old['key'])
+            found = new_pos >= 0
+            pos = np.full(len(keys), -1, dtype=np.intp)
+            pos[new_pos[found]] = np.flatnonzero(found)
+            matched = pos >= 0
+            unchanged = matched.copy()
+            unchanged[matched] = ~_changed_values(old, pos[matched],
+                                                  {c: v[matched] for c, v in values.items()})
+            changed = np.flatnonzero(~unchanged)
+
+            # 上一次数据集中被删除或修改的行
+            gone = np.ones(len(old['key']), dtype=bool)
+            gone[pos[unchanged]] = False
+
+            ai = np.empty(len(df), dtype=bool)
+            ai[unchanged] = old['ai'][pos[unchanged]]
+            ai[changed] = ai_mask(df.iloc[changed]).to_numpy(dtype=bool)
+
+            previous = self.state['aggregates']
+            old_types = pd.Index(self.state['types'], dtype=object)
+            type_stats = _subtract_stats(
+                previous['type_stats'],
+                _group_sums(old['type_code'][gone], old['traffic'][gone], old['traffic_share'][gone], old_types)
+            )
+            type_stats = _add_stats(
+                type_stats,
+                _group_sums(type_codes[changed], traffic[changed], share[changed], types)
+            )
+            aggregates = {
+                'total_traffic': previous['total_traffic'] - int(old['traffic'][gone].sum())
+                                 + int(traffic[changed].sum()),
+                'ai_traffic': previous['ai_traffic'] - int(old['traffic'][gone & old['ai']].sum())
+                              + int(traffic[changed][ai[changed]].sum()),
+                'growth_sources': previous['growth_sources'] - int(old['growth'][gone].sum())
+                                  + int(growth[changed].sum()),
+                'type_stats': type_stats
+            }
+            mode = 'incremental'
+            modified = int((matched & ~unchanged).sum())
+            diff = {
+                'added': int((~matched).sum()),
+                'modified': modified,
+                'removed': int(gone.sum()) - modified,
+                'unchanged': int(unchanged.sum())
+            }
+
+        # 候选集：流量阈值只比较数值列，TOP-N 用线性时间选择
+        candidates = np.union1d(np.flatnonzero(traffic >= CANDIDATE_MIN_TRAFFIC),
+                                top_positions(traffic, CANDIDATE_TOP_N))
+        if keep is not None:
+            candidates = np.union1d(candidates, np.flatnonzero(keep(df)))
+        frame = df.iloc[candidates].copy()
+        frame['type'] = frame['type'].astype(object)
+
+        if unique_keys:
+            self._pending = {
+                'rows': dict(values, key=keys, type_code=type_codes, growth=growth, ai=ai),
+                'types': types.tolist(),
+                'aggregates': aggregates
+            }
+
+        type_stats = pd.DataFrame(aggregates['type_stats'], columns=['type', 'traffic', 'share', 'count'])
+        return Refresh(
+            frame=frame,
+            total_traffic=aggregates['total_traffic'],
+            total_sources=len(df),
+            aggregates={
+                'ai_traffic': aggregates['ai_traffic'],
+                'growth_sources': aggregates['growth_sources'],
+                'type_stats': type_stats
+            },
+            mode=mode,
+            diff=diff
+        )
+
+    def save(self, charts: dict = None, report: dict = None):
+        """保存本次刷新后的状态，以及图表和报告的指纹（报告生成成功后调用）"""
+        if self._pending is None:
+            return
+
+        # 两个文件分别替换，用同一个标记确认它们属于同一次保存
+        token = uuid.uuid4().hex
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        rows_path = self.state_dir / ROWS_FILE
+        tmp_path = rows_path.with_name(f'{ROWS_FILE}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, token=np.array(token), **self._pending['rows'])
+        os.replace(tmp_path, rows_path)
+
+        state = {
+            'version': STATE_VERSION,
+            'token': token,
+            'types': self._pending['types'],
+            'aggregates': self._pending['aggregates'],
+            'charts': charts if charts is not None else self.charts,
+            'report': report if report is not None else self.report
+        }
+        state_path = self.state_dir / STATE_FILE
+        tmp_path = state_path.with_name(f'{STATE_FILE}.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, state_path)
+
+        self.state = state
+        self.rows = self._pending['rows']
+        self._pending = None
+
+    def _load(self):
+        """读取上一次的状态，不存在或版本不符时视为无状态"""
+        try:
+            state = json.loads((self.state_dir / STATE_FILE).read_text(encoding='utf-8'))
+            with np.load(self.state_dir / ROWS_FILE) as rows:
+                rows = {name: rows[name] for name in rows.files}
+        except (OSError, ValueError):
+            return
+        if state.get('version') != STATE_VERSION or str(rows.pop('token', '')) != state.get('token'):
+            return
+        self.state = state
+        self.rows = rows
+
+
+def _extend_vocabulary(vocabulary: pd.Index, values: pd.Series):
+    """把新出现的取值追加到词表末尾，返回 (新词表, 各行编码)；缺失值编码为 -1"""
+    codes, uniques = pd.factorize(values)
+    mapping = vocabulary.get_indexer(uniques)
+    new = mapping < 0
+    if new.any():
+        vocabulary = vocabulary.append(pd.Index(uniques[new], dtype=object))
+        mapping = vocabulary.get_indexer(uniques)
+    # 末尾多留一个 -1，缺失值的编码 -1 正好取到它
+    return vocabulary, np.append(mapping, -1).astype(np.int32)[codes]
+
+
+def _group_sums(type_codes, traffic, share, types: pd.Index) -> list:
+    """按类型汇总，返回 [type, traffic, share, count] 列表（按类型名排序，缺失类型不计）"""
+    valid = type_codes >= 0
+    size = len(types)
+    traffic_sums = np.bincount(type_codes[valid], weights=traffic[valid], minlength=size)
+    share_sums = np.bincount(type_codes[valid], weights=share[valid], minlength=size)
+    counts = np.bincount(type_codes[valid], minlength=size)
+    return sorted(
+        [types[i], int(traffic_sums[i]), float(share_sums[i]), int(counts[i])]
+        for i in np.flatnonzero(counts)
+    )
+
+
+def _add_stats(stats: list, delta: list) -> list:
+    merged = {row[0]: list(row) for row in stats}
+    for type_name, traffic, share, count in delta:
+        row = merged.setdefault(type_name, [type_name, 0, 0.0, 0])
+        row[1] += traffic
+        row[2] += share
+        row[3] += count
+    return sorted(row for row in merged.values() if row[3] > 0)
+
+
+def _subtract_stats(stats: list, delta: list) -> list:
+    return _add_stats(stats, [[t, -traffic, -share, -count] for t, traffic, share, count in delta])
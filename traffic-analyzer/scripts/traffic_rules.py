@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+阈值规则 - AI 工具评级、风险等级、机会区间等阈值由声明式规则文件（JSON / YAML）定义，
+编译为条件树，在数据框上求值为向量化掩码，分级用 numpy.select
+
+规则文件中可以有多个方案（profile），每个方案由以下规则集组成，未写出的规则集和字段沿用
+"extends" 指定的方案（默认为内置方案 data/default_rules.json）:
+    growth_leaders  高增长排行的入选条件（analyze_traffic.py growth）
+    ai_sources      AI 来源列表的入选条件（analyze_traffic.py ai_tools，另需命中 AI 关键词）
+    ai_rating       报告 AI 工具排行的入选条件和 S/A/B 评级
+    opportunity     机会赛道（analyze_traffic.py opportunities、报告机会列表和机会图）
+    risk            报告风险标的的入选条件和风险等级
+
+条件写法:
+    {"traffic": {">=": 50000, "<=": 1000000}, "traffic_diff": {">=": 0.2}}   各项同时满足
+    {"any": [条件, ...]} / {"all": [条件, ...]} / {"not": 条件}
+    运算符: > >= < <= == != in（in 的值为列表，如 {"type": {"in": ["search", "direct"]}}）
+
+分级规则集的 tiers 按顺序取第一个满足的等级，都不满足时取 default。
+多个方案在同一份数据上求值时共用一个 Evaluator：列数组只取一次，相同的比较只计算一次
+
+依赖:
+    pip install pyyaml  # 只在读取 YAML 规则文件时需要
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import operator
+from pathlib import Path
+
+# numpy 只在向量化求值时导入：小文件的标准库路径逐行判断条件，不需要它
+
+
+DEFAULT_RULES_PATH = Path(__file__).parent / 'data' / 'default_rules.json'
+DEFAULT_PROFILE = 'default'
+
+RULE_SETS = ('growth_leaders', 'ai_sources', 'ai_rating', 'opportunity', 'risk')
+
+# 条件中可以引用的列
+COLUMNS = ('type', 'target', 'traffic', 'prev_traffic', 'traffic_diff', 'traffic_share')
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    '==': operator.eq, '!=': operator.ne, 'in': None
+}
+
+
+class Compare:
+    """单列比较"""
+
+    def __init__(self, column: str, op: str, value):
+        if column not in COLUMNS:
+            raise ValueError(f"未知的列: {column}（可选 {' / '.join(COLUMNS)}）")
+        if op not in OPERATORS:
+            raise ValueError(f"未知的运算符: {op}（可选 {' '.join(OPERATORS)}）")
+        if (op == 'in') != isinstance(value, list):
+            raise ValueError(f"{column} {op} 的值应为{'列表' if op == 'in' else '单个值'}: {value!r}")
+        self.column = column
+        self.op = op
+        self.value = tuple(value) if op == 'in' else value
+
+    def mask(self, evaluator):
+        return evaluator.compare(self.column, self.op, self.value)
+
+    def test(self, row: dict) -> bool:
+        if self.op == 'in':
+            return row[self.column] in self.value
+        return bool(OPERATORS[self.op](row[self.column], self.value))
+
+
+class AllOf:
+    """各项同时满足（没有子条件时总是满足）"""
+
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    def mask(self, evaluator):
+        result = evaluator.constant(True)
+        for part in self.parts:
+            result = result & part.mask(evaluator)
+        return result
+
+    def test(self, row: dict) -> bool:
+        return all(part.test(row) for part in self.parts)
+
+
+class AnyOf:
+    """任一满足"""
+
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    def mask(self, evaluator):
+        result = evaluator.constant(False)
+        for part in self.parts:
+            result = result | part.mask(evaluator)
+        return result
+
+    def test(self, row: dict) -> bool:
+        return any(part.test(row) for part in self.parts)
+
+
+class Not:
+    """取反"""
+
+    def __init__(self, part):
+        self.part = part
+
+    def mask(self, evaluator):
+        return ~self.part.mask(evaluator)
+
+    def test(self, row: dict) -> bool:
+        return not self.part.test(row)
+
+
+def compile_condition(spec):
+    """条件（见模块说明）-> 条件树"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"条件应为对象: {spec!r}")
+
+    parts = []
+    for key, value in spec.items():
+        if key in ('all', 'any'):
+            if not isinstance(value, list):
+                raise ValueError(f"{key} 的值应为条件列表: {value!r}")
+            children = [compile_condition(child) for child in value]
+            parts.append(AllOf(children) if key == 'all' else AnyOf(children))
+        elif key == 'not':
+            parts.append(Not(compile_condition(value)))
+        elif isinstance(value, dict):
+            parts.extend(Compare(key, op, operand) for op, operand in value.items())
+        else:
+            raise ValueError(f"列 {key} 的条件应为 {{运算符: 值}}: {value!r}")
+    return parts[0] if len(parts) == 1 else AllOf(parts)
+
+
+class Evaluator:
+    """
+    一份数据上的条件求值
+
+    列数组只取一次，相同的比较（列、运算符、值）只计算一次，多个规则集、多个方案共用
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._columns = {}
+        self._masks = {}
+
+    def column(self, name: str):
+        if name not in self._columns:
+            self._columns[name] = self.frame[name].to_numpy()
+        return self._columns[name]
+
+    def compare(self, column: str, op: str, value):
+        key = (column, op, value)
+        if key not in self._masks:
+            import numpy as np
+
+            values = self.column(column)
+            if op == 'in':
+                mask = np.isin(values, list(value))
+            else:
+                mask = OPERATORS[op](values, value)
+            self._masks[key] = np.asarray(mask, dtype=bool)
+        return self._masks[key]
+
+    def constant(self, value: bool):
+        import numpy as np
+
+        return np.full(len(self.frame), value, dtype=bool)
+
+
+def evaluator(frame) -> Evaluator:
+    """数据框或已有的 Evaluator"""
+    return frame if isinstance(frame, Evaluator) else Evaluator(frame)
+
+
+class Rule:
+    """
+    一个规则集
+
+    Attributes:
+        when: 入选条件
+        tiers: [(条件, 等级字段)]，按顺序取第一个满足的等级
+        default: 都不满足时的等级字段
+        label: 说明文字（如图表标题中的区间）
+    """
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        try:
+            self.label = spec.get('label', '')
+            self.when = compile_condition(spec.get('when', {}))
+            self.tiers = [(compile_condition(tier.get('when', {})), tier) for tier in spec.get('tiers', [])]
+            self.default = spec.get('default', {})
+        except (AttributeError, ValueError) as e:
+            raise ValueError(f"规则集 {name}: {e}") from None
+
+    def mask(self, frame):
+        """入选条件的布尔数组"""
+        return self.when.mask(evaluator(frame))
+
+    def test(self, row: dict) -> bool:
+        """单行是否入选（标准库路径使用）"""
+        return self.when.test(row)
+
+    def override(self, bounds: dict) -> 'Rule':
+        """
+        替换入选条件中的单列阈值，返回新的规则集（分级不变）
+
+        Args:
+            bounds: {(列, 运算符): 值}，值为 None 的项沿用规则；入选条件顶层有同一列、
+                同一运算符的比较时替换其值，没有时追加为必须同时满足的条件
+        """
+        bounds = {key: value for key, value in bounds.items() if value is not None}
+        if not bounds:
+            return self
+
+        parts = list(self.when.parts) if isinstance(self.when, AllOf) else [self.when]
+        for i, part in enumerate(parts):
+            key = (part.column, part.op) if isinstance(part, Compare) else None
+            if key in bounds:
+                parts[i] = Compare(part.column, part.op, bounds.pop(key))
+        parts.extend(Compare(column, op, value) for (column, op), value in bounds.items())
+
+        rule = copy.copy(self)
+        rule.when = AllOf(parts)
+        return rule
+
+    def classify(self, frame, field: str = 'label'):
+        """各行的等级字段（numpy.select）"""
+        import numpy as np
+
+        ev = evaluator(frame)
+        default = self.default.get(field)
+        if not self.tiers:
+            return np.full(len(ev.frame), default)
+        conditions = [condition.mask(ev) for condition, _ in self.tiers]
+        choices = [tier.get(field, default) for _, tier in self.tiers]
+        return np.select(conditions, choices, default=default)
+
+
+class Profile:
+    """一个阈值方案，各规则集为同名属性"""
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.spec = spec
+        self.key = hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+        for rule_set in RULE_SETS:
+            setattr(self, rule_set, Rule(rule_set, spec.get(rule_set, {})))
+
+    def candidates(self, frame):
+        """报告用到的行（AI 评级、机会、风险任一入选），流式读取和增量更新时保留在候选集中"""
+        ev = evaluator(frame)
+        return self.ai_rating.mask(ev) | self.opportunity.mask(ev) | self.risk.mask(ev)
+
+
+def any_mask(frame, rules: list):
+    """多个规则集（通常来自不同方案）入选条件的并集"""
+    ev = evaluator(frame)
+    result = ev.constant(False)
+    for rule in rules:
+        result = result | rule.mask(ev)
+    return result
+
+
+def read_rules_file(path) -> dict:
+    """读取规则文件，返回 {方案名: 方案定义}"""
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('读取 YAML 规则文件需要 pyyaml（pip install pyyaml），也可以改用 JSON') from None
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f'规则文件格式错误: {path}: {e}') from None
+    else:
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f'规则文件格式错误: {path}: {e}') from None
+
+    if not isinstance(data, dict) or not isinstance(data.get('profiles'), dict) or not data['profiles']:
+        raise ValueError(f'规则文件中没有 profiles: {path}')
+    return data['profiles']
+
+
+@functools.lru_cache(maxsize=None)
+def _builtin_specs() -> dict:
+    return read_rules_file(DEFAULT_RULES_PATH)
+
+
+def _resolve(name: str, specs: dict, chain: tuple = ()) -> dict:
+    """展开继承：规则集按字段覆盖基础方案"""
+    if name not in specs:
+        builtin = _builtin_specs()
+        if name not in builtin:
+            raise ValueError(f"未知的方案: {name}（可选 {' / '.join(list(specs) or list(builtin))}）")
+        return {rule_set: dict(builtin[name][rule_set]) for rule_set in RULE_SETS}
+    if name in chain:
+        raise ValueError(f"方案循环继承: {' -> '.join(chain + (name,))}")
+
+    spec = dict(specs[name])
+    base_name = spec.pop('extends', DEFAULT_PROFILE)
+    # 与自身同名的基础方案指内置方案（如文件中的 default 覆盖内置 default 的部分阈值）
+    base_specs = {k: v for k, v in specs.items() if k != name} if base_name == name else specs
+    merged = _resolve(base_name, base_specs, chain + (name,))
+
+    for rule_set, value in spec.items():
+        if rule_set not in RULE_SETS:
+            raise ValueError(f"方案 {name}: 未知的规则集 {rule_set}（可选 {' / '.join(RULE_SETS)}）")
+        if not isinstance(value, dict):
+            raise ValueError(f"方案 {name}: 规则集 {rule_set} 应为对象")
+        merged[rule_set] = {**merged[rule_set], **value}
+    return merged
+
+
+def load_profiles(path=None, names=None) -> list:
+    """
+    读取阈值方案
+
+    Args:
+        path: 规则文件（.json / .yaml / .yml），None 时只有内置默认方案
+        names: 方案名列表，None 时取文件中的全部方案（未指定文件时为内置默认方案）
+
+    Raises:
+        ValueError: 规则文件格式错误、方案不存在或条件无法解析
+    """
+    specs = read_rules_file(path) if path else {}
+    if names is None:
+        names = list(specs) or [DEFAULT_PROFILE]
+    return [Profile(name, _resolve(name, specs)) for name in names]
+
+
+@functools.lru_cache(maxsize=None)
+def default_profile() -> Profile:
+    """内置默认方案"""
+    return load_profiles()[0]
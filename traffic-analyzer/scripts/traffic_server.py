@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+流量分析常驻服务 - 数据集加载一次后常驻内存，反复查询不再重复启动和解析
+通过本机 HTTP（默认 127.0.0.1:8765）或 Unix socket 提供 JSON 接口，
+客户端见 traffic_client.py（参数与 analyze_traffic.py 相同）
+
+使用方法:
+    python traffic_server.py [--port=N] [--socket=PATH] [--max-mb=N] [--compact-target]
+
+接口:
+    GET    /health                                  服务状态
+    GET    /datasets                                已加载的数据集
+    POST   /datasets         {"path": ..., "name": ...}  加载（或刷新）数据集
+    DELETE /datasets/<name>                         卸载数据集
+    GET    /analyze?analysis=<type>&path=<csv>      运行分析，也可用 dataset=<name> 指定已命名的数据集
+           analysis 取值同 analyze_traffic.py，另支持 risk（下行风险标的）；
+           可选 level=domain（按可注册域名汇总）、rules=<规则文件路径>、profiles=<方案名,...>，
+           含义同 analyze_traffic.py 的 --level / --rules / --rule-profile
+
+数据集按内存占用做 LRU 淘汰，总量超过 --max-mb（默认 TRAFFIC_SERVER_MAX_MB 或 4096）时
+卸载最久未使用的数据集；CSV 文件修改后下次查询自动重新加载。
+--compact-target 时 target 列按字典编码常驻（见 target_vocab.py），重复域名多时内存更小，
+AI 关键词匹配结果按词表缓存，各项查询共用
+"""
+
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from analyze_traffic import _by_profile, run_profiles
+from domain_index import LEVELS, apply_level
+from traffic_rules import default_profile, load_profiles
+
+
+DEFAULT_PORT = 8765
+
+# 数据集内存上限（MB）
+DEFAULT_MAX_MB = int(os.environ.get('TRAFFIC_SERVER_MAX_MB', 4096))
+
+# 每个数据集缓存的分析结果数（按类型、粒度、阈值方案区分），超出时淘汰最久未用的结果
+RESULT_CACHE_SIZE = 32
+
+ANALYSIS_TYPES = ['growth', 'by_type', 'ai_tools', 'segments', 'opportunities', 'risk', 'all']
+
+
+class Dataset:
+    """一个已加载的数据集：分析器、文件签名和分析结果缓存"""
+
+    def __init__(self, name: str, path: Path, compact: bool = False):
+        from generate_report import TrafficAnalyzer
+
+        started = time.perf_counter()
+        self.name = name
+        self.path = path
+        self.signature = self.file_signature(path)
+        self.analyzer = TrafficAnalyzer(str(path), compact=compact)
+        self.memory_bytes = int(self.analyzer.df.memory_usage(deep=True).sum())
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+        self.queries = 0
+        self.lock = threading.Lock()
+        self._frames = {'target': self.analyzer.df}
+        self._results = OrderedDict()
+
+    @staticmethod
+    def file_signature(path: Path):
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_stale(self) -> bool:
+        """CSV 是否在加载后被修改或删除"""
+        try:
+            return self.file_signature(self.path) != self.signature
+        except OSError:
+            return True
+
+    def analyze(self, analysis_type: str, level: str = 'target', profiles: list = None) -> dict:
+        """
+        运行分析，同一数据集上的相同分析（类型、粒度、阈值方案）只计算一次，
+        最多缓存 RESULT_CACHE_SIZE 个结果
+
+        Args:
+            level: 分析粒度，'domain' 时在按可注册域名汇总后的数据上分析（汇总结果常驻）
+            profiles: 阈值方案列表（见 traffic_rules.py），默认为内置方案；多个方案时结果为
+                      {'profiles': {方案名: 结果}}，同 analyze_traffic.py
+        """
+        profiles = profiles or [default_profile()]
+        key = (analysis_type, level, tuple((p.name, p.key) for p in profiles))
+        with self.lock:
+            self.queries += 1
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+            df = self._frame(level)
+            if analysis_type == 'risk':
+                result = _by_profile(profiles, lambda p: {'risk_items': self._analyzer(level, p).find_risk_items()})
+            else:
+                result = run_profiles(df, analysis_type, profiles)
+            self._results[key] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return result
+
+    def _frame(self, level: str):
+        """按分析粒度取数据（调用方持有 self.lock）"""
+        if level not in self._frames:
+            df = apply_level(self.analyzer.df, level)
+            self._frames[level] = df
+            self.memory_bytes += int(df.memory_usage(deep=True).sum())
+        return self._frames[level]
+
+    def _analyzer(self, level: str, rules):
+        """按粒度和阈值方案取分析器，内置方案的原始粒度直接用常驻的分析器"""
+        if level == 'target' and rules.key == self.analyzer.rules.key:
+            return self.analyzer
+        from generate_report import TrafficAnalyzer
+
+        df = self._frames[level]
+        return TrafficAnalyzer.from_reduced(df, int(df['traffic'].sum()), len(df), {}, rules=rules)
+
+    def info(self) -> dict:
+        return {
+            'name': self.name,
+            'path': str(self.path),
+            'rows': len(self.analyzer.df),
+            'memory_bytes': self.memory_bytes,
+            'load_seconds': round(self.load_seconds, 3),
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.loaded_at)),
+            'queries': self.queries
+        }
+
+
+class DatasetRegistry:
+    """
+    数据集注册表，按内存占用做 LRU 淘汰
+
+    名称默认为 CSV 的绝对路径；新加载的数据集即使单独超过上限也会保留。
+    解析 CSV 时不持有注册表的锁，其他数据集的查询不受影响；同名数据集同时加载时只解析一次
+    """
+
+    def __init__(self, max_bytes: int, compact: bool = False):
+        self.max_bytes = max_bytes
+        self.compact = compact
+        self._datasets = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(d.memory_bytes for d in self._datasets.values())
+
+    def load(self, path, name: str = None) -> Dataset:
+        """加载数据集，已加载且文件未修改时直接返回"""
+        path = Path(path).resolve()
+        name = name or str(path)
+        with self._lock:
+            dataset = self._datasets.get(name)
+            if dataset is not None and dataset.path == path and not dataset.is_stale():
+                self._datasets.move_to_end(name)
+                return dataset
+
+            future = self._loading.get(name)
+            loading = future is None
+            if loading:
+                future = self._loading[name] = Future()
+
+        if not loading:
+            # 同名数据集正在由其他请求加载，等待其结果（加载失败时抛出同样的异常）
+            dataset = future.result()
+            return dataset if dataset.path == path else self.load(path, name)
+
+        try:
+            dataset = Dataset(name, path, self.compact)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._loading[name]
+            self._datasets.pop(name, None)
+            self._datasets[name] = dataset
+            self._evict()
+        future.set_result(dataset)
+        return dataset
+
+    def analyze(self, dataset: Dataset, analysis_type: str, level: str = 'target', profiles: list = None) -> dict:
+        """在数据集上运行分析（见 Dataset.analyze），汇总数据使数据集变大时按内存上限重新淘汰"""
+        before = dataset.memory_bytes
+        result = dataset.analyze(analysis_type, level, profiles)
+        if dataset.memory_bytes != before:
+            with self._lock:
+                self._evict()
+        return result
+
+    def get(self, name: str) -> Dataset:
+        """按名称取数据集，文件已修改时重新加载；不存在时抛出 KeyError"""
+        with self._lock:
+            dataset = self._datasets[name]
+        if dataset.is_stale():
+            return self.load(dataset.path, name)
+        with self._lock:
+            if name in self._datasets:
+                self._datasets.move_to_end(name)
+        return dataset
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self._datasets.pop(name, None) is not None
+
+    def list(self) -> list:
+        with self._lock:
+            return [d.info() for d in self._datasets.values()]
+
+    def _evict(self):
+        while len(self._datasets) > 1 and self.total_bytes > self.max_bytes:
+            name, dataset = self._datasets.popitem(last=False)
+            print(f"卸载数据集 {name}（{dataset.memory_bytes / 1024 / 1024:.1f} MB）", file=sys.stderr)
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """JSON 接口，HTTP 和 Unix socket 共用"""
+
+    server_version = 'TrafficAnalysisServer/1.0'
+
+    @property
+    def registry(self) -> DatasetRegistry:
+        return self.server.registry
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            self._send(200, {'status': 'ok', 'datasets': len(self.registry.list())})
+        elif url.path == '/datasets':
+            self._send(200, {
+                'datasets': self.registry.list(),
+                'total_bytes': self.registry.total_bytes,
+                'max_bytes': self.registry.max_bytes
+            })
+        elif url.path == '/analyze':
+            self._analyze(query)
+        else:
+            self._send(404, {'error': f'未知路径: {url.path}'})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/datasets':
+            self._send(404, {'error': f'未知路径: {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            dataset = self.registry.load(body['path'], body.get('name'))
+        except KeyError:
+            self._send(400, {'error': '缺少 path'})
+        except (ValueError, OSError) as e:
+            self._send(400, {'error': f'{type(e).__name__}: {e}'})
+        else:
+            self._send(200, dataset.info())
+
+    def do_DELETE(self):
+        path = urlsplit(self.path).path
+        name = path[len('/datasets/'):] if path.startswith('/datasets/') else ''
+        if name and self.registry.remove(name):
+            self._send(200, {'removed': name})
+        else:
+            self._send(404, {'error': f'数据集不存在: {name}'})
+
+    def _analyze(self, query: dict):
+        analysis_type = query.get('analysis', 'all')
+        if analysis_type not in ANALYSIS_TYPES:
+            self._send(400, {'error': f'未知分析类型: {analysis_type}'})
+            return
+        level = query.get('level', 'target')
+        if level not in LEVELS:
+            self._send(400, {'error': f"未知的分析粒度: {level}（可选 {' / '.join(LEVELS)}）"})
+            return
+        try:
+            names = query['profiles'].split(',') if query.get('profiles') else None
+            profiles = load_profiles(query.get('rules'), names)
+        except (ValueError, OSError) as e:
+            self._send(400, {'error': f'{type(e).__name__}: {e}'})
+            return
+
+        try:
+            if 'dataset' in query:
+                dataset = self.registry.get(query['dataset'])
+            elif 'path' in query:
+                dataset = self.registry.load(query['path'])
+            else:
+                self._send(400, {'error': '需要 path 或 dataset 参数'})
+                return
+            result = self.registry.analyze(dataset, analysis_type, level, profiles)
+        except KeyError:
+            self._send(404, {'error': f"数据集不存在: {query['dataset']}"})
+        except OSError as e:
+            self._send(400, {'error': f'{type(e).__name__}: {e}'})
+        except Exception as e:
+            self._send(500, {'error': f'{type(e).__name__}: {e}'})
+        else:
+            self._send(200, result)
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket 的客户端地址为空字符串
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
+
+
+def _json_default(value):
+    """numpy 标量转为 Python 原生类型"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class UnixAnalysisServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(registry: DatasetRegistry, port: int = DEFAULT_PORT, socket_path: str = None):
+    """创建 HTTP 服务（只监听 127.0.0.1）或 Unix socket 服务"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixAnalysisServer(socket_path, AnalysisRequestHandler)
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), AnalysisRequestHandler)
+    server.registry = registry
+    return server
+
+
+def main():
+    """主函数"""
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if '--help' in options:
+        print("Usage: python traffic_server.py [--port=N] [--socket=PATH] [--max-mb=N] [--compact-target]")
+        print("\nOptions:")
+        print(f"  --port=N       - 监听 127.0.0.1 的端口（默认 {DEFAULT_PORT}）")
+        print("  --socket=PATH  - 改为监听 Unix socket")
+        print(f"  --max-mb=N     - 数据集内存上限，超出时按 LRU 卸载（默认 {DEFAULT_MAX_MB}）")
+        print("  --compact-target - target 列字典编码常驻，关键词匹配只在去重后的域名上运行")
+        sys.exit(1)
+
+    port = DEFAULT_PORT
+    socket_path = None
+    max_mb = DEFAULT_MAX_MB
+    for option in options:
+        if option.startswith('--port='):
+            port = int(option.split('=', 1)[1])
+        elif option.startswith('--socket='):
+            socket_path = option.split('=', 1)[1]
+        elif option.startswith('--max-mb='):
+            max_mb = int(option.split('=', 1)[1])
+
+    registry = DatasetRegistry(max_mb * 1024 * 1024, '--compact-target' in options)
+    server = create_server(registry, port, socket_path)
+    address = f'unix:{socket_path}' if socket_path else f'http://127.0.0.1:{port}'
+    print(f"流量分析服务已启动: {address}（数据集内存上限 {max_mb} MB）", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == '__main__':
+    main()
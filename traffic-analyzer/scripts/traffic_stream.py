@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+流式数据加载工具 - 分块读取超大流量 CSV
+逐块折叠为各项分析所需的聚合结果（分类汇总、TOP-N、阈值候选集），
+峰值内存只取决于块大小和结果规模，与文件大小无关
+
+多个分片（按地区、按月拆分的导出）可以在进程池中各自折叠，再按分片顺序精确合并，
+结果与把分片依次拼接成一个文件后流式读取相同
+"""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from traffic_topn import top_n, top_n_per_group
+
+
+# 分块读取时的列类型
+# traffic_diff / traffic_share 保持 float64，保证百分比格式化结果与全量加载一致；
+# 流量用 int64（头部来源可能超过 2^31），新出现的来源 prev_traffic 为空，按可空整数读取后补 0
+STREAM_DTYPES = {
+    'type': 'category',
+    'traffic': 'int64',
+    'prev_traffic': 'Int64',
+    'traffic_diff': 'float64',
+    'traffic_share': 'float64'
+}
+
+# 默认每块行数
+DEFAULT_CHUNKSIZE = 500000
+
+# 路径中含这些字符时按 glob 模式展开为分片
+GLOB_CHARS = '*?['
+
+
+def is_sharded(path) -> bool:
+    """路径是否表示多个分片（glob 模式或目录；同名文件存在时按单个文件处理）"""
+    path = Path(path)
+    return path.is_dir() or (not path.is_file() and any(c in str(path) for c in GLOB_CHARS))
+
+
+def expand_shards(path) -> list:
+    """
+    展开分片路径，按文件名排序（排序即合并顺序）
+
+    Args:
+        path: glob 模式（如 'exports/2024-*.csv'）或目录（取其中的 *.csv）
+    """
+    if Path(path).is_dir():
+        shards = sorted(str(p) for p in Path(path).glob('*.csv'))
+    else:
+        shards = sorted(glob.glob(str(path)))
+    if not shards:
+        raise FileNotFoundError(f'没有匹配的分片文件: {path}')
+    return shards
+
+
+def iter_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    分块读取 CSV
+
+    每块的索引为其在整个文件中的行号，合并候选集时可以还原原始顺序
+    """
+    offset = 0
+    for chunk in pd.read_csv(filepath, dtype=STREAM_DTYPES, chunksize=chunksize):
+        chunk['prev_traffic'] = chunk['prev_traffic'].fillna(0).astype('int64')
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+class StreamReducer:
+    """
+    分块折叠器
+
+    Args:
+        keep: 行筛选函数列表，命中任一条件的行全部保留（阈值候选集）
+        top: (排序列, N, 筛选函数或 None) 列表，保留全局 TOP-N 行
+        top_per_type: (排序列, N) 列表，保留每个类型的 TOP-N 行
+        sums: {名称: 函数} 逐块求和的标量指标
+    """
+
+    def __init__(self, keep=None, top=None, top_per_type=None, sums=None):
+        self.keep = keep or []
+        self.top = top or []
+        self.top_per_type = top_per_type or []
+        self.sums = sums or {}
+
+        self.total_rows = 0
+        self.totals = {name: 0 for name in self.sums}
+        self._type_stats = {}
+        self._first_rows = {}
+        self._kept = []
+        self._top_frames = [None] * len(self.top)
+        self._per_type_frames = [None] * len(self.top_per_type)
+
+    def update(self, chunk: pd.DataFrame):
+        """折叠一个数据块"""
+        self.total_rows += len(chunk)
+
+        for name, func in self.sums.items():
+            self.totals[name] += func(chunk)
+
+        # 分类汇总（按首次出现顺序记录）
+        grouped = chunk.astype({'traffic': 'int64'}).groupby('type', sort=False, observed=True).agg(
+            traffic=('traffic', 'sum'),
+            share=('traffic_share', 'sum'),
+            count=('target', 'count')
+        )
+        for type_name, row in grouped.iterrows():
+            stats = self._type_stats.setdefault(type_name, [0, 0.0, 0])
+            stats[0] += int(row['traffic'])
+            stats[1] += float(row['share'])
+            stats[2] += int(row['count'])
+
+        # 每个类型的首行，保证候选集上 unique() 的类型顺序与全量一致
+        first_rows = chunk[~chunk['type'].isin(list(self._first_rows))].drop_duplicates('type')
+        for type_name, idx in zip(first_rows['type'], first_rows.index):
+            self._first_rows[type_name] = idx
+        self._kept.append(first_rows)
+
+        for func in self.keep:
+            self._kept.append(chunk[func(chunk)])
+
+        for i, (column, n, func) in enumerate(self.top):
+            part = chunk[func(chunk)] if func else chunk
+            frame = self._top_frames[i]
+            frame = part if frame is None else pd.concat([frame, part])
+            self._top_frames[i] = top_n(frame, column, n)
+
+        for i, (column, n) in enumerate(self.top_per_type):
+            frame = self._per_type_frames[i]
+            frame = chunk if frame is None else pd.concat([frame, chunk])
+            self._per_type_frames[i] = top_n_per_group(frame, 'type', column, n)
+
+    def consume(self, chunks):
+        """折叠全部数据块"""
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def frame(self) -> pd.DataFrame:
+        """
+        合并所有候选行，按原始行号排序
+
+        结果是全量数据的一个子集，且包含每项分析需要的全部行，
+        在其上执行原有的分析函数即可得到与全量加载相同的结果
+        """
+        parts = self._kept + [f for f in self._top_frames + self._per_type_frames if f is not None]
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return pd.DataFrame(columns=list(STREAM_DTYPES) + ['target'])
+        df = pd.concat(parts)
+        df = df[~df.index.duplicated()].sort_index()
+        df['type'] = df['type'].astype(object)
+        return df
+
+    def partial(self) -> dict:
+        """折叠状态（不含筛选函数，可在进程间传递），用 merge 合并到另一个折叠器"""
+        return {
+            'total_rows': self.total_rows,
+            'totals': self.totals,
+            'type_stats': self._type_stats,
+            'first_rows': self._first_rows,
+            'kept': self._kept,
+            'top': self._top_frames,
+            'per_type': self._per_type_frames
+        }
+
+    def merge(self, partial: dict):
+        """
+        合并另一个折叠器（筛选条件相同）的部分结果，视为接在已折叠的数据之后
+
+        部分结果的行号整体后移已折叠的行数，按分片顺序依次合并时，
+        候选集、TOP-N 和计数与把分片拼接后逐块折叠完全相同；合并会原地修改 partial 中的数据框
+        """
+        offset = self.total_rows
+
+        def shift(frame):
+            frame.index = frame.index + offset
+            return frame
+
+        self.total_rows += partial['total_rows']
+        for name, value in partial['totals'].items():
+            self.totals[name] += value
+
+        for type_name, (traffic, share, count) in partial['type_stats'].items():
+            stats = self._type_stats.setdefault(type_name, [0, 0.0, 0])
+            stats[0] += traffic
+            stats[1] += share
+            stats[2] += count
+
+        for type_name, idx in partial['first_rows'].items():
+            self._first_rows.setdefault(type_name, idx + offset)
+        self._kept.extend(shift(frame) for frame in partial['kept'])
+
+        for i, part in enumerate(partial['top']):
+            if part is None:
+                continue
+            column, n, _ = self.top[i]
+            frame = self._top_frames[i]
+            part = shift(part)
+            self._top_frames[i] = part if frame is None else top_n(pd.concat([frame, part]), column, n)
+
+        for i, part in enumerate(partial['per_type']):
+            if part is None:
+                continue
+            column, n = self.top_per_type[i]
+            frame = self._per_type_frames[i]
+            part = shift(part)
+            self._per_type_frames[i] = (part if frame is None
+                                        else top_n_per_group(pd.concat([frame, part]), 'type', column, n))
+        return self
+
+    def type_stats(self) -> pd.DataFrame:
+        """按类型汇总结果，列为 type / traffic / share / count，与 groupby('type') 的顺序一致"""
+        rows = [
+            {'type': t, 'traffic': s[0], 'share': s[1], 'count': s[2]}
+            for t, s in sorted(self._type_stats.items())
+        ]
+        return pd.DataFrame(rows, columns=['type', 'traffic', 'share', 'count'])
+
+
+def reduce_shard(factory, filepath, chunksize: int = DEFAULT_CHUNKSIZE) -> dict:
+    """折叠一个分片，返回部分结果（在工作进程中执行）"""
+    return factory().consume(iter_chunks(filepath, chunksize)).partial()
+
+
+def reduce_shards(factory, shards: list, chunksize: int = DEFAULT_CHUNKSIZE, workers: int = None) -> StreamReducer:
+    """
+    在进程池中逐个分片折叠，再按分片顺序合并
+
+    每个工作进程一次只读取一个分片的一块，主进程只持有各分片的候选集和汇总，
+    任何进程都不会持有全部数据
+
+    Args:
+        factory: 无参数、返回 StreamReducer 的模块级函数（需可被工作进程导入）
+        shards: 分片路径列表，按此顺序合并
+        chunksize: 每块行数
+        workers: 进程数（默认 CPU 核数，不超过分片数；1 时在当前进程中依次折叠）
+    """
+    reducer = factory()
+    workers = min(workers or os.cpu_count() or 1, len(shards))
+    if workers <= 1:
+        for path in shards:
+            reducer.merge(reduce_shard(factory, path, chunksize))
+        return reducer
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map 按提交顺序返回结果，先完成的分片等待前面的分片合并
+        for partial in executor.map(reduce_shard, repeat(factory), shards, repeat(chunksize)):
+            reducer.merge(partial)
+    return reducer
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+耗时追踪 - 报告生成各阶段的嵌套计时、内存峰值和可选的性能剖析
+
+    with tracer.span('charts'):
+        with tracer.span('chart:top20_sources', category='chart'):
+            ...
+
+每个 span 记录开始时间、耗时和该 span 期间的内存峰值（RSS）。Linux 上进入 span 时
+重置进程的峰值记录（/proc/self/clear_refs），得到的是各阶段自己的峰值；其他平台
+只能读到进程启动以来的峰值。渲染进程中的图表计时由主进程汇总，时间轴与主进程一致
+
+trace 以 Chrome trace-event 格式写出，可在 chrome://tracing 或 https://ui.perfetto.dev 打开
+
+依赖:
+    pip install pyinstrument  # 可选，--profile=pyinstrument 时使用，未安装时改用 cProfile
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+TRACE_FILE = 'report_trace.json'
+PROFILE_MODES = ('cprofile', 'pyinstrument')
+
+_HWM_PATTERN = re.compile(r'VmHWM:\s+(\d+) kB')
+
+
+def peak_rss() -> int:
+    """当前进程的内存峰值（字节），无法读取时返回 0"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            match = _HWM_PATTERN.search(f.read())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss() -> bool:
+    """重置进程的内存峰值记录（仅 Linux），成功时返回 True"""
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Span:
+    """一段计时记录"""
+
+    def __init__(self, name: str, category: str, start: float, args: dict, depth: int):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = 0.0
+        self.args = args
+        self.depth = depth
+        self.peak_rss = 0
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+
+class Tracer:
+    """
+    嵌套计时追踪器
+
+    Args:
+        enabled: False 时 span 不做任何记录，可以无条件地在代码中插入
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._stack = []
+        self._lock = threading.Lock()
+        self._per_stage_rss = None
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', **args):
+        """计时一段代码，args 写入 trace 的 args 字段"""
+        if not self.enabled:
+            yield None
+            return
+
+        with self._lock:
+            # 重置峰值前，把已经达到的峰值记到外层 span 上
+            current = peak_rss()
+            for outer in self._stack:
+                outer.peak_rss = max(outer.peak_rss, current)
+            if self._per_stage_rss is None:
+                self._per_stage_rss = reset_peak_rss()
+            elif self._per_stage_rss:
+                reset_peak_rss()
+            span = Span(name, category, time.perf_counter(), args, len(self._stack))
+            self._stack.append(span)
+            self.spans.append(span)
+        try:
+            yield span
+        finally:
+            with self._lock:
+                span.duration = time.perf_counter() - span.start
+                span.peak_rss = max(span.peak_rss, peak_rss())
+                self._stack.remove(span)
+                if self._stack:
+                    self._stack[-1].peak_rss = max(self._stack[-1].peak_rss, span.peak_rss)
+
+    def add_span(self, name: str, start: float, duration: float, pid: int, category: str = 'stage',
+                 peak: int = 0, **args):
+        """记录在其他进程中完成的计时（start 为 time.perf_counter() 的值）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            span = Span(name, category, start, args, len(self._stack))
+            span.duration = duration
+            span.peak_rss = peak
+            span.pid = pid
+            span.tid = pid
+            self.spans.append(span)
+
+    def stages(self) -> list:
+        """顶层 span 的 (名称, 耗时秒, 内存峰值字节)"""
+        return [(s.name, s.duration, s.peak_rss) for s in self.spans if s.depth == 0]
+
+    def summary(self) -> list:
+        """各 span 的耗时和内存峰值，按开始时间排列，缩进表示嵌套"""
+        lines = []
+        for span in sorted(self.spans, key=lambda s: s.start):
+            label = '  ' * span.depth + span.name
+            rss = f'{span.peak_rss / 1024 / 1024:8.1f} MB' if span.peak_rss else ''
+            lines.append(f'{label:<36} {span.duration:8.3f}s {rss}')
+        return lines
+
+    def write_chrome_trace(self, path) -> Path:
+        """写出 Chrome trace-event 格式的 JSON（时间单位微秒，完整事件 ph='X'）"""
+        main_pid = os.getpid()
+        events = [
+            {'name': 'process_name', 'ph': 'M', 'pid': main_pid, 'tid': 0, 'args': {'name': 'generate_report'}}
+        ]
+        for pid in sorted({s.pid for s in self.spans} - {main_pid}):
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                           'args': {'name': f'chart worker {pid}'}})
+
+        for span in sorted(self.spans, key=lambda s: s.start):
+            args = dict(span.args)
+            if span.peak_rss:
+                args['peak_rss_mb'] = round(span.peak_rss / 1024 / 1024, 1)
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.duration * 1e6, 1),
+                'pid': span.pid,
+                'tid': span.tid,
+                'args': args
+            })
+
+        path = Path(path)
+        trace = {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'per_stage_peak_rss': bool(self._per_stage_rss)}
+        }
+        path.write_text(json.dumps(trace, ensure_ascii=False, indent=1), encoding='utf-8')
+        return path
+
+
+class Profiler:
+    """
+    可选的整体性能剖析
+
+    Args:
+        mode: 'cprofile'（输出 profile.prof 并打印最耗时的函数）或 'pyinstrument'（输出 profile.html）
+    """
+
+    def __init__(self, mode: str = 'cprofile'):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析方式: {mode}（可选 {', '.join(PROFILE_MODES)}）")
+        if mode == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                print("警告: pyinstrument 未安装，改用 cProfile（pip install pyinstrument）", file=sys.stderr)
+                mode = 'cprofile'
+        self.mode = mode
+        self._profiler = None
+
+    def start(self):
+        if self.mode == 'pyinstrument':
+            from pyinstrument import Profiler as PyinstrumentProfiler
+            self._profiler = PyinstrumentProfiler()
+            self._profiler.start()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self, output_dir: Path, top: int = 20) -> Path:
+        """停止剖析并写出结果文件"""
+        if self.mode == 'pyinstrument':
+            self._profiler.stop()
+            path = Path(output_dir) / 'profile.html'
+            path.write_text(self._profiler.output_html(), encoding='utf-8')
+            return path
+
+        import pstats
+
+        self._profiler.disable()
+        path = Path(output_dir) / 'profile.prof'
+        self._profiler.dump_stats(str(path))
+        print(f"\n累计耗时最多的 {top} 个函数:")
+        pstats.Stats(self._profiler).sort_stats('cumulative').print_stats(top)
+        return path
@@ -4,25 +4,43 @@
 生成各类图表帮助理解数据
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import functools
 import sys
 from pathlib import Path
 
-# 设置中文字体和样式
-plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
-sns.set_style("whitegrid")
+from ai_matcher import ai_mask
+from chart_density import DENSITY_THRESHOLD, hexbin_traffic_growth, use_density
+from chart_output import check_format, save_figure
+from traffic_rules import Profile, default_profile, load_profiles
 
+# pandas/matplotlib/seaborn 只在需要时导入
 
-def load_data(filepath):
-    """加载数据"""
-    return pd.read_csv(filepath)
+DEFAULT_DPI = 300
 
 
-def plot_top_sources(df, top_n=20, output_file='top_sources.png'):
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """导入 matplotlib 并设置中文字体和样式（首次绘图时执行一次）"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    sns.set_style("whitegrid")
+    return plt
+
+
+def load_data(filepath, use_cache=True):
+    """加载数据（优先读取列式缓存）"""
+    from traffic_cache import read_csv_cached
+
+    return read_csv_cached(filepath, use_cache)
+
+
+def plot_top_sources(df, top_n=20, output_file='top_sources.png', fmt='png', dpi=DEFAULT_DPI):
     """绘制流量 TOP 来源"""
+    plt = _pyplot()
+
     df_top = df.nlargest(top_n, 'traffic')
     
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -39,26 +57,36 @@ def plot_top_sources(df, top_n=20, output_file='top_sources.png'):
     ax.invert_yaxis()
     
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    save_figure(plt, output_file, fmt, dpi)
     print(f"Saved: {output_file}")
     return output_file
 
 
-def plot_growth_scatter(df, output_file='growth_scatter.png'):
-    """绘制流量 vs 增长率散点图"""
-    # 过滤掉流量太小的
-    df_filtered = df[df['traffic'] > 10000].copy()
+def plot_growth_scatter(df, output_file='growth_scatter.png', fmt='png', dpi=DEFAULT_DPI,
+                        density_threshold=DENSITY_THRESHOLD, rules: Profile = None):
+    """绘制流量 vs 增长率散点图（点数超过 density_threshold 时画密度图）"""
+    plt = _pyplot()
+
+    # 过滤掉流量太小的（条件同 ai_sources 规则集）
+    rules = rules or default_profile()
+    df_filtered = df[rules.ai_sources.mask(df)].copy()
     
     fig, ax = plt.subplots(figsize=(12, 8))
     
-    scatter = ax.scatter(
-        df_filtered['traffic'], 
-        df_filtered['traffic_diff'] * 100,
-        alpha=0.6,
-        s=50,
-        c=df_filtered['traffic'],
-        cmap='viridis'
-    )
+    density = use_density(len(df_filtered), density_threshold)
+    if density:
+        layer = hexbin_traffic_growth(ax, df_filtered['traffic'], df_filtered['traffic_diff'] * 100,
+                                      cmap='viridis')
+    else:
+        layer = ax.scatter(
+            df_filtered['traffic'], 
+            df_filtered['traffic_diff'] * 100,
+            alpha=0.6,
+            s=50,
+            c=df_filtered['traffic'],
+            cmap='viridis',
+            rasterized=fmt == 'svg'
+        )
     
     ax.set_xlabel('Traffic Volume', fontsize=12)
     ax.set_ylabel('Growth Rate (%)', fontsize=12)
@@ -66,15 +94,17 @@ def plot_growth_scatter(df, output_file='growth_scatter.png'):
     ax.set_xscale('log')
     ax.axhline(y=0, color='red', linestyle='--', alpha=0.5)
     
-    plt.colorbar(scatter, ax=ax, label='Traffic')
+    plt.colorbar(layer, ax=ax, label='Sources' if density else 'Traffic')
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    save_figure(plt, output_file, fmt, dpi)
     print(f"Saved: {output_file}")
     return output_file
 
 
-def plot_type_distribution(df, output_file='type_distribution.png'):
+def plot_type_distribution(df, output_file='type_distribution.png', fmt='png', dpi=DEFAULT_DPI):
     """绘制流量类型分布"""
+    plt = _pyplot()
+
     type_stats = df.groupby('type')['traffic'].sum().sort_values(ascending=False)
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
@@ -91,23 +121,17 @@ def plot_type_distribution(df, output_file='type_distribution.png'):
     ax2.set_title('Traffic Volume by Type', fontsize=14, fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    save_figure(plt, output_file, fmt, dpi)
     print(f"Saved: {output_file}")
     return output_file
 
 
-def plot_ai_tools_comparison(df, output_file='ai_tools.png'):
-    """专门绘制 AI 工具对比图"""
-    ai_keywords = ['ai', 'gpt', 'claude', 'openai', 'anthropic', 'midjourney', 
-                   'cursor', 'lovable', 'windsurf', 'suno', 'elevenlabs',
-                   'runway', 'turboscribe', 'undetectable']
-    
-    ai_mask = (
-        df['type'].str.contains('ai', case=False, na=False) |
-        df['target'].str.contains('|'.join(ai_keywords), case=False, na=False)
-    )
-    
-    df_ai = df[ai_mask & (df['traffic'] > 50000)].copy()
+def plot_ai_tools_comparison(df, output_file='ai_tools.png', fmt='png', dpi=DEFAULT_DPI, rules: Profile = None):
+    """专门绘制 AI 工具对比图（入选条件同 ai_rating 规则集）"""
+    plt = _pyplot()
+
+    rules = rules or default_profile()
+    df_ai = df[ai_mask(df) & rules.ai_rating.mask(df)].copy()
     df_ai = df_ai.nlargest(15, 'traffic')
     
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -134,27 +158,64 @@ def plot_ai_tools_comparison(df, output_file='ai_tools.png'):
     ax.invert_yaxis()
     
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    save_figure(plt, output_file, fmt, dpi)
     print(f"Saved: {output_file}")
     return output_file
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("Usage: python visualize_traffic.py <csv_file> [chart_type]")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = [a for a in sys.argv[1:] if a.startswith('--')]
+    
+    if len(args) < 1:
+        print("Usage: python visualize_traffic.py <csv_file> [chart_type] [--format=png|webp|svg] [--dpi=N] [--density-threshold=N] [--rules=FILE] [--rule-profile=NAME] [--no-cache]")
         print("\nChart types:")
         print("  top_sources  - TOP 流量来源")
         print("  growth       - 流量增长散点图")
         print("  type_dist    - 流量类型分布")
         print("  ai_tools     - AI 工具对比")
         print("  all          - 生成所有图表")
+        print("\nOptions:")
+        print("  --format=F   - 图片格式: png（默认）、webp、svg")
+        print(f"  --dpi=N      - 分辨率（默认 {DEFAULT_DPI}）")
+        print(f"  --density-threshold=N - 散点图超过 N 个点时改画密度图（默认 {DENSITY_THRESHOLD}，0 为始终画散点）")
+        print("  --rules=FILE - 阈值规则文件（JSON / YAML，见 traffic_rules.py）：散点图和 AI 工具图的流量下限")
+        print("  --rule-profile=NAME - 使用规则文件中的哪个方案（文件中只有一个方案时可省略）")
+        print("  --no-cache   - 不读写解析缓存，直接解析 CSV")
         sys.exit(1)
     
-    filepath = sys.argv[1]
-    chart_type = sys.argv[2] if len(sys.argv) > 2 else 'all'
+    filepath = args[0]
+    chart_type = args[1] if len(args) > 1 else 'all'
+
+    fmt = 'png'
+    dpi = DEFAULT_DPI
+    density_threshold = DENSITY_THRESHOLD
+    rules_path = None
+    profile_names = None
+    for option in options:
+        if option.startswith('--format='):
+            fmt = option.split('=', 1)[1]
+        elif option.startswith('--dpi='):
+            dpi = int(option.split('=', 1)[1])
+        elif option.startswith('--density-threshold='):
+            density_threshold = int(option.split('=', 1)[1])
+        elif option.startswith('--rules='):
+            rules_path = option.split('=', 1)[1]
+        elif option.startswith('--rule-profile='):
+            profile_names = [option.split('=', 1)[1]]
+    try:
+        check_format(fmt)
+        profiles = load_profiles(rules_path, profile_names)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if len(profiles) > 1:
+        print(f"Error: 规则文件中有多个方案，请用 --rule-profile 指定（可选 {' / '.join(p.name for p in profiles)}）")
+        sys.exit(1)
+    rules = profiles[0]
     
-    df = load_data(filepath)
+    df = load_data(filepath, '--no-cache' not in options)
     
     # 默认输出到当前目录下的 outputs 文件夹
     output_dir = Path('./outputs')
@@ -163,23 +224,24 @@ def main():
     generated_files = []
     
     if chart_type in ['top_sources', 'all']:
-        output_file = output_dir / 'top_sources.png'
-        plot_top_sources(df, output_file=str(output_file))
+        output_file = output_dir / f'top_sources.{fmt}'
+        plot_top_sources(df, output_file=str(output_file), fmt=fmt, dpi=dpi)
         generated_files.append(str(output_file))
     
     if chart_type in ['growth', 'all']:
-        output_file = output_dir / 'growth_scatter.png'
-        plot_growth_scatter(df, output_file=str(output_file))
+        output_file = output_dir / f'growth_scatter.{fmt}'
+        plot_growth_scatter(df, output_file=str(output_file), fmt=fmt, dpi=dpi,
+                            density_threshold=density_threshold, rules=rules)
         generated_files.append(str(output_file))
     
     if chart_type in ['type_dist', 'all']:
-        output_file = output_dir / 'type_distribution.png'
-        plot_type_distribution(df, output_file=str(output_file))
+        output_file = output_dir / f'type_distribution.{fmt}'
+        plot_type_distribution(df, output_file=str(output_file), fmt=fmt, dpi=dpi)
         generated_files.append(str(output_file))
     
     if chart_type in ['ai_tools', 'all']:
-        output_file = output_dir / 'ai_tools.png'
-        plot_ai_tools_comparison(df, output_file=str(output_file))
+        output_file = output_dir / f'ai_tools.{fmt}'
+        plot_ai_tools_comparison(df, output_file=str(output_file), fmt=fmt, dpi=dpi, rules=rules)
         generated_files.append(str(output_file))
     
     print(f"\nGenerated {len(generated_files)} charts")
@@ -0,0 +1,25 @@
+"""测试共用设置：各类磁盘缓存写到临时目录，不读写用户的 ~/.cache/traffic-analyzer"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import chart_cache  # noqa: E402
+import domain_index  # noqa: E402
+import generate_report  # noqa: E402
+import traffic_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    """缓存目录在导入时由 TRAFFIC_CACHE_DIR 确定，设置环境变量无效，直接替换各模块的目录"""
+    cache_dir = tmp_path_factory.mktemp('cache')
+    monkeypatch.setattr(traffic_cache, 'CACHE_DIR', cache_dir)
+    monkeypatch.setattr(chart_cache, 'CHART_CACHE_DIR', cache_dir / 'charts')
+    monkeypatch.setattr(domain_index, 'DOMAIN_CACHE_DIR', cache_dir / 'domains')
+    monkeypatch.setattr(domain_index, '_CACHES', {})
+    monkeypatch.setattr(generate_report, 'TEMPLATE_CACHE_DIR', cache_dir / 'templates')
+    return cache_dir
@@ -0,0 +1,84 @@
+"""图表缓存：指纹相同的图表直接取缓存，输入数据或分辨率变化时重新渲染"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from chart_cache import ChartCache  # noqa: E402
+from generate_report import ChartGenerator, TrafficAnalyzer  # noqa: E402
+
+CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,chatgpt.com,300000,180000,0.6667,0.3
+direct,claude.ai,60000,40000,0.5,0.1
+referral,tiny-gpt.ai,30000,20000,0.5,0.05
+search,shop.com,80000,60000,0.3333,0.2
+social,falling.com,150000,190000,-0.2105,0.15
+"""
+
+DPI = 20
+
+
+def make_generator(tmp_path, name: str, csv: str, cache: ChartCache, dpi: int = DPI) -> ChartGenerator:
+    path = tmp_path / f'{name}.csv'
+    path.write_text(csv, encoding='utf-8')
+    analyzer = TrafficAnalyzer(str(path), use_cache=False)
+    type_traffic = analyzer.get_type_stats().set_index('type')['traffic']
+    return ChartGenerator(analyzer.df, tmp_path / name, type_traffic, cache=cache, dpi=dpi)
+
+
+def test_fetch_links_stored_image_and_misses_unknown_key(tmp_path):
+    cache = ChartCache(tmp_path / 'cache')
+    src = tmp_path / 'chart.png'
+    src.write_bytes(b'png')
+    cache.store('abc', src)
+
+    # 输出目录中的图片被改写不影响缓存
+    src.write_bytes(b'changed')
+    dest = tmp_path / 'out.png'
+    assert cache.fetch('abc', dest)
+    assert dest.read_bytes() == b'png'
+    assert not cache.fetch('missing', tmp_path / 'other.png')
+    assert not (tmp_path / 'other.png').exists()
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = ChartCache(tmp_path / 'cache', max_bytes=4)
+    for key in ('old', 'new'):
+        src = tmp_path / f'{key}.png'
+        src.write_bytes(b'1234')
+        cache.store(key, src)
+    os.utime(cache._entry_path('old', '.png'), (1, 1))
+    cache.evict()
+
+    assert not cache._entry_path('old', '.png').exists()
+    assert cache.fetch('new', tmp_path / 'out.png')
+
+
+def test_generator_reuses_cache_until_fingerprint_changes(tmp_path):
+    cache = ChartCache(tmp_path / 'cache')
+    first = make_generator(tmp_path, 'first', CSV, cache)
+    charts = first.generate_all()
+    assert sorted(first.rendered) == sorted(ChartGenerator.CHARTS) and first.cached == []
+
+    # 另一个输出目录、相同数据：全部命中缓存
+    second = make_generator(tmp_path, 'second', CSV, cache)
+    second_charts = second.generate_all()
+    assert second.rendered == [] and sorted(second.cached) == sorted(ChartGenerator.CHARTS)
+    for name, path in second_charts.items():
+        assert Path(path).read_bytes() == Path(charts[name]).read_bytes()
+
+    # 下降标的的流量变化：只影响用到该行的图表
+    changed = make_generator(tmp_path, 'changed', CSV.replace('150000,190000', '160000,190000'), cache)
+    changed.generate_all()
+    assert changed.rendered and changed.cached
+    for name in changed.rendered:
+        assert changed.chart_fingerprint(name) != first.chart_fingerprint(name)
+    for name in changed.cached:
+        assert changed.chart_fingerprint(name) == first.chart_fingerprint(name)
+
+    # 分辨率参与指纹：全部重新渲染
+    sharper = make_generator(tmp_path, 'sharper', CSV, cache, dpi=DPI + 10)
+    sharper.generate_all()
+    assert sorted(sharper.rendered) == sorted(ChartGenerator.CHARTS) and sharper.cached == []
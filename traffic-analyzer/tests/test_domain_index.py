@@ -0,0 +1,124 @@
+"""域名归并：公共后缀列表的通配和例外规则，按可注册域名汇总（流量求和、增长率重算）"""
+
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import domain_index  # noqa: E402
+from domain_index import PublicSuffixList, apply_level, normalize_host, public_suffix_list, rollup  # noqa: E402
+
+
+PSL = """// 注释行和空行忽略
+
+uk
+co.uk
+*.ck
+!www.ck
+github.io
+"""
+
+
+def read(csv: str) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(csv))
+
+
+def test_wildcard_and_exception_rules(tmp_path):
+    path = tmp_path / 'psl.dat'
+    path.write_text(PSL, encoding='utf-8')
+    psl = PublicSuffixList(path)
+
+    assert psl.wildcards == {'ck'} and psl.exceptions == {'www.ck'}
+    assert psl.registrable('shop.example.co.uk') == ('example.co.uk', 'example')
+    # *.ck：任一二级域名都是公共后缀；!www.ck 例外，www.ck 本身可注册
+    assert psl.registrable('a.b.foo.ck') == ('b.foo.ck', 'b')
+    assert psl.registrable('foo.ck') == ('foo.ck', 'foo')
+    assert psl.registrable('a.www.ck') == ('www.ck', 'www')
+    # 私有后缀：各用户的子域名分别归并
+    assert psl.registrable('docs.alice.github.io') == ('alice.github.io', 'alice')
+    # 不在列表中的后缀取最后一个标签
+    assert psl.registrable('app.example.internal') == ('example.internal', 'example')
+    assert psl.registrable('co.uk') == ('co.uk', 'co')
+    assert psl.registrable('10.0.0.1') == ('10.0.0.1', '10.0.0.1')
+
+
+def test_bundled_list_and_host_normalization():
+    psl = public_suffix_list()
+
+    assert normalize_host(' HTTPS://App.Lovable.dev:8443/path?q=1 ') == 'app.lovable.dev'
+    assert normalize_host('www.example.com.') == 'www.example.com'
+    assert normalize_host('[::1]') == '[::1]'
+    assert psl.registrable(normalize_host('https://www.bbc.co.uk/news')) == ('bbc.co.uk', 'bbc')
+    assert psl.registrable('x.y.foo.ck') == ('y.foo.ck', 'y')
+    assert psl.registrable('www.ck') == ('www.ck', 'www')
+    assert psl.registrable('me.github.io') == ('me.github.io', 'me')
+
+
+def test_rollup_sums_members_and_recomputes_growth():
+    df = read("""type,target,traffic,prev_traffic,traffic_diff,traffic_share
+direct,www.lovable.dev,40000,30000,0.3333,0.1
+search,chatgpt.com,300000,200000,0.5,0.3
+search,app.lovable.dev,90000,50000,0.8,0.2
+referral,https://docs.lovable.dev/guide,10000,20000,-0.5,0.05
+social,new.example.co.uk,30000,0,1.0,0.03
+social,blog.example.co.uk,10000,0,3.0,0.01
+""")
+
+    result = rollup(df, use_cache=False)
+
+    assert result.columns.tolist() == [
+        'type', 'target', 'traffic', 'prev_traffic', 'traffic_diff', 'traffic_share', 'brand', 'members'
+    ]
+    rows = result.set_index('target')
+    # 按域名首次出现的顺序
+    assert result['target'].tolist() == ['lovable.dev', 'chatgpt.com', 'example.co.uk']
+
+    lovable = rows.loc['lovable.dev']
+    assert (lovable['traffic'], lovable['prev_traffic'], lovable['members']) == (140000, 100000, 3)
+    assert lovable['traffic_diff'] == 0.4
+    assert lovable['traffic_share'] == pytest.approx(0.35)
+    # 类型取流量最高的成员
+    assert lovable['type'] == 'search' and lovable['brand'] == 'lovable'
+
+    # 只有一行时保留原值
+    assert rows.loc['chatgpt.com', 'traffic_diff'] == 0.5
+    assert rows.loc['chatgpt.com', 'members'] == 1
+    # 上期全为 0：按流量加权平均 (30000 * 1.0 + 10000 * 3.0) / 40000
+    assert rows.loc['example.co.uk', 'traffic_diff'] == 1.5
+
+
+def test_rollup_cache_and_level():
+    df = read("""type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,app.lovable.dev,90000,50000,0.8,0.3
+direct,www.lovable.dev,40000,30000,0.3333,0.1
+""")
+
+    assert apply_level(df, 'target') is df
+    uncached = apply_level(df, 'domain', use_cache=False)
+    assert not list(domain_index.DOMAIN_CACHE_DIR.glob('*'))
+    # 第一次写入磁盘缓存，第二次从缓存读取，结果相同
+    pd.testing.assert_frame_equal(rollup(df), uncached)
+    assert list(domain_index.DOMAIN_CACHE_DIR.glob('*'))
+    domain_index._CACHES.clear()
+    pd.testing.assert_frame_equal(rollup(df), uncached)
+    with pytest.raises(ValueError, match='分析粒度'):
+        apply_level(df, 'brand')
+
+
+def test_rollup_treats_empty_prev_traffic_as_zero():
+    df = read("""type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,app.lovable.dev,90000,50000,0.8,0.3
+direct,www.lovable.dev,40000,,0.0,0.1
+""")
+
+    row = rollup(df, use_cache=False).iloc[0]
+
+    assert row['target'] == 'lovable.dev'
+    assert row['traffic'] == 130000
+    assert row['prev_traffic'] == 50000
+    # 由汇总后的流量重算：13万 / 5万 - 1
+    assert row['traffic_diff'] == 1.6
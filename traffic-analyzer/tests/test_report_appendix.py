@@ -0,0 +1,77 @@
+"""全量附录：按流量降序分页，各页的排名区间、翻页链接和目录页"""
+
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from report_appendix import Appendix, page_name  # noqa: E402
+
+
+def make_frame(count: int) -> pd.DataFrame:
+    # 行的顺序与流量无关，附录按流量重新排名
+    ranks = list(range(0, count, 2)) + list(range(1, count, 2))
+    traffic = [(i + 1) * 1000 for i in ranks]
+    return pd.DataFrame({
+        'type': ['search'] * count,
+        'target': [f'site{t // 1000}.com' for t in traffic],
+        'traffic': traffic,
+        'prev_traffic': [t // 2 for t in traffic],
+        'traffic_diff': [1.0] * count,
+        'traffic_share': [t / sum(traffic) for t in traffic]
+    })
+
+
+def page_rows(path: Path) -> list:
+    """[(排名, 来源)]"""
+    text = path.read_text(encoding='utf-8')
+    return [(int(rank), target) for rank, target in re.findall(r'<tr><td class="num">(\d+)</td><td>([^<]*)</td>', text)]
+
+
+def test_pages_split_ranking_into_fixed_row_ranges(tmp_path):
+    appendix = Appendix(make_frame(7), tmp_path, rows_per_page=3)
+    info = appendix.write_html()
+
+    assert info == {'index': 'appendix/index.html', 'rows': 7, 'pages': 3, 'rows_per_page': 3}
+    assert [path.name for path in appendix.pages] == [page_name(1), page_name(2), page_name(3)]
+    assert [page_rows(path) for path in appendix.pages] == [
+        [(1, 'site7.com'), (2, 'site6.com'), (3, 'site5.com')],
+        [(4, 'site4.com'), (5, 'site3.com'), (6, 'site2.com')],
+        [(7, 'site1.com')]
+    ]
+
+    first, middle, last = (path.read_text(encoding='utf-8') for path in appendix.pages)
+    assert '第 1～3 名' in first and '第 7～7 名' in last
+    assert '上一页' not in first and f'href="{page_name(2)}">下一页' in first
+    assert f'href="{page_name(1)}">上一页' in middle and f'href="{page_name(3)}">下一页' in middle
+    assert '下一页' not in last
+
+    index = (tmp_path / info['index']).read_text(encoding='utf-8')
+    assert re.findall(r'第 ([\d,]+)～([\d,]+) 名', index) == [('1', '3'), ('4', '6'), ('7', '7')]
+
+
+def test_rewrite_removes_stale_pages_and_escapes_values(tmp_path):
+    Appendix(make_frame(7), tmp_path, rows_per_page=2).write_html()
+
+    df = make_frame(3)
+    df.loc[0, 'target'] = '<b>&co</b>'
+    df['prev_traffic'] = df['prev_traffic'].astype(float)
+    df.loc[1, 'prev_traffic'] = float('nan')
+    appendix = Appendix(df, tmp_path, rows_per_page=2)
+    info = appendix.write_html()
+
+    assert info['pages'] == 2
+    assert sorted(path.name for path in (tmp_path / 'appendix').glob('page_*')) == [page_name(1), page_name(2)]
+    text = ''.join(path.read_text(encoding='utf-8') for path in appendix.pages)
+    assert '&lt;b&gt;&amp;co&lt;/b&gt;' in text and '<b>' not in text
+    assert '<td class="num">-</td>' in text
+
+
+def test_empty_frame_still_writes_one_page(tmp_path):
+    info = Appendix(make_frame(0), tmp_path, rows_per_page=0).write_html()
+
+    assert info['rows'] == 0 and info['pages'] == 1 and info['rows_per_page'] == 1
+    assert (tmp_path / 'appendix' / page_name(1)).exists()
@@ -0,0 +1,47 @@
+"""报告分析方法的阈值参数：默认取规则，显式传入时替换规则中的对应阈值"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import TrafficAnalyzer  # noqa: E402
+
+CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,chatgpt.com,300000,180000,0.6667,0.3
+direct,claude.ai,60000,40000,0.5,0.1
+referral,tiny-gpt.ai,30000,20000,0.5,0.05
+search,shop.com,80000,60000,0.3333,0.2
+search,mid.com,40000,30000,0.3333,0.1
+social,falling.com,150000,190000,-0.2105,0.15
+social,slipping.com,70000,90000,-0.2222,0.1
+"""
+
+
+def make_analyzer(tmp_path) -> TrafficAnalyzer:
+    path = tmp_path / 'traffic.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return TrafficAnalyzer(str(path), use_cache=False)
+
+
+def test_defaults_follow_rules(tmp_path):
+    analyzer = make_analyzer(tmp_path)
+
+    assert [t['tool'] for t in analyzer.analyze_ai_tools()] == ['chatgpt.com', 'claude.ai']
+    assert [o['source'] for o in analyzer.find_opportunities()] == ['chatgpt.com', 'claude.ai', 'shop.com']
+    assert [r['name'] for r in analyzer.find_risk_items()] == ['falling.com']
+
+
+def test_keyword_overrides_replace_rule_thresholds(tmp_path):
+    analyzer = make_analyzer(tmp_path)
+
+    assert [t['tool'] for t in analyzer.analyze_ai_tools(min_traffic=20000)] == [
+        'chatgpt.com', 'claude.ai', 'tiny-gpt.ai'
+    ]
+    assert [o['source'] for o in analyzer.find_opportunities(min_traffic=30000, max_traffic=100000)] == [
+        'claude.ai', 'tiny-gpt.ai', 'shop.com', 'mid.com'
+    ]
+    assert [o['source'] for o in analyzer.find_opportunities(min_growth=0.6)] == ['chatgpt.com']
+    assert [r['name'] for r in analyzer.find_risk_items(min_traffic=50000, max_decline=-0.22)] == ['slipping.com']
+    # 分级仍按规则
+    assert analyzer.find_risk_items(min_traffic=50000)[0]['risk_level'] == '中等'
@@ -0,0 +1,73 @@
+"""紧凑 target 列上的关键词匹配：结果与普通列一致，词表只扫描一次，小子集不扫描整个词表"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from ai_matcher import KeywordMatcher, ai_mask, match_ai  # noqa: E402
+import target_vocab  # noqa: E402
+from target_vocab import compact_target, match_unique, vocabulary  # noqa: E402
+
+FRAME = pd.DataFrame({
+    'type': ['search', 'ai_assistants', 'direct', 'search', 'social', 'search'],
+    'target': ['ChatGPT.com', 'perplexity.ai', 'example.com', 'chatgpt.com', None, 'openai.com']
+})
+
+
+def test_compact_target_matches_like_plain_column():
+    compact = compact_target(FRAME)
+    assert isinstance(compact['target'].dtype, pd.CategoricalDtype)
+    assert FRAME['target'].dtype != compact['target'].dtype
+    assert compact_target(compact) is compact
+
+    mask, keyword = match_ai(FRAME)
+    compact_mask, compact_keyword = match_ai(compact)
+    assert mask.tolist() == compact_mask.tolist() == [True, True, False, True, False, True]
+    assert keyword.tolist() == compact_keyword.tolist() == ['gpt', 'ai', None, 'gpt', None, 'openai']
+    assert ai_mask(compact).tolist() == mask.tolist()
+
+
+def test_keyword_matcher_longest_and_priority_matches():
+    matcher = KeywordMatcher(['AI', 'openai', 'chat', 'ai'])
+    values = pd.Series(['OpenAI.com', 'chatai.net', 'example.org', None])
+
+    assert matcher.keywords == ['ai', 'openai', 'chat']
+    assert matcher.search('My-OpenAI') == 'openai'
+    # find 取最左最长的匹配，find_first 按关键词列表顺序
+    assert matcher.find(values).tolist() == ['openai', 'chat', None, None]
+    assert matcher.find_first(values).tolist() == ['ai', 'ai', None, None]
+    assert matcher.contains(values).tolist() == [True, True, False, False]
+
+
+def test_vocabulary_is_scanned_once_and_shared_by_subsets(monkeypatch):
+    values = pd.Series([f'site{i % 50}.com' for i in range(200)], dtype='category')
+    calls = []
+
+    def compute(uniques):
+        calls.append(len(uniques))
+        return uniques.str.endswith('7.com').to_numpy()
+
+    expected = values.astype(str).str.endswith('7.com').tolist()
+    assert match_unique(values, 'k', compute, False).tolist() == expected
+    assert match_unique(values, 'k', compute, False).tolist() == expected
+    assert calls == [50]
+
+    # 子集与原数据共用词表，已缓存的结果直接映射
+    subset = values.iloc[::7]
+    assert vocabulary(subset) is vocabulary(values)
+    assert match_unique(subset, 'k', compute, False).tolist() == expected[::7]
+    assert calls == [50]
+
+    # 未缓存的键：小子集只匹配用到的词，也不写入缓存
+    monkeypatch.setattr(target_vocab, 'SUBSET_RATIO', 0.5)
+    small = values.iloc[[3, 53, 4]]
+    assert match_unique(small, 'other', compute, False).tolist() == [False, False, False]
+    assert calls == [50, 2]
+    assert not vocabulary(values).has('other')
+
+    with_missing = pd.Series(['site7.com', None], dtype=pd.CategoricalDtype(values.cat.categories))
+    assert match_unique(with_missing, 'k', compute, False).tolist() == [True, False]
+    assert calls == [50, 2]
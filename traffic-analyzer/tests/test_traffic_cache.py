@@ -0,0 +1,65 @@
+"""解析缓存的哈希索引：并发写入时合并，缓存淘汰后删除对应记录"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import traffic_cache  # noqa: E402
+from traffic_cache import INDEX_FILE, TrafficCache  # noqa: E402
+
+
+def write_csv(path: Path, rows: int) -> Path:
+    pd.DataFrame({'target': [f'site{i}.com' for i in range(rows)], 'traffic': range(rows)}).to_csv(path, index=False)
+    return path
+
+
+def read_index(cache_dir: Path) -> dict:
+    return json.loads((cache_dir / INDEX_FILE).read_text(encoding='utf-8'))
+
+
+def test_index_keeps_entries_written_while_hashing(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    first = write_csv(tmp_path / 'first.csv', 10)
+    second = write_csv(tmp_path / 'second.csv', 20)
+
+    # 计算 first 的哈希期间，另一个进程记录了 second
+    real_sha256 = traffic_cache.hashlib.sha256
+    pending = [second]
+
+    class Hashlib:
+        @staticmethod
+        def sha256():
+            if pending:
+                TrafficCache(cache_dir)._content_hash(pending.pop())
+            return real_sha256()
+
+    monkeypatch.setattr(traffic_cache, 'hashlib', Hashlib)
+    cache_dir.mkdir()
+    TrafficCache(cache_dir)._content_hash(first)
+
+    assert set(read_index(cache_dir)) == {str(first.resolve()), str(second.resolve())}
+    assert not list(cache_dir.glob('*.tmp'))
+
+
+def test_evict_prunes_index_entries(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = TrafficCache(cache_dir)
+    old = write_csv(tmp_path / 'old.csv', 10)
+    new = write_csv(tmp_path / 'new.csv', 20)
+    cache.put(old, pd.read_csv(old))
+    cache.put(new, pd.read_csv(new))
+
+    old_entry = cache._entry_path(old)
+    new_entry = cache._entry_path(new)
+    os.utime(old_entry, (1, 1))
+    cache.max_bytes = new_entry.stat().st_size
+    cache.evict()
+
+    assert not old_entry.exists() and new_entry.exists()
+    assert set(read_index(cache_dir)) == {str(new.resolve())}
+    assert cache.get(new) is not None
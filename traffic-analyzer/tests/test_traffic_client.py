@@ -0,0 +1,57 @@
+"""本地回退（服务未启动、分片输入）：只有服务支持的分析类型报错退出"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import traffic_client  # noqa: E402
+
+CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,chatgpt.com,300000,200000,0.5,0.3
+social,falling.com,150000,190000,-0.2105,0.15
+"""
+
+
+def run_client(tmp_path, monkeypatch, analysis_type):
+    csv_path = tmp_path / 'traffic.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    server = f"--server=unix:{tmp_path / 'missing.sock'}"
+    monkeypatch.setattr(sys, 'argv', ['traffic_client.py', str(csv_path), analysis_type, server, '--no-cache'])
+    traffic_client.main()
+
+
+def test_server_only_type_fails_without_server(tmp_path, monkeypatch, capsys):
+    with pytest.raises(SystemExit) as exc:
+        run_client(tmp_path, monkeypatch, 'risk')
+
+    assert exc.value.code == 1
+    assert '需要服务' in capsys.readouterr().err
+
+
+def test_other_types_fall_back_to_local(tmp_path, monkeypatch, capsys):
+    run_client(tmp_path, monkeypatch, 'by_type')
+
+    captured = capsys.readouterr()
+    assert '改为本地分析' in captured.err
+    assert '"by_type"' in captured.out
+
+
+def test_sharded_input_runs_locally_without_querying_server(tmp_path, monkeypatch, capsys):
+    shards = tmp_path / 'shards'
+    shards.mkdir()
+    (shards / 'part_1.csv').write_text(CSV, encoding='utf-8')
+    (shards / 'part_2.csv').write_text(CSV, encoding='utf-8')
+
+    def fail(*args, **kwargs):
+        raise AssertionError('分片输入不应发送给服务')
+
+    monkeypatch.setattr(traffic_client, 'analyze', fail)
+    monkeypatch.setattr(sys, 'argv', ['traffic_client.py', str(shards / 'part_*.csv'), 'by_type', '--workers=1'])
+    traffic_client.main()
+
+    captured = capsys.readouterr()
+    assert '分片输入' in captured.err
+    assert '"source_count": 2' in captured.out
@@ -0,0 +1,122 @@
+"""多期历史库：入库后读取与原始数据一致，跨期趋势指标"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from traffic_history import TrafficHistory, compute_trend_metrics  # noqa: E402
+
+# 各期流量：a.com 逐期上涨，b.com 从 2025-03 开始出现后逐期下跌
+SERIES = {
+    ('search', 'a.com'): [100, 200, 300, 400, 500, 600],
+    ('direct', 'b.com'): [None, None, 1000, 900, 800, 700],
+}
+PERIODS = ['2025-01', '2025-02', '2025-03', '2025-04', '2025-05', '2025-06']
+
+
+def ingest_series(tmp_path) -> TrafficHistory:
+    history = TrafficHistory(tmp_path / 'store')
+    for i, period in enumerate(PERIODS):
+        rows = [
+            {'type': t, 'target': target, 'traffic': values[i], 'prev_traffic': values[i - 1] if i else 0}
+            for (t, target), values in SERIES.items() if values[i] is not None
+        ]
+        csv_path = tmp_path / f'export-{period}.csv'
+        pd.DataFrame(rows).fillna(0).to_csv(csv_path, index=False)
+        history.ingest(csv_path)
+    return history
+
+
+def test_ingest_round_trip(tmp_path):
+    ingest_series(tmp_path)
+
+    # 重新打开只读取历史库
+    history = TrafficHistory(tmp_path / 'store')
+    assert history.periods == PERIODS
+    assert history.manifest['types'] == ['search', 'direct']
+
+    rows = history.target_history(['b.com'])
+    assert rows[['period', 'type', 'traffic']].values.tolist() == [
+        ['2025-03', 'direct', 1000], ['2025-04', 'direct', 900], ['2025-05', 'direct', 800], ['2025-06', 'direct', 700]
+    ]
+    assert rows['prev_traffic'].tolist() == [0, 1000, 900, 800]
+
+
+def test_ingest_merges_duplicates_and_guards_periods(tmp_path):
+    csv_path = tmp_path / 'export-2025-01.csv'
+    csv_path.write_text("""type,target,traffic,prev_traffic
+search,a.com,100,50
+search,a.com,20,10
+direct,a.com,5,
+""", encoding='utf-8')
+    history = TrafficHistory(tmp_path / 'store')
+
+    assert history.ingest(csv_path)['rows'] == 2
+    rows = history.target_history(['a.com'])
+    assert rows[['type', 'traffic', 'prev_traffic']].values.tolist() == [['search', 120, 60], ['direct', 5, 0]]
+
+    with pytest.raises(ValueError):
+        history.ingest(csv_path)
+    csv_path.write_text('type,target,traffic,prev_traffic\nsearch,a.com,7,1\n', encoding='utf-8')
+    history.ingest(csv_path, replace=True)
+    assert history.target_history(['a.com'])['traffic'].tolist() == [7]
+
+
+def test_trend_metrics(tmp_path):
+    metrics = ingest_series(tmp_path).trend_metrics(months=6, momentum_months=3).set_index('target')
+
+    a = metrics.loc['a.com']
+    assert (a['first_period'], a['last_period'], a['observed']) == ('2025-01', '2025-06', 6)
+    assert a['cagr'] == pytest.approx(6 ** (12 / 5) - 1)
+    assert a['momentum'] == pytest.approx(1500 / 600 - 1)
+    assert a['streak'] == 5
+
+    b = metrics.loc['b.com']
+    assert (b['first_period'], b['observed'], b['first_traffic']) == ('2025-03', 4, 1000)
+    assert b['cagr'] == pytest.approx(0.7 ** (12 / 3) - 1)
+    # 前三期数据不全，动量为空
+    assert pd.isna(b['momentum'])
+    assert b['streak'] == -3
+
+
+def test_trend_metrics_min_traffic_and_months(tmp_path):
+    history = ingest_series(tmp_path)
+
+    assert history.trend_metrics(min_traffic=650)['target'].tolist() == ['b.com']
+    recent = history.trend_metrics(months=2).set_index('target')
+    assert recent.loc['a.com', 'first_period'] == '2025-05'
+    assert recent.loc['a.com', 'cagr'] == pytest.approx(1.2 ** 12 - 1)
+
+
+def test_compute_trend_metrics_single_period():
+    metrics = compute_trend_metrics(np.array([[100.0], [np.nan]]), ['2025-01'])
+
+    assert metrics['observed'].tolist() == [1, 0]
+    assert pd.isna(metrics['cagr']).all()
+    assert metrics['streak'].tolist() == [0, 0]
+    assert metrics['first_period'][0] == '2025-01' and pd.isna(metrics['first_period'][1])
+
+
+def test_type_ids_beyond_int16_range(tmp_path):
+    count = 40000
+    csv_path = tmp_path / 'traffic-2025-01.csv'
+    pd.DataFrame({
+        'type': [f'type{i}' for i in range(count)],
+        'target': [f'site{i}.com' for i in range(count)],
+        'traffic': range(1, count + 1),
+        'prev_traffic': range(count)
+    }).to_csv(csv_path, index=False)
+
+    history = TrafficHistory(tmp_path / 'store')
+    history.ingest(csv_path)
+
+    rows = history.target_history([f'site{count - 1}.com'])
+    assert rows[['type', 'traffic']].values.tolist() == [[f'type{count - 1}', count]]
+    keys, matrix, _ = history.traffic_matrix(min_traffic=count)
+    assert keys.values.tolist() == [[f'site{count - 1}.com', f'type{count - 1}']]
+    assert matrix.tolist() == [[count]]
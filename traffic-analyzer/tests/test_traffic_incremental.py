@@ -0,0 +1,87 @@
+"""增量更新：与上一次数据集比对，结果与全量计算一致"""
+
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_report import TrafficAnalyzer  # noqa: E402
+from traffic_incremental import IncrementalState  # noqa: E402
+
+CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,chatgpt.com,300000,200000,0.5,0.3
+direct,newtool.ai,120000,,0.0,0.1
+referral,shop.com,80000,60000,0.3333,0.2
+social,falling.com,150000,190000,-0.2105,0.15
+"""
+
+
+def read(csv: str) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(csv))
+
+
+@pytest.mark.filterwarnings('error')
+def test_empty_prev_traffic_is_compared_as_zero(tmp_path):
+    state = IncrementalState(tmp_path / 'state')
+    state.refresh(read(CSV))
+    state.save()
+
+    refresh = IncrementalState(tmp_path / 'state').refresh(read(CSV))
+
+    assert refresh.mode == 'incremental'
+    assert refresh.diff == {'added': 0, 'modified': 0, 'removed': 0, 'unchanged': 4}
+    assert state.rows['prev_traffic'].tolist() == [200000, 0, 60000, 190000]
+
+
+# 相对 CSV：shop.com 修改，falling.com 删除，新增 claude.ai 和 tiny.com
+NEXT_CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,chatgpt.com,300000,200000,0.5,0.3
+direct,newtool.ai,120000,,0.0,0.1
+referral,shop.com,95000,60000,0.5833,0.2
+direct,claude.ai,210000,100000,1.1,0.2
+social,tiny.com,500,400,0.25,0.001
+"""
+
+
+def analyzer_results(analyzer: TrafficAnalyzer) -> tuple:
+    return (analyzer.get_summary_metrics(), analyzer.get_type_stats().to_dict('records'),
+            analyzer.analyze_ai_tools(), analyzer.find_opportunities(), analyzer.find_risk_items())
+
+
+def test_incremental_refresh_matches_full_run(tmp_path):
+    state = IncrementalState(tmp_path / 'state')
+    state.refresh(read(CSV))
+    state.save()
+
+    incremental = IncrementalState(tmp_path / 'state').refresh(read(NEXT_CSV))
+    full = IncrementalState(tmp_path / 'fresh').refresh(read(NEXT_CSV))
+
+    assert (incremental.mode, full.mode) == ('incremental', 'full')
+    assert incremental.diff == {'added': 2, 'modified': 1, 'removed': 1, 'unchanged': 2}
+    assert incremental.total_traffic == full.total_traffic == 300000 + 120000 + 95000 + 210000 + 500
+    assert incremental.total_sources == full.total_sources == 5
+    assert incremental.aggregates['ai_traffic'] == full.aggregates['ai_traffic']
+    assert incremental.aggregates['growth_sources'] == full.aggregates['growth_sources']
+    pd.testing.assert_frame_equal(incremental.aggregates['type_stats'], full.aggregates['type_stats'])
+    pd.testing.assert_frame_equal(incremental.frame, full.frame)
+
+    csv_path = tmp_path / 'next.csv'
+    csv_path.write_text(NEXT_CSV, encoding='utf-8')
+    reduced = TrafficAnalyzer.from_reduced(incremental.frame, incremental.total_traffic, incremental.total_sources,
+                                           incremental.aggregates)
+    assert analyzer_results(reduced) == analyzer_results(TrafficAnalyzer(str(csv_path), use_cache=False))
+
+
+def test_unsaved_refresh_keeps_previous_state(tmp_path):
+    state = IncrementalState(tmp_path / 'state')
+    state.refresh(read(CSV))
+    state.save()
+    state.refresh(read(NEXT_CSV))
+
+    # 报告生成失败（未调用 save）时，下一次仍与上一次保存的数据比对
+    refresh = IncrementalState(tmp_path / 'state').refresh(read(CSV))
+    assert refresh.diff == {'added': 0, 'modified': 0, 'removed': 0, 'unchanged': 4}
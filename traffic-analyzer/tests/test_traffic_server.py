@@ -0,0 +1,110 @@
+"""常驻服务：数据集查询（分析粒度和阈值方案参与计算和结果缓存）和注册表的并发加载"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from analyze_traffic import load_traffic_data, run_profiles  # noqa: E402
+from traffic_rules import load_profiles  # noqa: E402
+import traffic_server  # noqa: E402
+from traffic_server import Dataset, DatasetRegistry  # noqa: E402
+
+CSV = """type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,app.lovable.dev,90000,50000,0.8,0.3
+direct,www.lovable.dev,40000,30000,0.3333,0.1
+search,chatgpt.com,300000,200000,0.5,0.3
+social,falling.com,150000,190000,-0.2105,0.15
+social,slipping.com,70000,90000,-0.2222,0.1
+"""
+
+RULES = """{"profiles": {
+  "wide": {"risk": {"when": {"traffic": {">=": 50000}, "traffic_diff": {"<=": -0.2}}},
+           "opportunity": {"when": {"traffic": {">=": 100000}, "traffic_diff": {">=": 0.3}}}}
+}}
+"""
+
+
+def write_inputs(tmp_path) -> tuple:
+    csv_path = tmp_path / 'traffic.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    rules_path = tmp_path / 'rules.json'
+    rules_path.write_text(RULES, encoding='utf-8')
+    return csv_path, rules_path
+
+
+def test_analyze_follows_level_and_profiles(tmp_path):
+    csv_path, rules_path = write_inputs(tmp_path)
+    dataset = Dataset('t', csv_path, compact=True)
+    profiles = load_profiles(rules_path, ['wide', 'default'])
+
+    expected = run_profiles(load_traffic_data(csv_path, use_cache=False, level='domain'), 'all', profiles)
+    assert dataset.analyze('all', 'domain', profiles) == expected
+    # app. / www. 两行汇总为 lovable.dev：13万 / 8万，增长 62.5%
+    assert [(o['source'], o['growth_rate']) for o in dataset.analyze('opportunities', 'domain')['opportunities']] == [
+        ('lovable.dev', '62.5%'), ('chatgpt.com', '50.0%')
+    ]
+
+    risk = dataset.analyze('risk', 'target', profiles)['profiles']
+    assert [r['name'] for r in risk['wide']['risk_items']] == ['slipping.com', 'falling.com']
+    assert [r['name'] for r in risk['default']['risk_items']] == ['falling.com']
+    assert dataset.analyze('risk') == risk['default']
+
+
+def test_registry_parses_outside_lock(tmp_path, monkeypatch):
+    csv_path, _ = write_inputs(tmp_path)
+    other_path = tmp_path / 'other.csv'
+    other_path.write_text(CSV, encoding='utf-8')
+
+    registry = DatasetRegistry(max_bytes=1 << 30)
+    registry.load(other_path, 'other')
+
+    started = threading.Event()
+    release = threading.Event()
+    parsed = []
+
+    class SlowDataset(Dataset):
+        def __init__(self, *args, **kwargs):
+            parsed.append(args[0])
+            started.set()
+            assert release.wait(5)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(traffic_server, 'Dataset', SlowDataset)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.load(csv_path, 'slow'))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+
+    # 解析进行中，其他数据集照常可用
+    assert registry.get('other').name == 'other'
+    assert len(registry.list()) == 1
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert parsed == ['slow']
+    assert len(results) == 2 and results[0] is results[1]
+    assert registry.get('slow') is results[0]
+
+
+def test_domain_rollup_triggers_eviction_and_results_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_server, 'RESULT_CACHE_SIZE', 2)
+    csv_path, _ = write_inputs(tmp_path)
+    other_path = tmp_path / 'other.csv'
+    other_path.write_text(CSV, encoding='utf-8')
+
+    registry = DatasetRegistry(max_bytes=1 << 30)
+    other = registry.load(other_path, 'other')
+    dataset = registry.load(csv_path, 'main')
+    registry.max_bytes = other.memory_bytes + dataset.memory_bytes
+
+    # 按域名汇总后数据集变大，超过上限，卸载最久未用的 other
+    registry.analyze(dataset, 'growth', 'domain')
+    assert [d['name'] for d in registry.list()] == ['main']
+
+    for analysis_type in ('by_type', 'segments', 'growth'):
+        registry.analyze(dataset, analysis_type)
+    assert len(dataset._results) == 2
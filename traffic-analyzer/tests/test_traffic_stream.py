@@ -0,0 +1,48 @@
+"""分块流式读取：空的 prev_traffic 和超过 int32 范围的流量"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from analyze_traffic import load_traffic_data_streaming, run_analyses  # noqa: E402
+from traffic_stream import iter_chunks  # noqa: E402
+
+BIG = 2 ** 31 + 5
+
+CSV = f"""type,target,traffic,prev_traffic,traffic_diff,traffic_share
+search,big.com,{BIG},{BIG - 10},0.0,0.5
+direct,newtool.ai,120000,,0.0,0.1
+referral,shop.com,80000,60000,0.3333,0.2
+search,chatgpt.com,300000,200000,0.5,0.2
+"""
+
+
+def write_csv(tmp_path) -> Path:
+    path = tmp_path / 'traffic.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return path
+
+
+def test_iter_chunks_reads_empty_prev_and_large_traffic(tmp_path):
+    chunks = list(iter_chunks(write_csv(tmp_path), chunksize=2))
+
+    df = pd.concat(chunks)
+    assert [len(c) for c in chunks] == [2, 2]
+    assert df['traffic'].dtype == 'int64'
+    assert df['prev_traffic'].dtype == 'int64'
+    assert df['traffic'].tolist()[0] == BIG
+    assert df['prev_traffic'].tolist() == [BIG - 10, 0, 60000, 200000]
+    assert df.index.tolist() == [0, 1, 2, 3]
+
+
+def test_streaming_analysis_matches_full_load(tmp_path):
+    path = write_csv(tmp_path)
+    full = pd.read_csv(path)
+    full['prev_traffic'] = full['prev_traffic'].fillna(0).astype('int64')
+
+    df, type_stats = load_traffic_data_streaming(path, chunksize=2)
+
+    assert run_analyses(df, 'all', type_stats) == run_analyses(full, 'all')